@@ -1,14 +1,18 @@
+import asyncio
 import zmq
+import zmq.asyncio
 import time
 import threading
 import signal
 import sys
 import os
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
 import hashlib
+import json
 from datetime import datetime
 
-from mne_lsl.stream import StreamLSL as Stream
+from mne_lsl.lsl import local_clock
 from DataProcessing.LLMProcessor import DataAnalyzer
 
 
@@ -18,28 +22,51 @@ from IO.FileWriting.EmotionWriter import EmotionPredictedWriter
 from IO.FileWriting.GazeWriter import GazeWriter
 
 from Backend.EyeGaze import create_new_eye_gaze
-from Backend.EyeCoordinateRegressor import PositionRegressor
+from Backend.GazeLoopController import GazeLoopController, DEFAULT_TARGET_FPS, OVERLOAD_POLICY_DROP
+from Backend.EyeCoordinateRegressor import PositionRegressor, REGRESSOR_BACKEND_KERAS, REGRESSOR_BACKENDS
 
-from IO.SignalProcessing.AuraTools import rename_aura_channels, is_stream_ready
+from IO.SignalProcessing.AuraAcquisition import AuraAcquisition, DEFAULT_POLL_INTERVAL
+from IO.SignalProcessing.AuraStreamManager import AuraStreamManager, stream_file_name
+from IO.SignalProcessing.BandPowerEstimator import BandPowerEstimator, ELECTRODES
 from IO.VideoProcessing.EmotionRecognizer import EmotionRecognizer
+from IO.VideoProcessing.EmotionInferencePool import EmotionInferencePool, EMOTION_LABELS
+from IO.VideoProcessing.EmotionSmoother import EmotionSeries, create_smoother, SMOOTHING_EMA, SMOOTHING_METHODS
+from IO.VideoProcessing.FrameBroker import FrameBroker
 from IO.PointerTracking.PointerTracker import CursorTracker
 from IO.FileWriting.PointerWriter import PointerWriter
+from IO.FileWriting.SessionStorage import STORAGE_FORMAT_CSV, STORAGE_FORMAT_BINARY, STORAGE_FORMATS, storage_path
+from DataProcessing.SessionConverter import convert_binary_to_csv
 
 # Constants
 DEFAULT_PORT = "5556"
 DEFAULT_FILENAME = 'unnamed'
 DEFAULT_AURA_STREAM_ID = 'filtered'
 DEFAULT_PARTICIPANT = 'unnamed_participant'
+DEFAULT_CAMERA_INDEX = 0
+EMOTION_MAX_FPS = 10
+
+# Commands that take seconds, such as the report queries. They run concurrently on their own threads, the other
+# commands run one at a time in the order they were received. A command can also return a future of the long-running
+# executor, as the training of the regressor does, and its reply is sent when the future completes.
+LONG_RUNNING_COMMANDS = ('generate_report', 'list_aura_streams')
+LONG_RUNNING_WORKERS = 4
+# Time in seconds given to the commands in progress to send their reply when the server stops
+STOP_REPLY_TIMEOUT = 2.0
+# Time in seconds the training waits for the calibration recording to write its last frame and close its file
+CALIBRATION_STOP_TIMEOUT = 5.0
 TRAINING_FOLDER = 'training'
 COLLECTED_FOLDER = 'collected'
 
 # File suffixes
 AURA_FILE_SUFFIX = '_aura.csv'
+AURA_POWER_FILE_SUFFIX = '_aura_power.csv'
 EMOTION_FILE_SUFFIX = '_emotions.csv'
 GAZE_FILE_SUFFIX = '_gaze.csv'
 POINTER_FILE_SUFFIX = '_pointer_data.csv'
+CLOCK_FILE_SUFFIX = '_clock.json'
 TRAINING_GAZE_FILE = 'training_gaze.csv'
 TRAINING_AURA_FILE = 'training_aura.csv'
+GAZE_MODEL_FILE = 'gaze_model.pkl'
 
 # Collection types
 TRAINING_MODE = 'training'
@@ -59,6 +86,13 @@ START_CALIBRATION_MSG = "start-calibration"
 COLLECTION_STARTED_MSG = "collection-started"
 COLLECTION_STOPPED_MSG = "collection-stopped"
 CALIBRATION_COMPLETE_MSG = "calibration-complete"
+EMOTION_MODEL_READY_MSG = "emotion-model-ready"
+
+# States of the emotion model, reported to the frontend
+EMOTION_MODEL_STOPPED = 'stopped'
+EMOTION_MODEL_LOADING = 'loading'
+EMOTION_MODEL_READY = 'ready'
+EMOTION_MODEL_ERROR = 'error'
 
 class BackendServer:
     """
@@ -66,7 +100,9 @@ class BackendServer:
     EEG signals and pointer tracking.
 
     The server uses ZMQ for communication with the frontend and manages multiple threads for
-    different data collection tasks.
+    different data collection tasks. The socket is only used by the asyncio task of the message loop: the commands
+    run on executor threads, and their replies and the messages of the background threads are queued with _send.
+    A reply carries the request_id of its command when the frontend gives one.
     """
 
     def __init__(self, port=DEFAULT_PORT):
@@ -77,10 +113,21 @@ class BackendServer:
             port (str): Port number for ZMQ communication. Defaults to DEFAULT_PORT.
         """
         # Server setup
-        self._aura_training_thread = None
-        self._context = zmq.Context()
+        # Thread recording the calibration points, its file is complete once the thread has exited
+        self._gaze_training_thread = None
+        self._context = zmq.asyncio.Context()
         self._socket = self._context.socket(zmq.PAIR)
         self._socket.bind(f"tcp://*:{port}")
+        self._loop = None
+        self._outgoing = None
+        self._stop_event = None
+        self._command_tasks = set()
+        self._command_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='command')
+        self._long_command_executor = ThreadPoolExecutor(max_workers=LONG_RUNNING_WORKERS,
+                                                         thread_name_prefix='long-command')
+
+        # Pacing and statistics of the gaze loops
+        self._gaze_loop_controller = GazeLoopController(DEFAULT_TARGET_FPS, OVERLOAD_POLICY_DROP)
 
         # Training points coordinates for calibration
         self._current_x_coordinate = 0
@@ -95,10 +142,27 @@ class BackendServer:
         self._pointer_tracking_active = False
 
         # Objects that are the data source.
+        self._frame_broker = None
+        self._frame_broker_lock = threading.Lock()
         self._emotion_handler = None
+        self._emotion_pool = None
+        self._emotion_pool_lock = threading.Lock()
+        self._emotion_model_status = EMOTION_MODEL_STOPPED
+        self._emotion_first_sample_latency = None
+        self._emotion_smoothing = SMOOTHING_EMA
+        # Rows per second of the emotion file, 0 writes a row for each prediction
+        self._emotion_output_rate = 0
         self._eye_gaze = None
-        self._stream = None
+        self._aura_streams = AuraStreamManager()
+        self._band_power_estimators = {}
+        self._aura_acquisitions = {}
+        self._aura_poll_interval = DEFAULT_POLL_INTERVAL
         self._regressor = None
+        # The regressor is trained on a long-running command thread while the other commands keep running
+        self._regressor_lock = threading.Lock()
+        self._regressor_training = False
+        self._regressor_backend = REGRESSOR_BACKEND_KERAS
+        self._storage_format = STORAGE_FORMAT_CSV
         self._pointer_tracker = None
 
         # Boolean flags for deciding the experiments to run (Still building this out)
@@ -109,7 +173,7 @@ class BackendServer:
         self._run_screen = False
 
         # Threads for the data collection
-        self._aura_thread = None
+        self._aura_threads = {}
         self._emotion_thread = None
         self._regressor_thread = None
         self._start_time = None
@@ -119,12 +183,12 @@ class BackendServer:
         self._path = None
         self._filename = DEFAULT_FILENAME
 
-        # Aura stream id
-        # TODO: Make this dynamic
-        self._aura_stream_id = DEFAULT_AURA_STREAM_ID
+        # Aura streams selected by the frontend, identified by their LSL source_id
+        self._aura_stream_ids = [DEFAULT_AURA_STREAM_ID]
 
         # Data writers
-        self._aura_writer = None
+        self._aura_writers = {}
+        self._aura_power_writers = {}
         self._emotion_writer = None
         self._gaze_writer = None
         self._pointer_writer = None
@@ -157,24 +221,118 @@ class BackendServer:
                     self._threads.remove(thread)
 
     def start(self):
-        """Start the backend server and begin processing messages."""
+        """Start the backend server and process messages until it is stopped."""
         self._running = True
         print("Backend server started...")
+        if sys.platform == 'win32':
+            # zmq.asyncio needs a selector event loop, the default loop of Windows is a proactor.
+            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        """
+        Run the message loop: one task receives the commands and another one sends the queued messages, so the
+        socket is never used by two threads.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._outgoing = asyncio.Queue()
+        self._stop_event = asyncio.Event()
+        if not self._running:
+            # Stopped by a signal before the loop started
+            self._stop_event.set()
+        sender = asyncio.create_task(self._send_loop())
+        receiver = asyncio.create_task(self._receive_loop())
+        try:
+            await self._stop_event.wait()
+            # The commands in progress, such as the one that stopped the server, get some time to reply
+            receiver.cancel()
+            if self._command_tasks:
+                await asyncio.wait(self._command_tasks, timeout=STOP_REPLY_TIMEOUT)
+            try:
+                await asyncio.wait_for(self._outgoing.join(), timeout=STOP_REPLY_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            receiver.cancel()
+            sender.cancel()
+            await asyncio.gather(receiver, sender, return_exceptions=True)
+            self._loop = None
+
+    async def _receive_loop(self):
+        """Receive the commands and start a task for each of them."""
         while self._running:
             try:
-                message = self._socket.recv_json(flags=zmq.NOBLOCK)
-                response = self.handle_message(message)
-                if response:
-                    self._socket.send_json(response)
-            except zmq.error.Again:
-                # No message available, sleep briefly
-                time.sleep(0.001)
+                message = await self._socket.recv_json()
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                print(f"Error handling message: {e}")
-                try:
-                    self._socket.send_json({"error": str(e)})
-                except:
-                    pass
+                print(f"Error receiving message: {e}")
+                self._send({"error": str(e)})
+                continue
+            task = asyncio.create_task(self._process_message(message))
+            self._command_tasks.add(task)
+            task.add_done_callback(self._command_tasks.discard)
+
+    async def _process_message(self, message):
+        """
+        Run the handler of a command on an executor and queue its reply.
+
+        Args:
+            message (dict): Message containing the command, its parameters and optionally a request_id
+        """
+        request_id = message.get("request_id") if isinstance(message, dict) else None
+        command = message.get("command") if isinstance(message, dict) else None
+        executor = self._long_command_executor if command in LONG_RUNNING_COMMANDS else self._command_executor
+        try:
+            response = await self._loop.run_in_executor(executor, self.handle_message, message)
+            if isinstance(response, Future):
+                response = await asyncio.wrap_future(response)
+        except Exception as e:
+            print(f"Error handling message: {e}")
+            response = {"error": str(e)}
+        if response:
+            self._send(response, request_id)
+
+    async def _send_loop(self):
+        """Send the queued messages, the only place where the socket sends."""
+        while True:
+            message = await self._outgoing.get()
+            try:
+                await self._socket.send_json(message)
+            except Exception as e:
+                print(f"Error sending message: {e}")
+            finally:
+                self._outgoing.task_done()
+
+    def _send(self, message, request_id=None):
+        """
+        Queue a message for the frontend. Safe to call from any thread.
+
+        Args:
+            message (dict): Message to send
+            request_id: Identifier of the command the message replies to, None for the other messages
+        """
+        if request_id is not None:
+            message = {**message, "request_id": request_id}
+        loop = self._loop
+        if loop is None:
+            print(f"Message not sent, the server is not running: {message}")
+            return
+        try:
+            loop.call_soon_threadsafe(self._outgoing.put_nowait, message)
+        except RuntimeError:
+            # The loop closed while the message was queued
+            pass
+
+    def _request_stop(self):
+        """Stop the message loop. Safe to call from any thread and from signal handlers."""
+        self._running = False
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._stop_event.set)
+            except RuntimeError:
+                pass
 
     def cleanup(self):
         """Clean up resources before shutting down the server."""
@@ -187,10 +345,19 @@ class BackendServer:
         if self._pointer_tracker:
             self._pointer_tracker.stop_tracking()
             self._pointer_tracker.is_tracking = False
+        self._stop_frame_broker()
 
-        # Close all file writers
+        # Wait for the collection threads before closing the writers, they close their own writers when they exit
+        with self._threads_lock:
+            threads_copy = self._threads.copy()
+        for thread in threads_copy:
+            if thread and thread.is_alive() and thread is not threading.current_thread():
+                thread.join(timeout=1.0)
+
+        # Close the file writers left open
         writers = [
-            self._aura_writer,
+            *self._aura_writers.values(),
+            *self._aura_power_writers.values(),
             self._emotion_writer,
             self._gaze_writer,
             self._pointer_writer
@@ -202,25 +369,31 @@ class BackendServer:
                         writer.close_file()
                 except Exception as e:
                     print(f"Error closing writer: {e}")
+        self._aura_streams.disconnect_all()
+        self._stop_emotion_pool()
 
-        # Wait for all threads to complete
-        with self._threads_lock:
-            threads_copy = self._threads.copy()
-        for thread in threads_copy:
-            if thread and thread.is_alive():
-                thread.join(timeout=1.0)
+        # The message loop is stopped before its socket is closed
+        self._request_stop()
+        self._command_executor.shutdown(wait=False, cancel_futures=True)
+        self._long_command_executor.shutdown(wait=False, cancel_futures=True)
 
         # Clean up ZMQ resources
         if hasattr(self, '_socket') and self._socket:
             self._socket.close()
+            self._socket = None
         if hasattr(self, '_context') and self._context:
             self._context.term()
+            self._context = None
 
         print("Cleanup completed")
 
     def signal_handler(self, signum, frame):
         """Handle system signals for graceful shutdown."""
         print("Signal received, cleaning up...")
+        if self._loop is not None:
+            # The message loop returns from start and its caller cleans up
+            self._request_stop()
+            return
         self.cleanup()
         sys.exit(0)
 
@@ -247,7 +420,16 @@ class BackendServer:
             'update_output_path': self.update_output_path,
             'update_participant_name': self.update_participant_name,
             'new_participant': self.handle_new_participant,
-            'generate_report': self.generate_report
+            'generate_report': self.generate_report,
+            'set_gaze_rate': self.set_gaze_rate,
+            'set_regressor_backend': self.set_regressor_backend,
+            'set_storage_format': self.set_storage_format,
+            'set_aura_poll_interval': self.set_aura_poll_interval,
+            'set_emotion_output': self.set_emotion_output,
+            'get_emotion_model_status': self.get_emotion_model_status,
+            'list_aura_streams': self.list_aura_streams,
+            'select_aura_streams': self.select_aura_streams,
+            'get_stats': self.get_stats
         }
         handler = handlers.get(command)
         if handler:
@@ -263,10 +445,20 @@ class BackendServer:
         """Initialize and start eye gaze tracking."""
         def eye_gaze_task():
             with self.thread_tracking(threading.current_thread()):
-                self._eye_gaze = create_new_eye_gaze()
+                try:
+                    frame_source = self._get_frame_broker().subscribe()
+                    self._eye_gaze = create_new_eye_gaze(frame_source=frame_source)
+                except RuntimeError as e:
+                    self._fitting_eye_gaze = False
+                    self._send({"status": STATUS_ERROR, "message": str(e)})
+                    return
                 self._eye_gaze_running = True
                 self._fitting_eye_gaze = False
-                self._socket.send_json({"status": STATUS_SUCCESS, "message": START_CALIBRATION_MSG})
+                if self._load_saved_regressor():
+                    # The participant was already calibrated with the current training data.
+                    self._send({"status": STATUS_SUCCESS, "message": CALIBRATION_COMPLETE_MSG})
+                else:
+                    self._send({"status": STATUS_SUCCESS, "message": START_CALIBRATION_MSG})
 
         if not self._fitting_eye_gaze and self._run_gaze:
             self._fitting_eye_gaze = True
@@ -279,8 +471,11 @@ class BackendServer:
     def start_data_collection(self):
         """Start all active data collection threads."""
         try:
+            if self._run_gaze and self._regressor_training:
+                return {"status": STATUS_ERROR, "message": "The gaze regressor is still being trained"}
             if not self._data_collection_active:
                 self._start_time = time.time()
+                self._write_clock_file(local_clock())
                 self._data_collection_active = True
 
                 # AURA
@@ -290,18 +485,23 @@ class BackendServer:
                         raise Exception(aura_response["message"])
                     
                     try:
-                        channels_names = ['timestamp'] + list(self._stream.info['ch_names'])
-                        self._aura_writer = AuraDataWriter(self._path, f'{self._filename}{AURA_FILE_SUFFIX}', channels_names)
-                        self._aura_writer.create_new_file()
-                        
-                        if self._aura_thread is None or not self._aura_thread.is_alive():
-                            self._aura_thread = threading.Thread(
-                                target=self._aura_data_collection_loop,
-                                args=(TESTING_MODE,),
-                                daemon=True
-                            )
-                            with self.thread_tracking(self._aura_thread):
-                                self._aura_thread.start()
+                        # One writer and one acquisition thread for each selected stream.
+                        self._aura_writers = {}
+                        self._aura_power_writers = {}
+                        self._band_power_estimators = {}
+                        for index, (source_id, stream) in enumerate(self._aura_streams.streams.items()):
+                            self._create_aura_writers(source_id, stream, primary=index == 0)
+
+                            aura_thread = self._aura_threads.get(source_id)
+                            if aura_thread is None or not aura_thread.is_alive():
+                                aura_thread = threading.Thread(
+                                    target=self._aura_data_collection_loop,
+                                    args=(TESTING_MODE, source_id),
+                                    daemon=True
+                                )
+                                self._aura_threads[source_id] = aura_thread
+                                with self.thread_tracking(aura_thread):
+                                    aura_thread.start()
                     
                     except Exception as e:
                         print(f"Error starting Aura thread: {str(e)}")
@@ -313,7 +513,9 @@ class BackendServer:
                     if emotion_response["status"] != STATUS_SUCCESS:
                         raise Exception(emotion_response["message"])
                     
-                    self._emotion_writer = EmotionPredictedWriter(self._path, f'{self._filename}{EMOTION_FILE_SUFFIX}')
+                    self._emotion_writer = EmotionPredictedWriter(self._path, f'{self._filename}{EMOTION_FILE_SUFFIX}',
+                                                                  labels=EMOTION_LABELS, journal=True,
+                                                                  storage_format=self._storage_format)
                     self._emotion_writer.create_new_file()
                     
                     if self._emotion_thread is None or not self._emotion_thread.is_alive():
@@ -326,7 +528,8 @@ class BackendServer:
                 
                 # Coordinate/Gaze
                 if self._run_gaze:
-                    self._gaze_writer = CoordinateWriter(self._path, f'{self._filename}{GAZE_FILE_SUFFIX}')
+                    self._gaze_writer = CoordinateWriter(self._path, f'{self._filename}{GAZE_FILE_SUFFIX}', journal=True,
+                                                         storage_format=self._storage_format)
                     self._gaze_writer.create_new_file()
                     
                     if self._regressor_thread is None or not self._regressor_thread.is_alive():
@@ -339,7 +542,8 @@ class BackendServer:
                 
                 # Pointer
                 if self._run_pointer:
-                    self._pointer_writer = PointerWriter(self._path, f'{self._filename}{POINTER_FILE_SUFFIX}')
+                    self._pointer_writer = PointerWriter(self._path, f'{self._filename}{POINTER_FILE_SUFFIX}',
+                                                         journal=True, storage_format=self._storage_format)
                     self._pointer_writer.create_new_file()
                     pointer_response = self.start_pointer_tracking()
                     if pointer_response["status"] != STATUS_SUCCESS:
@@ -356,35 +560,79 @@ class BackendServer:
             print(f"Error in start_data_collection: {str(e)}")
             return {"status": STATUS_ERROR, "message": f"Error starting data collection: {str(e)}"}
 
+    def _create_aura_writers(self, source_id, stream, primary):
+        """
+        Create the session writers of an Aura stream. The first stream selected writes the usual files and the others
+        add their source_id to the file names.
+
+        Args:
+            source_id (str): The LSL source_id of the stream
+            stream (StreamLSL): The connected stream
+            primary (bool): True for the first stream selected
+        """
+        channels_names = ['timestamp'] + list(stream.info['ch_names'])
+        writer = AuraDataWriter(self._path, stream_file_name(f'{self._filename}{AURA_FILE_SUFFIX}', source_id, primary),
+                                channels_names, journal=True, storage_format=self._storage_format)
+        writer.create_new_file()
+        self._aura_writers[source_id] = writer
+
+        # The raw 8 channel stream has no band powers, they are estimated online.
+        if sorted(stream.info['ch_names']) == sorted(ELECTRODES):
+            estimator = BandPowerEstimator(stream.info['sfreq'], stream.info['ch_names'])
+            power_names = ['timestamp'] + estimator.channel_names
+            power_writer = AuraDataWriter(self._path,
+                                          stream_file_name(f'{self._filename}{AURA_POWER_FILE_SUFFIX}', source_id,
+                                                           primary),
+                                          power_names, journal=True, storage_format=self._storage_format)
+            power_writer.create_new_file()
+            self._band_power_estimators[source_id] = estimator
+            self._aura_power_writers[source_id] = power_writer
+
+    def _write_clock_file(self, lsl_start):
+        """
+        Record the wall clock and the LSL clock at the start of the collection. The Aura rows are timestamped with the
+        LSL clock and the other signals with the wall clock, the offset between both is used to align them.
+
+        Args:
+            lsl_start (float): LSL local_clock read right after the wall clock start time
+        """
+        os.makedirs(self._path, exist_ok=True)
+        with open(os.path.join(self._path, f'{self._filename}{CLOCK_FILE_SUFFIX}'), 'w') as file:
+            json.dump({"wall_start": self._start_time, "lsl_start": lsl_start}, file)
+
     def handle_stop(self):
         """Stop the server and clean up resources."""
         print("Stopping server...")
-        self.cleanup()
+        self._request_stop()
         return {"status": STATUS_SUCCESS, "message": "Server stopped"}
 
     def start_training_data_collection(self):
         """Start collecting training data for eye gaze tracking."""
-        # Create local writer for gaze data
+        # Create local writer for gaze data. It writes synchronously: the calibration has a few hundred rows, and the
+        # regressor reads the file as soon as the recording stops.
         gaze_writer = GazeWriter(self._training_path, TRAINING_GAZE_FILE)
         gaze_writer.create_new_file()
-        aura_training_thread = None
         if self._run_aura:
             aura_response = self.start_aura()
             if aura_response["status"] == STATUS_SUCCESS:
-                aura_training_thread = threading.Thread(
-                    target=self._aura_data_collection_loop,
-                    args=(TRAINING_MODE,),
-                    daemon=True
-                )
-                with self.thread_tracking(aura_training_thread):
-                    aura_training_thread.start()
+                for source_id in self._aura_streams.streams:
+                    aura_training_thread = threading.Thread(
+                        target=self._aura_data_collection_loop,
+                        args=(TRAINING_MODE, source_id),
+                        daemon=True
+                    )
+                    with self.thread_tracking(aura_training_thread):
+                        aura_training_thread.start()
             else:
                 print(f"Failed to start Aura for training: {aura_response['message']}")
 
         def training_data_task():
             with self.thread_tracking(threading.current_thread()):
+                controller = self._gaze_loop_controller
+                controller.reset()
                 while True:
                     # Make prediction and write to file
+                    controller.begin_frame()
                     gaze_vector = self._eye_gaze.get_gaze_vector()
                     if self._current_y_coordinate != 0 and self._current_x_coordinate != 0:
                         data = []
@@ -395,7 +643,9 @@ class BackendServer:
                                 data.append(i)
                             data.append(self._current_x_coordinate)
                             data.append(self._current_y_coordinate)
-                            gaze_writer.write(data)
+                            with controller.stage('write'):
+                                gaze_writer.write(data)
+                    controller.end_frame(self._eye_gaze)
                     if not self._training_data_collection_active:
                         gaze_writer.close_file()
                         break
@@ -403,6 +653,7 @@ class BackendServer:
         if self._eye_gaze_running:
             self._training_data_collection_active = True
             local_thread = threading.Thread(target=training_data_task, daemon=True)
+            self._gaze_training_thread = local_thread
             with self.thread_tracking(local_thread):
                 local_thread.start()
             return {"status": STATUS_SUCCESS, "message": START_CALIBRATION_MSG}
@@ -438,7 +689,7 @@ class BackendServer:
             self._threads = []
         
         # Reset thread references
-        self._aura_thread = None
+        self._aura_threads = {}
         self._emotion_thread = None
         self._regressor_thread = None
         self._screen_recording_thread = None
@@ -447,20 +698,46 @@ class BackendServer:
         return {"status": STATUS_SUCCESS, "message": COLLECTION_STOPPED_MSG}
 
     def stop_training_data_collection(self):
-        """Stop recording training data."""
+        """
+        Stop recording training data and train the gaze regressor on the long-running executor, so the other
+        commands are not blocked. While it trains, starting a gaze collection or training again is rejected.
+
+        Returns:
+            Future: Completes with the response once the regressor is trained
+        """
+        with self._regressor_lock:
+            if self._regressor_training:
+                return {"status": STATUS_ERROR, "message": "The gaze regressor is already being trained"}
+            self._regressor_training = True
         try:
             self._training_data_collection_active = False
-            
-            # Clean up training-specific resources
-            if hasattr(self, '_aura_training_thread') and self._aura_training_thread:
-                self._aura_training_thread.join(timeout=1.0)
-                self._aura_training_thread = None
-            
+            return self._long_command_executor.submit(self._train_regressor)
+        except Exception as e:
+            with self._regressor_lock:
+                self._regressor_training = False
+            print(f"Error stopping training data recording: {e}")
+            return {"status": STATUS_ERROR, "message": str(e)}
+
+    def _train_regressor(self):
+        """
+        Train the gaze regressor, run on the long-running executor. The calibration recording is waited for first, so
+        the regressor reads the complete training file.
+        """
+        try:
+            training_thread = self._gaze_training_thread
+            if training_thread is not None and training_thread is not threading.current_thread():
+                training_thread.join(timeout=CALIBRATION_STOP_TIMEOUT)
+                if training_thread.is_alive():
+                    raise RuntimeError("The calibration recording did not stop")
+            self._gaze_training_thread = None
             self.start_regressor()
             return {"status": STATUS_SUCCESS, "message": CALIBRATION_COMPLETE_MSG}
         except Exception as e:
             print(f"Error stopping training data recording: {e}")
             return {"status": STATUS_ERROR, "message": str(e)}
+        finally:
+            with self._regressor_lock:
+                self._regressor_training = False
     
     def handle_update_signal_status(self, signal, status):
         """Update the status of a signal."""
@@ -471,6 +748,12 @@ class BackendServer:
             self._run_gaze = bool_status
         elif signal == SIGNAL_EMOTION:
             self._run_emotion = bool_status
+            if bool_status:
+                # The model takes seconds to build, it is built now so the first emotion is not delayed.
+                self._warm_up_emotion_model()
+            elif not self._data_collection_active:
+                self._stop_emotion_pool()
+            # Otherwise the emotion loop stops the pool when the collection ends.
         elif signal == SIGNAL_POINTER:
             self._run_pointer = bool_status
         elif signal == SIGNAL_SCREEN:
@@ -478,6 +761,71 @@ class BackendServer:
         
         return {"status": STATUS_SUCCESS, "message": f"Signal {signal} updated to {status}"}
 
+    def get_emotion_model_status(self):
+        """Report whether the emotion model is stopped, loading, ready or failed to load."""
+        return {"status": STATUS_SUCCESS, "model_status": self._emotion_model_status}
+
+    def _get_emotion_pool(self):
+        """
+        Returns the emotion inference pool, creating it on first use. The worker processes keep their model between
+        sessions.
+
+        Returns:
+            EmotionInferencePool: The emotion pool
+        """
+        with self._emotion_pool_lock:
+            if self._emotion_pool is None:
+                self._emotion_pool = EmotionInferencePool()
+            return self._emotion_pool
+
+    def _warm_up_emotion_model(self):
+        """
+        Build the emotion model of every worker in the background and notify the frontend when it is ready. The result
+        is discarded if the pool was stopped or replaced meanwhile.
+        """
+        with self._emotion_pool_lock:
+            if self._emotion_model_status in (EMOTION_MODEL_LOADING, EMOTION_MODEL_READY):
+                return
+            self._emotion_model_status = EMOTION_MODEL_LOADING
+            if self._emotion_pool is None:
+                self._emotion_pool = EmotionInferencePool()
+            pool = self._emotion_pool
+
+        # Not tracked with the collection threads, stopping a collection does not wait for the model.
+        def warm_up_task():
+            error = None
+            with self._emotion_pool_lock:
+                current = self._emotion_pool is pool
+            if current:
+                try:
+                    duration = pool.warm_up()
+                except Exception as e:
+                    error = e
+            with self._emotion_pool_lock:
+                current = self._emotion_pool is pool
+                if current:
+                    self._emotion_model_status = EMOTION_MODEL_ERROR if error else EMOTION_MODEL_READY
+            if not current:
+                # The emotion signal was turned off during the warm-up, its workers are not kept.
+                pool.stop(wait=False)
+                return
+            if error:
+                print(f"Error loading the emotion model: {error}")
+                self._send({"status": STATUS_ERROR, "message": f"Emotion model failed to load: {error}"})
+                return
+            print(f"Emotion model ready in {duration:.1f} s")
+            self._send({"status": STATUS_SUCCESS, "message": EMOTION_MODEL_READY_MSG})
+
+        threading.Thread(target=warm_up_task, daemon=True).start()
+
+    def _stop_emotion_pool(self):
+        """Stop the emotion worker processes, releasing the memory of their models."""
+        with self._emotion_pool_lock:
+            if self._emotion_pool is not None:
+                self._emotion_pool.stop(wait=False)
+                self._emotion_pool = None
+            self._emotion_model_status = EMOTION_MODEL_STOPPED
+
     # Signal initialization functions
 
     def start_pointer_tracking(self):
@@ -490,34 +838,49 @@ class BackendServer:
             return {"status": STATUS_ERROR, "message": "Pointer tracking already active"}
         
     def start_regressor(self):
-        """Initialize and start the position regressor."""
+        """Train the position regressor and publish it once it is ready."""
         path = os.path.join(self._training_path, TRAINING_GAZE_FILE)
-        self._regressor = PositionRegressor(path)
-        self._regressor.train_create_model()
-
-        self._regressor_thread = threading.Thread(
-            target=self._coordinate_regressor_loop,
-            daemon=True
-        )
-
-        return {"status": STATUS_SUCCESS, "message": "Regressor started"}
-
-    def start_aura(self, buffer_size_multiplier=1):
+        regressor = PositionRegressor(path, backend=self._regressor_backend)
+        regressor.train_create_model()
         try:
-            self._stream = Stream(bufsize=buffer_size_multiplier, source_id=self._aura_stream_id)
-            self._stream.connect(processing_flags='all')
-            rename_aura_channels(self._stream)
-
-            # Create thread without starting it
-            self._aura_thread = threading.Thread(
-                target=self._aura_data_collection_loop,
-                args=(TESTING_MODE,),
+            regressor.save_model(os.path.join(self._training_path, GAZE_MODEL_FILE))
+        except Exception as e:
+            print(f"Error saving gaze model: {e}")
+
+        with self._regressor_lock:
+            self._regressor = regressor
+            self._regressor_thread = threading.Thread(
+                target=self._coordinate_regressor_loop,
                 daemon=True
             )
 
-            # Add to thread tracking
-            self._threads.append(self._aura_thread)
+        return {"status": STATUS_SUCCESS, "message": "Regressor started"}
+
+    def _load_saved_regressor(self):
+        """
+        Load the gaze model saved for the current participant if it was trained on the current calibration data.
 
+        Returns:
+            bool: True if the saved model was loaded and training can be skipped
+        """
+        training_path = getattr(self, '_training_path', None)
+        if training_path is None:
+            return False
+        regressor = PositionRegressor.load_model(
+            os.path.join(training_path, TRAINING_GAZE_FILE),
+            os.path.join(training_path, GAZE_MODEL_FILE),
+            backend=self._regressor_backend
+        )
+        if regressor is None:
+            return False
+        with self._regressor_lock:
+            self._regressor = regressor
+        return True
+
+    def start_aura(self):
+        """Connect the selected Aura streams, the streams already connected are kept."""
+        try:
+            self._aura_streams.connect(self._aura_stream_ids)
             return {"status": STATUS_SUCCESS, "message": "Aura signal handling initialized"}
         except Exception as e:
             print(f"Error in handle_aura_signal: {str(e)}")
@@ -528,48 +891,104 @@ class BackendServer:
         Initialize and start emotion recognition.
         """
         try:
-            self._emotion_handler = EmotionRecognizer('opencv')
+            if self._emotion_handler:
+                # Releases the subscription of the previous session before creating a new one.
+                self._emotion_handler.stop_processing()
+            frame_source = self._get_frame_broker().subscribe(max_fps=EMOTION_MAX_FPS)
+            self._emotion_handler = EmotionRecognizer(frame_source=frame_source)
+            # Starts the workers if the model was not warmed up when the signal was enabled.
+            self._get_emotion_pool().start()
             self._emotion_thread = threading.Thread(target=self._emotion_collection_loop, daemon=True)
 
             return {"status": STATUS_SUCCESS, "message": "Emotion recognition started"}
         except Exception as e:
             return {"status": STATUS_ERROR, "message": str(e)}
     
+    def _get_frame_broker(self):
+        """
+        Returns the broker shared by the gaze and emotion pipelines, opening the camera on first use so it is only
+        opened once.
+
+        Returns:
+            FrameBroker: The running frame broker
+        """
+        with self._frame_broker_lock:
+            if self._frame_broker is not None and not self._frame_broker.is_running:
+                # The capture ended, the camera is released before opening it again.
+                self._frame_broker.stop()
+                self._frame_broker = None
+            if self._frame_broker is None:
+                self._frame_broker = FrameBroker(DEFAULT_CAMERA_INDEX)
+                if not self._frame_broker.start():
+                    self._frame_broker = None
+                    raise RuntimeError("The camera could not be opened.")
+            return self._frame_broker
+
+    def _stop_frame_broker(self):
+        """Stop the shared camera capture and release the camera."""
+        with self._frame_broker_lock:
+            if self._frame_broker is not None:
+                self._frame_broker.stop()
+                self._frame_broker = None
+
     # Signal collection loops
-    def _aura_data_collection_loop(self, collection_type):
+    def _aura_data_collection_loop(self, collection_type, source_id):
         """
-        Collect Aura data and write to file.
+        Collect the data of an Aura stream and write to file. Each selected stream runs its own loop.
         The mode of operation is determined by the type argument. Is important to handle
         this internally to avoid user error.
         Args:
             collection_type (str): 'training' or 'testing'
+            source_id (str): The LSL source_id of the stream
         """
         try:
+            streams = self._aura_streams.streams
+            stream = streams[source_id]
+            aura_writer = self._aura_writers.get(source_id)
+            power_writer = self._aura_power_writers.get(source_id)
+            estimator = self._band_power_estimators.get(source_id)
             aura_writer_training = None
             if collection_type == TRAINING_MODE:
-                channels_names = ['timestamp'] + self._stream.info['ch_names']
-                aura_writer_training = AuraDataWriter(self._training_path, TRAINING_AURA_FILE, channels_names)
+                channels_names = ['timestamp'] + stream.info['ch_names']
+                training_file = stream_file_name(TRAINING_AURA_FILE, source_id, source_id == next(iter(streams)))
+                aura_writer_training = AuraDataWriter(self._training_path, training_file, channels_names,
+                                                      async_mode=True)
                 aura_writer_training.create_new_file()
             
+            # Only the samples that arrived since the last read are pulled, once per poll interval.
+            acquisition = AuraAcquisition(stream, self._aura_poll_interval)
+            self._aura_acquisitions[source_id] = acquisition
             while True:
-                if is_stream_ready(self._stream):
-                    data, ts = self._stream.get_data()
+                data, ts = acquisition.read_new()
+                if len(ts):
                     if collection_type == TRAINING_MODE:
                         if aura_writer_training:
                             aura_writer_training.write_data(ts, data)
                     else:
                         processed_ts = [round(t - self._start_time, 3) for t in ts]
-                        self._aura_writer.write_data(processed_ts, data)
-
-                time.sleep(0.001)
+                        aura_writer.write_data(processed_ts, data)
+                        if estimator is not None:
+                            gap = acquisition.last_gap
+                            if gap is not None:
+                                # The Welch windows do not mix the samples of both sides of a gap.
+                                estimator.reset()
+                                data, ts = data[:, gap:], ts[gap:]
+                            power_ts, powers = estimator.push(data, ts)
+                            if len(power_ts):
+                                power_writer.write_data(
+                                    [round(t - self._start_time, 3) for t in power_ts], powers)
+
+                acquisition.wait()
 
                 if collection_type == TRAINING_MODE and not self._training_data_collection_active:
                     if aura_writer_training:
                         aura_writer_training.close_file()
                     break
                 elif collection_type == TESTING_MODE and not self._data_collection_active:
-                    if self._aura_writer:
-                        self._aura_writer.close_file()
+                    if aura_writer:
+                        aura_writer.close_file()
+                    if power_writer:
+                        power_writer.close_file()
                     break
                     
         except Exception as e:
@@ -580,23 +999,54 @@ class BackendServer:
         """
         Continuously collect and write emotion data in a loop.
         
-        Uses the emotion_handler to recognize emotions and writes the dominant emotion
-        along with a timestamp to the emotion_writer. Runs until data_collection_active
-        is set to False.
+        Uses the emotion_handler to locate the face of each frame and sends it to the emotion pool, which predicts
+        the emotions on worker processes. The predictions are smoothed over time and the smoothed probabilities are
+        written with the dominant emotion, at the capture time of the frames or at the configured output rate. Runs
+        until data_collection_active is set to False, then writes the predictions still pending, and stops the pool
+        if the emotion signal was turned off meanwhile.
         """
         with self.thread_tracking(threading.current_thread()):
+            pool = self._emotion_pool
+            series = EmotionSeries(EMOTION_LABELS, create_smoother(self._emotion_smoothing), self._emotion_output_rate)
+            self._emotion_first_sample_latency = None
             while True:
                 if self._emotion_handler:
-                    emotion = self._emotion_handler.recognize_emotion()
-                    if emotion is not None:
-                        emotion = emotion[0]['dominant_emotion']
-                        timestamp = round(time.time() - self._start_time, 3)
-                        self._emotion_writer.write_data(timestamp, emotion)
-                time.sleep(0.001)  # Small sleep to prevent CPU overuse
+                    # Waits for the next frame of the shared camera, so the loop does not need to sleep.
+                    face, capture_time = self._emotion_handler.read_face()
+                    if face is not None:
+                        pool.submit(face, capture_time)
+                else:
+                    time.sleep(0.001)
+                written = self._write_emotions(series, pool.get_results())
+                if written and self._emotion_first_sample_latency is None:
+                    # Time from the start of the collection to the first emotion written.
+                    self._emotion_first_sample_latency = time.time() - self._start_time
                 if not self._data_collection_active:
                     break
+            self._write_emotions(series, pool.get_results(wait=True))
             if self._emotion_writer:
                 self._emotion_writer.close_file()
+            if not self._run_emotion:
+                # The emotion signal was turned off during the collection, its workers are released now.
+                self._stop_emotion_pool()
+
+    def _write_emotions(self, series, results):
+        """
+        Smooth the predictions of the emotion pool and write the rows of the emotion series.
+
+        Args:
+            series (EmotionSeries): The emotion series of the session
+            results (list): Tuples with the capture time and the probabilities of each face
+
+        Returns:
+            int: The number of rows written
+        """
+        written = 0
+        for capture_time, probabilities in results:
+            for timestamp, emotion, smoothed in series.update(capture_time, probabilities):
+                self._emotion_writer.write_data(round(timestamp - self._start_time, 3), emotion, smoothed)
+                written += 1
+        return written
 
     def _coordinate_regressor_loop(self):
         """
@@ -610,7 +1060,10 @@ class BackendServer:
         Predictions are rounded to integer screen coordinates before writing.
         """
         with self.thread_tracking(threading.current_thread()):
+            controller = self._gaze_loop_controller
+            controller.reset()
             while True:
+                controller.begin_frame()
                 gaze_vector = self._eye_gaze.get_gaze_vector()
                 left_eye = gaze_vector[0]
                 right_eye = gaze_vector[1]
@@ -620,14 +1073,140 @@ class BackendServer:
                         *right_eye   # x, y, z coordinates for right eye
                     ]]
 
-                    predicted_coords = self._regressor.make_prediction(gaze_input)
+                    with controller.stage('regression'):
+                        predicted_coords = self._regressor.make_prediction(gaze_input)
                     x, y = predicted_coords[0]  # Extract x,y from nested array
                     x = int(x)
                     y = int(y)
                     timestamp = round(time.time() - self._start_time, 3)
-                    self._gaze_writer.write(timestamp, [x, y])
+                    with controller.stage('write'):
+                        self._gaze_writer.write(timestamp, [x, y])
+                controller.end_frame(self._eye_gaze)
                 if not self._data_collection_active:
                     break
+            if self._gaze_writer:
+                self._gaze_writer.close_file()
+
+    def set_gaze_rate(self, target_fps=None, overload_policy=None):
+        """
+        Update the pacing of the gaze loops.
+
+        Args:
+            target_fps (float): Target rate of the gaze loops, 0 disables the pacing
+            overload_policy (str): 'drop' to skip frames or 'downscale' to lower the processing resolution when the
+                loop cannot keep up
+        """
+        try:
+            self._gaze_loop_controller.configure(target_fps, overload_policy)
+            return {"status": STATUS_SUCCESS, "message": "Gaze rate updated"}
+        except ValueError as e:
+            return {"status": STATUS_ERROR, "message": str(e)}
+
+    def set_regressor_backend(self, backend):
+        """
+        Select the model trained for the gaze calibration.
+
+        Args:
+            backend (str): 'keras', 'ridge' or 'mlp'
+        """
+        if backend not in REGRESSOR_BACKENDS:
+            return {"status": STATUS_ERROR, "message": f"Unknown regressor backend: {backend}"}
+        self._regressor_backend = backend
+        return {"status": STATUS_SUCCESS, "message": f"Regressor backend updated to {backend}"}
+
+    def set_storage_format(self, storage_format):
+        """
+        Select the file format of the collected session signals. The calibration files are always csv.
+
+        Args:
+            storage_format (str): 'csv' or 'binary'
+        """
+        if storage_format not in STORAGE_FORMATS:
+            return {"status": STATUS_ERROR, "message": f"Unknown storage format: {storage_format}"}
+        self._storage_format = storage_format
+        return {"status": STATUS_SUCCESS, "message": f"Storage format updated to {storage_format}"}
+
+    def list_aura_streams(self, timeout=1.0):
+        """
+        List the LSL streams available on the network so the frontend can select the ones to record.
+
+        Args:
+            timeout (float): The time in seconds spent resolving the streams
+        """
+        try:
+            return {"status": STATUS_SUCCESS, "streams": self._aura_streams.discover(float(timeout)),
+                    "selected": self._aura_stream_ids}
+        except Exception as e:
+            return {"status": STATUS_ERROR, "message": str(e)}
+
+    def select_aura_streams(self, source_ids):
+        """
+        Select the Aura streams recorded by the next collection, each one with its own writer and acquisition thread.
+        The first stream writes the usual Aura files and the others add their source_id to the file names.
+
+        Args:
+            source_ids (list): The LSL source_ids of the streams
+        """
+        if isinstance(source_ids, str):
+            source_ids = [source_ids]
+        if not source_ids or len(set(source_ids)) != len(source_ids):
+            return {"status": STATUS_ERROR, "message": "Select at least one stream, each one only once"}
+        if self._data_collection_active or self._training_data_collection_active:
+            return {"status": STATUS_ERROR, "message": "The streams cannot be changed during a collection"}
+        self._aura_stream_ids = list(source_ids)
+        return {"status": STATUS_SUCCESS, "message": f"Aura streams updated to {', '.join(source_ids)}"}
+
+    def set_emotion_output(self, smoothing=None, output_rate=None):
+        """
+        Configure the emotion file of the next collection. Values left as None are not changed.
+
+        Args:
+            smoothing (str): 'ema', 'hmm' or 'none'
+            output_rate (float): Rows per second, 0 writes a row for each prediction
+        """
+        if smoothing is not None and smoothing not in SMOOTHING_METHODS:
+            return {"status": STATUS_ERROR, "message": f"Unknown smoothing method: {smoothing}"}
+        if output_rate is not None:
+            try:
+                output_rate = float(output_rate)
+            except (TypeError, ValueError):
+                return {"status": STATUS_ERROR, "message": f"Invalid output rate: {output_rate}"}
+            if output_rate < 0:
+                return {"status": STATUS_ERROR, "message": "The output rate cannot be negative"}
+            self._emotion_output_rate = output_rate
+        if smoothing is not None:
+            self._emotion_smoothing = smoothing
+        return {"status": STATUS_SUCCESS, "message": "Emotion output updated"}
+
+    def set_aura_poll_interval(self, interval):
+        """
+        Set the time between two reads of the Aura stream, used by the next acquisition loop.
+
+        Args:
+            interval (float): The poll interval in seconds
+        """
+        try:
+            interval = float(interval)
+        except (TypeError, ValueError):
+            return {"status": STATUS_ERROR, "message": f"Invalid poll interval: {interval}"}
+        if interval <= 0:
+            return {"status": STATUS_ERROR, "message": "The poll interval must be positive"}
+        self._aura_poll_interval = interval
+        return {"status": STATUS_SUCCESS, "message": f"Aura poll interval updated to {interval} s"}
+
+    def get_stats(self):
+        """
+        Report the effective rate, dropped frames and per-stage latency of the gaze loop, and the sample counters of
+        the last Aura acquisition.
+        """
+        stats = {SIGNAL_GAZE: self._gaze_loop_controller.get_stats()}
+        if self._emotion_pool is not None:
+            stats[SIGNAL_EMOTION] = {**self._emotion_pool.get_stats(), 'model_status': self._emotion_model_status,
+                                     'first_sample_latency': self._emotion_first_sample_latency}
+        if self._aura_acquisitions:
+            stats[SIGNAL_AURA] = {source_id: acquisition.get_stats()
+                                  for source_id, acquisition in self._aura_acquisitions.items()}
+        return {"status": STATUS_SUCCESS, "stats": stats}
 
     def update_coordinates(self, x, y):
         """
@@ -686,6 +1265,7 @@ class BackendServer:
                 self._eye_gaze.stop_processing()
             if self._emotion_handler:
                 self._emotion_handler.stop_processing()
+            self._stop_frame_broker()
             
             return {"status": STATUS_SUCCESS, "message": "New participant started"}
         except Exception as e:
@@ -751,7 +1331,7 @@ class BackendServer:
     
     def _get_data_files(self):
         """
-        Retrieve the list of data files to be uploaded.
+        Retrieve the list of data files to be uploaded. Files collected in the binary format are converted to csv first.
         """
         suffixes = [
             AURA_FILE_SUFFIX,
@@ -762,6 +1342,10 @@ class BackendServer:
         files = []
         for suffix in suffixes:
             file_path = os.path.join(self._path, f"{self._filename}{suffix}")
+            binary_path = storage_path(file_path, STORAGE_FORMAT_BINARY)
+            if os.path.exists(binary_path) and (not os.path.exists(file_path) or
+                                                os.path.getmtime(binary_path) > os.path.getmtime(file_path)):
+                file_path = convert_binary_to_csv(binary_path, file_path)
             if os.path.exists(file_path):
                 files.append(file_path)
             else:
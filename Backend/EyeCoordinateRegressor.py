@@ -1,35 +1,74 @@
+import hashlib
+import os
+import pickle
+
 import numpy as np
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Input
-from tensorflow.keras.callbacks import EarlyStopping
-from tensorflow.keras.layers import Dropout
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 
-import pandas as pd
+from IO.FileWriting.SessionStorage import load_dataframe
+
+# TensorFlow takes seconds to import, so it is only loaded when the keras backend is trained.
+REGRESSOR_BACKEND_KERAS = 'keras'
+REGRESSOR_BACKEND_RIDGE = 'ridge'
+REGRESSOR_BACKEND_MLP = 'mlp'
+REGRESSOR_BACKENDS = (REGRESSOR_BACKEND_KERAS, REGRESSOR_BACKEND_RIDGE, REGRESSOR_BACKEND_MLP)
+
+RIDGE_POLYNOMIAL_DEGREE = 3
+RIDGE_ALPHA = 1e-3
+
+KERAS_MODEL_SUFFIX = '.keras'
+
+
+def compute_file_hash(path):
+    """
+    Computes the SHA-256 hash of the content of a file, used to know if a saved model was trained on the current data.
+    :param path: The path of the file.
+    :return: The hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
 
 class PositionRegressor:
     """
     Class to train a neural network to predict the eye position based on the eye gaze vector.
     The backend of the neural network is a feedforward neural network with 3 hidden layers. Using TensorFlow and Keras.
+    Lighter backends that train in a fraction of a second are also available: a ridge regression on polynomial features
+    and a small scikit-learn MLP.
     For training the network, the data has to be loaded from a csv file with the following columns:
     """
-    def __init__(self, data_path):
+    def __init__(self, data_path, numpy_inference=True, backend=REGRESSOR_BACKEND_KERAS, load_training_data=True):
         """
         Loads the data from the csv file and initializes the scaler for the input and output data.
         these scalers are used to normalize the data before training the neural network. and also normalize the predictions.
         :param data_path:
+        :param numpy_inference: Runs the predictions with the NumPy copy of the trained network instead of Keras.
+        :param backend: The model used for the regression, 'keras', 'ridge' or 'mlp'.
+        :param load_training_data: Loads and scales the csv file, not needed when a saved model is loaded.
         """
+        if backend not in REGRESSOR_BACKENDS:
+            raise ValueError(f"Unknown regressor backend: {backend}")
         self.data_path = data_path
+        self.backend = backend
+        self.numpy_inference = numpy_inference
         self._model = None
+        self._numpy_layers = None
+        # Hash of the training file when it was loaded, stored with the model
+        self._data_hash = None
         self._scaler_X = StandardScaler()
         self._scaler_y = StandardScaler()
-        self.load_data()
+        if load_training_data:
+            self.load_data()
 
     def load_data(self):
         try:
-            data = pd.read_csv(self.data_path)
+            # Hashed when loaded, so the stored hash is the one of the data the model was trained on.
+            self._data_hash = compute_file_hash(self.data_path)
+            data = load_dataframe(self.data_path)
             print(data.shape)
             X = data[['l_x', 'l_y', 'l_z', 'r_x', 'r_y', 'r_z']].values
             y = data[['x', 'y']].values
@@ -47,6 +86,9 @@ class PositionRegressor:
         from the gaze vector.
         :return: The new created and compiled model
         """
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import Dense, Input, Dropout
+
         model = Sequential([
             Input(shape=(6,)),
             Dense(64, activation='relu'),
@@ -59,17 +101,105 @@ class PositionRegressor:
         model.compile(optimizer='adam', loss='mse', metrics=['mae'])
         return model
 
+    def __create_sklearn_model(self):
+        """
+        Creates one of the lightweight scikit-learn models, which train in a fraction of a second on a calibration file.
+        :return: The new created model
+        """
+        if self.backend == REGRESSOR_BACKEND_RIDGE:
+            from sklearn.linear_model import Ridge
+            from sklearn.pipeline import make_pipeline
+            from sklearn.preprocessing import PolynomialFeatures
+            return make_pipeline(PolynomialFeatures(RIDGE_POLYNOMIAL_DEGREE), Ridge(alpha=RIDGE_ALPHA))
+
+        from sklearn.neural_network import MLPRegressor
+        return MLPRegressor(hidden_layer_sizes=(16,), activation='relu', solver='lbfgs', max_iter=300,
+                            random_state=42)
+
     def train_create_model(self):
         """
         Trains the model with the training data and validates it with the test data. The training stops when the validation
         loss does not decrease for 5 epochs. Also stores the best weights of the model. The maximum epochs are set to 100.
-        :return: the trained model and the history of the training.
+        :return: the trained model and the history of the training, the history is None for the scikit-learn backends.
         """
-        self._model = self.__create_model()
-        early_stopping = EarlyStopping(patience=5, restore_best_weights=True)
-        history = self._model.fit(self.X_train, self.y_train, validation_data=(self.X_test, self.y_test), epochs=100, callbacks=[early_stopping])
+        history = None
+        if self.backend == REGRESSOR_BACKEND_KERAS:
+            from tensorflow.keras.callbacks import EarlyStopping
+
+            self._model = self.__create_model()
+            early_stopping = EarlyStopping(patience=5, restore_best_weights=True)
+            history = self._model.fit(self.X_train, self.y_train, validation_data=(self.X_test, self.y_test), epochs=100, callbacks=[early_stopping])
+        else:
+            self._model = self.__create_sklearn_model()
+            self._model.fit(self.X_train, self.y_train)
+
+        # The ridge pipeline is not a layered network, it is always evaluated by scikit-learn.
+        if self.numpy_inference and self.backend != REGRESSOR_BACKEND_RIDGE:
+            self.export_numpy_model()
+            try:
+                self.verify_numpy_model()
+            except AssertionError as e:
+                print(f"{e}, falling back to {self.backend} inference")
+                self._numpy_layers = None
         return self._model, history
 
+    def export_numpy_model(self):
+        """
+        Copies the weights of the trained model into NumPy arrays used for the per frame predictions, which avoids the
+        overhead of a Keras call for such a small network. The input and output scalers are folded into the first and
+        last layers, so a prediction is just a few matrix products on the raw gaze vector. Dropout layers are ignored
+        as they are not active during inference.
+        """
+        if self._model is None:
+            raise RuntimeError("Model not trained yet")
+
+        layers = []
+        if self.backend == REGRESSOR_BACKEND_KERAS:
+            from tensorflow.keras.layers import Dense
+
+            for layer in self._model.layers:
+                if not isinstance(layer, Dense):
+                    continue
+                kernel, bias = layer.get_weights()
+                activation = layer.get_config()['activation']
+                if activation not in ('relu', 'linear'):
+                    raise ValueError(f"Unsupported activation for NumPy inference: {activation}")
+                layers.append([kernel.astype(np.float64), bias.astype(np.float64), activation == 'relu'])
+        elif self.backend == REGRESSOR_BACKEND_MLP:
+            # The hidden layers use relu and the output layer of MLPRegressor is always linear.
+            hidden_layers = len(self._model.coefs_) - 1
+            for i, (kernel, bias) in enumerate(zip(self._model.coefs_, self._model.intercepts_)):
+                layers.append([kernel.astype(np.float64), bias.astype(np.float64), i < hidden_layers])
+        else:
+            raise ValueError(f"The {self.backend} backend cannot be exported to NumPy")
+
+        # (x - mean) / scale @ W + b == x @ (W / scale) + (b - (mean / scale) @ W)
+        first_kernel, first_bias, _ = layers[0]
+        layers[0][0] = first_kernel / self._scaler_X.scale_[:, np.newaxis]
+        layers[0][1] = first_bias - (self._scaler_X.mean_ / self._scaler_X.scale_) @ first_kernel
+
+        # (x @ W + b) * scale + mean == x @ (W * scale) + (b * scale + mean)
+        last_kernel, last_bias, _ = layers[-1]
+        layers[-1][0] = last_kernel * self._scaler_y.scale_
+        layers[-1][1] = last_bias * self._scaler_y.scale_ + self._scaler_y.mean_
+
+        self._numpy_layers = [tuple(layer) for layer in layers]
+
+    def verify_numpy_model(self, tolerance=1e-2):
+        """
+        Checks that the NumPy inference matches the trained model on the test data.
+        :param tolerance: The maximum absolute difference allowed, in screen pixels.
+        :return: The maximum absolute difference between both predictions.
+        """
+        if self._numpy_layers is None:
+            raise RuntimeError("NumPy model not exported yet")
+        raw_inputs = self._scaler_X.inverse_transform(self.X_test)
+        model_prediction = self._scaler_y.inverse_transform(self.__predict_scaled(self.X_test))
+        difference = np.max(np.abs(self.__forward(raw_inputs) - model_prediction))
+        if difference > tolerance:
+            raise AssertionError(f"NumPy inference differs from the {self.backend} model by {difference}")
+        return difference
+
     def make_prediction(self, data):
         """
         If the model is already created, makes a prediction with the given data. The data has to be a list of lists with
@@ -77,14 +207,111 @@ class PositionRegressor:
         :param data: The data from the gaze vector.
         :return: The predicted x and y coordinates of the screen.
         """
-        if self._model is None:
+        if self._model is None and self._numpy_layers is None:
             raise RuntimeError("Model not trained yet")
 
         # if len(data.shape) == 1:
         #     data = np.array([data])
         #     data = data.reshape(1, -1)
 
+        if self.numpy_inference and self._numpy_layers is not None:
+            return self.__forward(data)
+
         data = self._scaler_X.transform(data)
-        prediction = self._model.predict(data, verbose=0)
+        prediction = self.__predict_scaled(data)
         predicted_original = self._scaler_y.inverse_transform(prediction)
         return predicted_original
+
+    def save_model(self, model_path):
+        """
+        Stores the scalers and the trained weights so the calibration can be reused after a restart. The hash of the
+        training file is stored along with them, so the model is only reused while the training data is unchanged.
+        Networks exported to NumPy are stored as arrays and do not need TensorFlow to be loaded again.
+        :param model_path: The path of the file where the model is stored.
+        """
+        if self._model is None:
+            raise RuntimeError("Model not trained yet")
+
+        state = {
+            'data_hash': self._data_hash or compute_file_hash(self.data_path),
+            'backend': self.backend,
+            'scaler_X': self._scaler_X,
+            'scaler_y': self._scaler_y,
+            'numpy_layers': self._numpy_layers,
+            'sklearn_model': None,
+            'keras_model_path': None
+        }
+        if self.backend != REGRESSOR_BACKEND_KERAS:
+            state['sklearn_model'] = self._model
+        elif self._numpy_layers is None:
+            state['keras_model_path'] = os.path.splitext(model_path)[0] + KERAS_MODEL_SUFFIX
+            self._model.save(state['keras_model_path'])
+
+        # Written to a temporary file first so an interrupted save never leaves a truncated model behind.
+        temporary_path = model_path + '.tmp'
+        with open(temporary_path, 'wb') as file:
+            pickle.dump(state, file)
+        os.replace(temporary_path, model_path)
+
+    @classmethod
+    def load_model(cls, data_path, model_path, backend=REGRESSOR_BACKEND_KERAS):
+        """
+        Loads a model stored with save_model if it was trained with the given backend on the current content of the
+        training file.
+        :param data_path: The path of the training csv file.
+        :param model_path: The path of the stored model.
+        :param backend: The backend the model must have been trained with.
+        :return: A ready to use regressor, or None if there is no valid stored model.
+        """
+        if not os.path.exists(model_path) or not os.path.exists(data_path):
+            return None
+        try:
+            with open(model_path, 'rb') as file:
+                state = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"Error loading saved gaze model: {e}")
+            return None
+        if state['backend'] != backend or state['data_hash'] != compute_file_hash(data_path):
+            return None
+
+        regressor = cls(data_path, numpy_inference=state['numpy_layers'] is not None, backend=backend,
+                        load_training_data=False)
+        regressor._scaler_X = state['scaler_X']
+        regressor._scaler_y = state['scaler_y']
+        regressor._numpy_layers = state['numpy_layers']
+        regressor._data_hash = state['data_hash']
+        if state['keras_model_path'] is not None:
+            if not os.path.exists(state['keras_model_path']):
+                return None
+            from tensorflow.keras.models import load_model
+            try:
+                regressor._model = load_model(state['keras_model_path'])
+            except Exception as e:
+                print(f"Error loading saved gaze model: {e}")
+                return None
+        else:
+            regressor._model = state['sklearn_model']
+        return regressor
+
+    def __predict_scaled(self, data):
+        """
+        Runs the trained model on scaled inputs.
+        :param data: The scaled gaze vectors, one per row.
+        :return: The scaled predictions.
+        """
+        if self.backend == REGRESSOR_BACKEND_KERAS:
+            return self._model.predict(data, verbose=0)
+        return self._model.predict(data)
+
+    def __forward(self, data):
+        """
+        Runs the exported network with NumPy on unscaled gaze vectors.
+        :param data: The gaze vectors, one per row.
+        :return: The predicted x and y coordinates of the screen.
+        """
+        output = np.asarray(data, dtype=np.float64)
+        for kernel, bias, relu in self._numpy_layers:
+            output = output @ kernel + bias
+            if relu:
+                np.maximum(output, 0, out=output)
+        return output
@@ -23,19 +23,29 @@ obtain real-time gaze vector data for further processing or analysis.
 import sys
 import os
 import time
+from typing import TYPE_CHECKING
 
-from IO.EyeTracking.LaserGaze.GazeProcessor import GazeProcessor
+if TYPE_CHECKING:
+    from IO.EyeTracking.LaserGaze.GazeProcessor import GazeProcessor
 
-def create_new_eye_gaze() -> GazeProcessor:
+def create_new_eye_gaze(source=0, frame_source=None) -> 'GazeProcessor':
     """
     Attempts to create a working instance of the GazeProcessor class. If the instance cannot be created, it will retry
     until it is successful. To achieve this, the object will be deleted and recreated if the gaze data is not valid.
-    This function can take a while to complete, as it waits for the gaze data to be valid.
+    This function can take a while to complete, as it waits for the gaze data to be valid. Each call to
+    get_gaze_vector blocks until the capture thread publishes a new frame, so the loop does not spin on the camera.
+    :param source: The camera index or the path of a video file.
+    :param frame_source: Optional shared frame source, such as a FrameBroker subscription, used instead of source.
     """
-    gaze_processor = GazeProcessor()
+    # MediaPipe is imported on first use so the backend starts without loading it when gaze is disabled.
+    from IO.EyeTracking.LaserGaze.GazeProcessor import GazeProcessor
+
+    gaze_processor = GazeProcessor(source, frame_source=frame_source)
     gaze_processor.start()
 
     while True:
+        if not gaze_processor.is_running:
+            raise RuntimeError("The video source could not be opened or ended before the gaze data was valid.")
         gaze_data = gaze_processor.get_gaze_vector()
         if gaze_data[0] is not None and gaze_data[1] is not None:
             return gaze_processor
@@ -0,0 +1,178 @@
+"""
+GazeLoopController.py
+
+This module paces the gaze collection loops of the backend server and keeps statistics about them. Without pacing the
+loops run as fast as the landmark detection returns, and when the detection falls behind the camera the latency grows
+without bound.
+
+The controller sleeps at the end of each iteration to hold a target rate. When an iteration takes longer than the
+frame period the loop is overloaded and the configured policy is applied:
+- 'drop': The loop keeps going at full resolution. The capture thread only keeps the latest frame, so the frames that
+  arrive while the loop is busy are dropped.
+- 'downscale': The processing resolution of the GazeProcessor is lowered step by step until the loop keeps up, and
+  raised again when there is enough headroom.
+
+Classes:
+- GazeLoopController: Paces a loop and exposes its effective rate, dropped frames and per-stage latency.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+OVERLOAD_POLICY_DROP = 'drop'
+OVERLOAD_POLICY_DOWNSCALE = 'downscale'
+OVERLOAD_POLICIES = (OVERLOAD_POLICY_DROP, OVERLOAD_POLICY_DOWNSCALE)
+
+DEFAULT_TARGET_FPS = 30
+MIN_PROCESSING_SCALE = 0.5
+SCALE_STEP = 0.1
+# The resolution is only raised again when the loop uses less than this fraction of the frame period.
+UPSCALE_HEADROOM = 0.6
+# Smoothing factor of the exponential moving averages used for the statistics.
+SMOOTHING = 0.1
+
+
+class GazeLoopController:
+    """
+    Paces a gaze collection loop to a target rate and applies an overload policy when it cannot keep up.
+    """
+
+    def __init__(self, target_fps=DEFAULT_TARGET_FPS, overload_policy=OVERLOAD_POLICY_DROP):
+        """
+        Args:
+            target_fps (float): The rate the loop should run at. 0 or None disables the pacing.
+            overload_policy (str): 'drop' or 'downscale'.
+        """
+        self._lock = threading.Lock()
+        self._target_fps = None
+        self._frame_period = 0
+        self._overload_policy = None
+        self.configure(target_fps, overload_policy)
+        self.reset()
+
+    def configure(self, target_fps=None, overload_policy=None):
+        """
+        Updates the target rate and the overload policy. Values left as None are not changed.
+
+        Args:
+            target_fps (float): The rate the loop should run at, 0 disables the pacing.
+            overload_policy (str): 'drop' or 'downscale'.
+        """
+        if overload_policy is not None:
+            if overload_policy not in OVERLOAD_POLICIES:
+                raise ValueError(f"Unknown overload policy: {overload_policy}")
+            self._overload_policy = overload_policy
+        if target_fps is not None:
+            target_fps = float(target_fps)
+            if target_fps < 0:
+                raise ValueError("The target rate cannot be negative.")
+            self._target_fps = target_fps
+            self._frame_period = 1.0 / target_fps if target_fps > 0 else 0
+
+    def reset(self):
+        """Clears the statistics, called when a new loop starts."""
+        with self._lock:
+            self._frame_start = None
+            self._last_frame_end = None
+            self._frame_interval = 0.0
+            self._processed_frames = 0
+            self._overloaded_frames = 0
+            self._dropped_frames = 0
+            self._processing_scale = 1.0
+            self._stage_latencies = {}
+
+    def begin_frame(self):
+        """Marks the start of a loop iteration."""
+        self._frame_start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measures the time spent in a stage of the loop that is not part of the GazeProcessor, such as the regression
+        or the file writing.
+
+        Args:
+            name (str): The name under which the latency is reported.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record_latency(name, time.perf_counter() - start)
+
+    def end_frame(self, gaze_processor):
+        """
+        Marks the end of a loop iteration, collects the stage latencies of the gaze processor, applies the overload
+        policy and sleeps for the rest of the frame period.
+
+        Args:
+            gaze_processor: The GazeProcessor used in the iteration.
+        """
+        now = time.perf_counter()
+        busy_time = now - self._frame_start
+        for name, latency in gaze_processor.stage_latencies.items():
+            self._record_latency(name, latency)
+
+        with self._lock:
+            self._processed_frames += 1
+            self._dropped_frames = gaze_processor.dropped_frames
+            if self._last_frame_end is not None:
+                interval = now - self._last_frame_end
+                if self._frame_interval:
+                    self._frame_interval += SMOOTHING * (interval - self._frame_interval)
+                else:
+                    self._frame_interval = interval
+
+        # The time waiting for the camera is not load, only the processing time is compared to the frame period.
+        processing_time = busy_time - gaze_processor.stage_latencies.get('capture', 0.0)
+        if self._overload_policy == OVERLOAD_POLICY_DROP and gaze_processor.processing_scale < 1.0:
+            # The policy was switched while the resolution was lowered.
+            self._set_scale(gaze_processor, 1.0)
+        if self._frame_period:
+            if processing_time > self._frame_period:
+                with self._lock:
+                    self._overloaded_frames += 1
+                if self._overload_policy == OVERLOAD_POLICY_DOWNSCALE:
+                    self._set_scale(gaze_processor, gaze_processor.processing_scale - SCALE_STEP)
+            elif (self._overload_policy == OVERLOAD_POLICY_DOWNSCALE and
+                  processing_time < self._frame_period * UPSCALE_HEADROOM):
+                self._set_scale(gaze_processor, gaze_processor.processing_scale + SCALE_STEP)
+
+            delay = self._frame_period - busy_time
+            if delay > 0:
+                time.sleep(delay)
+        self._last_frame_end = now
+
+    def get_stats(self):
+        """
+        Returns a snapshot of the loop statistics.
+
+        Returns:
+            dict: Target and effective rate, processed, dropped and overloaded frame counts, current processing scale
+            and the smoothed latency of each stage in milliseconds.
+        """
+        with self._lock:
+            return {
+                "target_fps": self._target_fps,
+                "effective_fps": round(1.0 / self._frame_interval, 2) if self._frame_interval else 0.0,
+                "overload_policy": self._overload_policy,
+                "processed_frames": self._processed_frames,
+                "dropped_frames": self._dropped_frames,
+                "overloaded_frames": self._overloaded_frames,
+                "processing_scale": round(self._processing_scale, 2),
+                "latency_ms": {name: round(latency * 1000, 3) for name, latency in self._stage_latencies.items()}
+            }
+
+    def _record_latency(self, name, latency):
+        """Updates the moving average of a stage latency."""
+        with self._lock:
+            previous = self._stage_latencies.get(name)
+            self._stage_latencies[name] = latency if previous is None else previous + SMOOTHING * (latency - previous)
+
+    def _set_scale(self, gaze_processor, scale):
+        """Applies a processing scale clamped to the allowed range."""
+        scale = min(1.0, max(MIN_PROCESSING_SCALE, scale))
+        if scale != gaze_processor.processing_scale:
+            gaze_processor.processing_scale = scale
+        with self._lock:
+            self._processing_scale = scale
@@ -0,0 +1,81 @@
+"""
+AuraAcquisitionBenchmark.py
+
+Replays a synthetic 8 channel recording at 500 Hz with an mne_lsl PlayerLSL and reads it with AuraAcquisition, as the
+collection loop does. The first channel holds the index of each sample, so the samples read can be checked exactly:
+the script reports the samples read, the duplicates and the gaps against the indexes, the counters of the acquisition
+and the CPU used by the reading thread.
+
+Usage:
+    python -m Benchmarks.AuraAcquisitionBenchmark --seconds 60 --interval 0.05
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from IO.SignalProcessing.AuraAcquisition import AuraAcquisition, DEFAULT_POLL_INTERVAL
+
+RATE = 500
+CHANNELS = ['F3', 'F4', 'Cz', 'C3', 'Pz', 'C4', 'P3', 'P4']
+SOURCE_ID = 'aura_acquisition_benchmark'
+CHUNK_SAMPLES = 10
+
+
+def create_recording(folder, seconds):
+    """
+    Writes a recording whose first channel is the sample index, longer than the benchmark so the player does not loop.
+    :return: The path of the recording.
+    """
+    import mne
+
+    samples = int((seconds + 10) * RATE)
+    data = np.random.default_rng(0).normal(scale=1e-5, size=(len(CHANNELS), samples))
+    data[0] = np.arange(samples)
+    info = mne.create_info(CHANNELS, RATE, 'misc')
+    path = os.path.join(folder, 'synthetic_raw.fif')
+    mne.io.RawArray(data, info, verbose=False).save(path, verbose=False)
+    return path
+
+
+def run(seconds, interval):
+    """
+    Reads the replayed recording for a number of seconds.
+    :return: The indexes of the samples read, the acquisition counters and the fraction of one core used.
+    """
+    from mne_lsl.player import PlayerLSL
+    from mne_lsl.stream import StreamLSL
+
+    with tempfile.TemporaryDirectory() as folder:
+        fname = create_recording(folder, seconds)
+        with PlayerLSL(fname, chunk_size=CHUNK_SAMPLES, source_id=SOURCE_ID):
+            stream = StreamLSL(bufsize=5, source_id=SOURCE_ID)
+            stream.connect()
+            acquisition = AuraAcquisition(stream, interval)
+            indexes = []
+            start_wall = time.time()
+            start_cpu = time.thread_time()
+            while time.time() - start_wall < seconds:
+                data, _ = acquisition.read_new()
+                indexes.append(data[0])
+                acquisition.wait()
+            cpu_fraction = (time.thread_time() - start_cpu) / seconds
+            stream.disconnect()
+    return np.concatenate(indexes), acquisition.get_stats(), cpu_fraction
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Validates the Aura acquisition against a PlayerLSL replay.')
+    parser.add_argument('--seconds', type=float, default=60.0, help='Duration of the replay.')
+    parser.add_argument('--interval', type=float, default=DEFAULT_POLL_INTERVAL, help='Poll interval in seconds.')
+    args = parser.parse_args()
+
+    read, stats, fraction = run(args.seconds, args.interval)
+    read = np.round(read).astype(np.int64)
+    expected = read[-1] - read[0] + 1 if len(read) else 0
+    print(f"samples read {len(read)}   expected {expected}   duplicates {len(read) - len(np.unique(read))}   "
+          f"missing {expected - len(np.unique(read))}")
+    print(f"counters {stats}")
+    print(f"reading thread {fraction * 100:.3f} % of one core")
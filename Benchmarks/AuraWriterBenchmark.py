@@ -0,0 +1,59 @@
+"""
+AuraWriterBenchmark.py
+
+Measures the throughput of AuraDataWriter.write_data for a 40 channel stream sampled at 250 Hz, comparing the block
+formatting of the writer with the previous loop that wrote one np.append row per sample. The data is written in chunks
+of different sizes, from the few samples returned by a fast polling loop to one second of data.
+
+Usage:
+    python -m Benchmarks.AuraWriterBenchmark
+"""
+import tempfile
+import time
+
+import numpy as np
+
+from IO.FileWriting.AuraDataWriter import AuraDataWriter
+
+SAMPLING_RATE = 250
+CHANNELS = 40
+DURATION = 60
+CHUNK_SIZES = (5, 25, 250)
+
+
+def write_per_sample(writer, timestamp, data):
+    """
+    The previous implementation of write_data, one row per sample.
+    """
+    for i in range(len(data)):
+        writer._write_row(np.append(timestamp[i], data[i]))
+
+
+def time_chunks(writer, write, chunk_size):
+    """
+    Writes DURATION seconds of synthetic data in chunks as returned by the stream, channels first.
+    :return: The samples written per second.
+    """
+    samples = SAMPLING_RATE * DURATION
+    rng = np.random.default_rng(0)
+    timestamps = np.round(np.arange(samples) / SAMPLING_RATE, 3)
+    data = rng.normal(scale=50, size=(CHANNELS, samples))
+
+    writer.create_new_file()
+    start = time.perf_counter()
+    for offset in range(0, samples, chunk_size):
+        write(timestamps[offset:offset + chunk_size], data[:, offset:offset + chunk_size])
+    writer.close_file()
+    return samples / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    channels = ['timestamp'] + [f'ch_{i}' for i in range(CHANNELS)]
+    with tempfile.TemporaryDirectory() as folder:
+        writer = AuraDataWriter(folder, 'aura.csv', channels)
+        print(f"{SAMPLING_RATE} Hz x {CHANNELS} channels, real time needs {SAMPLING_RATE} samples/s")
+        for chunk_size in CHUNK_SIZES:
+            per_sample = time_chunks(writer, lambda ts, d: write_per_sample(writer, ts, np.transpose(d)), chunk_size)
+            block = time_chunks(writer, writer.write_data, chunk_size)
+            print(f"chunk {chunk_size:4d}   per sample {per_sample:9.0f} samples/s   "
+                  f"block {block:9.0f} samples/s   x{block / per_sample:.1f}")
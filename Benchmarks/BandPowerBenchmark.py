@@ -0,0 +1,127 @@
+"""
+BandPowerBenchmark.py
+
+Measures the CPU used by BandPowerEstimator on a raw 8 channel signal at 500 Hz, fed in small chunks as the collection
+loop does, and compares its last estimate with scipy.signal.welch over the same window when scipy is available.
+
+With --player, the samples come from a recording replayed by an mne_lsl PlayerLSL and are read from a StreamLSL with
+estimate_new_samples, which tests the estimator on a real stream. The recording must have the 8 Aura electrodes.
+
+Usage:
+    python -m Benchmarks.BandPowerBenchmark --seconds 600
+    python -m Benchmarks.BandPowerBenchmark --player recording.fif --seconds 60
+"""
+import argparse
+import time
+
+import numpy as np
+
+from IO.SignalProcessing.BandPowerEstimator import BANDS, ELECTRODES, WAVES, BandPowerEstimator
+
+RATE = 500
+CHUNK_SAMPLES = 10
+SOURCE_ID = 'band_power_benchmark'
+
+
+def run_synthetic(seconds):
+    """
+    Feeds noise with a 10 Hz component to the estimator.
+    :return: The fraction of one core used and the largest difference with scipy, or None without scipy.
+    """
+    rng = np.random.default_rng(0)
+    samples = int(seconds * RATE)
+    times = np.arange(samples) / RATE
+    data = rng.normal(size=(len(ELECTRODES), samples)) + np.sin(2 * np.pi * 10 * times)
+    estimator = BandPowerEstimator(RATE, ELECTRODES)
+
+    start = time.process_time()
+    last_time, last_powers = None, None
+    for first in range(0, samples, CHUNK_SAMPLES):
+        power_times, powers = estimator.push(data[:, first:first + CHUNK_SAMPLES], times[first:first + CHUNK_SAMPLES])
+        if len(power_times):
+            last_time, last_powers = power_times[-1], powers[-1]
+    cpu_fraction = (time.process_time() - start) / seconds
+    return cpu_fraction, compare_with_welch(data, last_time, last_powers)
+
+
+def compare_with_welch(data, last_time, last_powers):
+    """
+    Computes the band powers of the last window with scipy.signal.welch.
+    :return: The largest relative difference with the estimator, or None without scipy.
+    """
+    try:
+        from scipy.signal import welch
+    except ImportError:
+        return None
+    end = int(round(last_time * RATE)) + 1
+    window = data[:, end - 2 * RATE:end]
+    frequencies, psd = welch(window, fs=RATE, nperseg=RATE, noverlap=RATE - RATE // 4)
+    resolution = frequencies[1] - frequencies[0]
+    expected = np.array([psd[:, (frequencies >= low) & (frequencies < high)].sum(axis=1) * resolution
+                         for low, high in BANDS.values()]).ravel()
+    return np.max(np.abs(last_powers - expected) / expected)
+
+
+def estimate_new_samples(stream, estimator, last_timestamp=None):
+    """
+    Reads the samples that arrived in an mne_lsl StreamLSL since the last call and feeds them to the estimator. Only the
+    new samples are requested from the stream buffer, instead of copying the whole buffer every time.
+    :param stream: The connected StreamLSL of the raw signal.
+    :param estimator: The BandPowerEstimator of the stream.
+    :param last_timestamp: The timestamp of the last sample already given to the estimator.
+    :return: A tuple with the timestamps and the band powers of the completed estimates, and the new last timestamp.
+    """
+    n_new = stream.n_new_samples
+    if n_new == 0:
+        return np.empty(0), np.empty((0, len(WAVES) * len(ELECTRODES))), last_timestamp
+    data, timestamps = stream.get_data(winsize=n_new / stream.info['sfreq'])
+    if last_timestamp is not None:
+        # The window is computed from the sampling rate, it may include samples already processed.
+        new = timestamps > last_timestamp
+        data, timestamps = data[:, new], timestamps[new]
+    if len(timestamps) == 0:
+        return np.empty(0), np.empty((0, len(WAVES) * len(ELECTRODES))), last_timestamp
+    estimate_times, powers = estimator.push(data, timestamps)
+    return estimate_times, powers, timestamps[-1]
+
+
+def run_player(fname, seconds):
+    """
+    Replays a recording with PlayerLSL and estimates the band powers of the stream.
+    :return: The fraction of one core used and the number of estimates.
+    """
+    from mne_lsl.player import PlayerLSL
+    from mne_lsl.stream import StreamLSL
+
+    with PlayerLSL(fname, chunk_size=CHUNK_SAMPLES, source_id=SOURCE_ID) as player:
+        stream = StreamLSL(bufsize=5, source_id=SOURCE_ID)
+        stream.connect()
+        stream.pick(ELECTRODES)
+        estimator = BandPowerEstimator(stream.info['sfreq'], stream.info['ch_names'])
+        last_timestamp = None
+        estimates = 0
+        start_wall = time.time()
+        start_cpu = time.process_time()
+        while time.time() - start_wall < seconds:
+            power_times, _, last_timestamp = estimate_new_samples(stream, estimator, last_timestamp)
+            estimates += len(power_times)
+            time.sleep(0.01)
+        cpu_fraction = (time.process_time() - start_cpu) / seconds
+        stream.disconnect()
+    return cpu_fraction, estimates
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the online band power estimation.')
+    parser.add_argument('--seconds', type=float, default=600.0, help='Length of the signal in seconds.')
+    parser.add_argument('--player', default=None, help='A recording replayed with PlayerLSL instead of noise.')
+    args = parser.parse_args()
+
+    if args.player:
+        fraction, count = run_player(args.player, args.seconds)
+        print(f"player     {fraction * 100:6.3f} % of one core   {count} estimates")
+    else:
+        fraction, difference = run_synthetic(args.seconds)
+        print(f"synthetic  {fraction * 100:6.3f} % of one core")
+        if difference is not None:
+            print(f"largest relative difference with scipy welch: {difference:.2e}")
@@ -0,0 +1,73 @@
+"""
+ConcentrationBenchmark.py
+
+Measures process_concentration_data on a synthetic 40 channel Aura power session, 8 hours long by default. The session
+file is written once in the binary format and processed with each normalization, reporting the rows per second and
+the peak memory of the process, which should stay flat however long the session is.
+
+Usage:
+    python -m Benchmarks.ConcentrationBenchmark --hours 8 --rate 250
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+
+from DataProcessing.ProcessAuraData import NORMALIZATIONS, process_concentration_data
+from IO.FileWriting.AuraDataWriter import AuraDataWriter
+from IO.FileWriting.SessionStorage import STORAGE_FORMAT_BINARY
+
+CHUNK_SECONDS = 60
+# Same layout as rename_40_channels, which is not imported since AuraTools needs mne_lsl.
+WAVES = ['Delta', 'Theta', 'Alpha', 'Beta', 'Gamma']
+ELECTRODES = ['F3', 'F4', 'Cz', 'C3', 'C4', 'Pz', 'P3', 'P4']
+
+
+def create_session_file(folder, hours, rate):
+    """
+    Writes a synthetic session with the channel names of the 40 channel power stream.
+    :return: The path of the file.
+    """
+    channels = ['timestamp'] + [f'{wave}_{electrode}' for wave in WAVES for electrode in ELECTRODES]
+    writer = AuraDataWriter(folder, 'synthetic_aura.csv', channels, storage_format=STORAGE_FORMAT_BINARY)
+    writer.create_new_file()
+    rng = np.random.default_rng(0)
+    samples = int(hours * 3600 * rate)
+    chunk = int(CHUNK_SECONDS * rate)
+    for start in range(0, samples, chunk):
+        count = min(chunk, samples - start)
+        timestamps = (start + np.arange(count)) / rate
+        writer.write_data(timestamps, rng.gamma(2.0, 5.0, size=(count, 40)))
+    writer.close_file()
+    return writer.path
+
+
+def peak_memory_mib():
+    """
+    :return: The peak resident memory of the process in MiB.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the concentration processing of a long session.')
+    parser.add_argument('--hours', type=float, default=8.0, help='Length of the synthetic session.')
+    parser.add_argument('--rate', type=float, default=250.0, help='Rate of the synthetic session in Hz.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        session = create_session_file(folder, args.hours, args.rate)
+        print(f"{args.hours} h x {args.rate} Hz x 40 channels: {os.path.getsize(session) / 2 ** 30:.2f} GiB written "
+              f"in {time.perf_counter() - start:.1f} s, peak memory {peak_memory_mib():.0f} MiB")
+        for normalization in NORMALIZATIONS:
+            output = os.path.join(folder, f'concentration_{normalization}.bin')
+            start = time.perf_counter()
+            rows = process_concentration_data(session, output, normalization=normalization)
+            elapsed = time.perf_counter() - start
+            print(f"{normalization:<12} {rows / elapsed:10.0f} rows/s   {elapsed:6.1f} s   "
+                  f"peak memory {peak_memory_mib():.0f} MiB")
+            os.remove(output)
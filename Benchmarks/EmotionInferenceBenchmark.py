@@ -0,0 +1,63 @@
+"""
+EmotionInferenceBenchmark.py
+
+Measures the faces per second predicted by EmotionInferencePool with an increasing number of worker processes. The
+faces are submitted as fast as the pool takes them without dropping any, so the figure is the throughput of the
+workers. The workers are started and their model built before the measure.
+
+Usage:
+    python -m Benchmarks.EmotionInferenceBenchmark --faces 2000 --batch-size 8
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from IO.VideoProcessing.EmotionInferencePool import EmotionInferencePool, DEFAULT_BATCH_SIZE
+from IO.VideoProcessing.EmotionRecognizer import EMOTION_INPUT_SIZE
+
+WARM_UP_FACES = 4
+
+
+def measure(workers, faces, batch_size):
+    """
+    Predicts random faces with a pool of workers.
+    :return: The faces predicted per second.
+    """
+    rng = np.random.default_rng(0)
+    inputs = rng.integers(0, 256, size=(64, EMOTION_INPUT_SIZE, EMOTION_INPUT_SIZE), dtype=np.uint8)
+    pool = EmotionInferencePool(workers=workers, batch_size=batch_size)
+    pool.start()
+    try:
+        # Every worker builds its model on its first batch, which is not part of the measure.
+        for i in range(WARM_UP_FACES * workers * batch_size):
+            pool.submit(inputs[i % len(inputs)], 0.0)
+            pool.get_results()
+        pool.get_results(wait=True)
+
+        predicted = 0
+        start = time.perf_counter()
+        for i in range(faces):
+            # Waits for room instead of letting the pool drop faces.
+            while pool.get_stats()['pending_batches'] >= 2 * workers:
+                predicted += len(pool.get_results())
+                time.sleep(0.0005)
+            pool.submit(inputs[i % len(inputs)], time.time())
+            predicted += len(pool.get_results())
+        predicted += len(pool.get_results(wait=True))
+        return predicted / (time.perf_counter() - start)
+    finally:
+        pool.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the emotion inference pool.')
+    parser.add_argument('--faces', type=int, default=2000, help='Number of faces predicted for each pool size.')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Faces per forward pass.')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1, help='Largest pool measured.')
+    args = parser.parse_args()
+
+    worker_counts = sorted({1, *[2 ** k for k in range(1, 8) if 2 ** k <= args.max_workers], args.max_workers})
+    for count in worker_counts:
+        print(f"{count:3d} workers {measure(count, args.faces, args.batch_size):9.1f} faces/s")
@@ -0,0 +1,98 @@
+"""
+EmotionRecognizerBenchmark.py
+
+Measures the frames per second of EmotionRecognizer on a recorded video, with the face detected in every frame and
+with the detection every N frames and tracking in between. The previous pipeline, a full frame detection on every
+frame, the gray to RGB conversion of the frame and a second face detection by DeepFace on the crop, is measured as the
+baseline. With --locate-only DeepFace is not called, which measures the face location alone.
+
+Usage:
+    python -m Benchmarks.EmotionRecognizerBenchmark session.mp4 --frames 300 --interval 5
+"""
+import argparse
+import time
+
+import cv2
+
+from IO.VideoProcessing.EmotionRecognizer import EmotionRecognizer, DEFAULT_DETECTION_INTERVAL
+from IO.VideoProcessing.VideoHandler import VideoHandler
+
+BASELINE_DETECTOR_BACKEND = 'opencv'
+
+
+def read_frames(video_path, max_frames):
+    """
+    Reads the first frames of a video in memory, so decoding is not part of the measure.
+    :return: The list of frames.
+    """
+    video = VideoHandler(video_path)
+    frames = []
+    while len(frames) < max_frames:
+        frame = video.get_frame()
+        if frame is None:
+            break
+        frames.append(frame)
+    video.close_camera()
+    return frames
+
+
+def run_baseline(recognizer, frames, locate_only):
+    """
+    Runs the previous pipeline on the frames.
+    :return: The frames per second and the number of frames with a face.
+    """
+    from deepface import DeepFace
+
+    found = 0
+    start = time.perf_counter()
+    for frame in frames:
+        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        rgb_frame = cv2.cvtColor(gray_frame, cv2.COLOR_GRAY2RGB)
+        recognizer.reset_tracking()
+        face = recognizer.locate_face(gray_frame)
+        if face is not None:
+            found += 1
+            if not locate_only:
+                x, y, w, h = face
+                DeepFace.analyze(rgb_frame[y:y + h, x:x + w], actions=['emotion'], enforce_detection=False,
+                                 detector_backend=BASELINE_DETECTOR_BACKEND)
+    return len(frames) / (time.perf_counter() - start), found
+
+
+def run_recognizer(recognizer, frames, locate_only):
+    """
+    Runs the recognizer on the frames.
+    :return: The frames per second and the number of frames with a face.
+    """
+    found = 0
+    start = time.perf_counter()
+    for frame in frames:
+        if locate_only:
+            found += recognizer.locate_face(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)) is not None
+        else:
+            found += recognizer.recognize_emotion(frame) is not None
+    return len(frames) / (time.perf_counter() - start), found
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the emotion recognition on a recorded video.')
+    parser.add_argument('video', help='The path of the video.')
+    parser.add_argument('--frames', type=int, default=300, help='Number of frames processed.')
+    parser.add_argument('--interval', type=int, default=DEFAULT_DETECTION_INTERVAL,
+                        help='Frames between two full detections.')
+    parser.add_argument('--locate-only', action='store_true', help='Only locate the face, without DeepFace.')
+    args = parser.parse_args()
+
+    video_frames = read_frames(args.video, args.frames)
+    if not video_frames:
+        raise SystemExit(f"No frames could be read from {args.video}")
+    runs = [
+        ('baseline', lambda: run_baseline(EmotionRecognizer(open_camera=False), video_frames, args.locate_only)),
+        ('detect every frame', lambda: run_recognizer(EmotionRecognizer(open_camera=False, detection_interval=1),
+                                                      video_frames, args.locate_only)),
+        (f'detect every {args.interval}', lambda: run_recognizer(
+            EmotionRecognizer(open_camera=False, detection_interval=args.interval), video_frames, args.locate_only)),
+    ]
+    for name, run in runs:
+        fps, faces = run()
+        print(f"{name:<20} {fps:8.1f} fps   face in {faces}/{len(video_frames)} frames")
@@ -0,0 +1,51 @@
+"""
+EmotionWarmUpBenchmark.py
+
+Measures the latency of the first emotion prediction of a session, from the submission of the first face to its
+result, with a cold EmotionInferencePool, whose workers start and build the model on the first batch, and with a pool
+warmed up beforehand as the backend does when the emotion signal is enabled.
+
+Usage:
+    python -m Benchmarks.EmotionWarmUpBenchmark --workers 2
+"""
+import argparse
+import time
+
+import numpy as np
+
+from IO.VideoProcessing.EmotionInferencePool import EmotionInferencePool, DEFAULT_WORKERS
+from IO.VideoProcessing.EmotionRecognizer import EMOTION_INPUT_SIZE
+
+
+def first_sample_latency(pool):
+    """
+    Submits one face and waits for its prediction.
+    :return: The latency in seconds.
+    """
+    face = np.random.default_rng(0).integers(0, 256, size=(EMOTION_INPUT_SIZE, EMOTION_INPUT_SIZE), dtype=np.uint8)
+    start = time.perf_counter()
+    pool.submit(face, time.time())
+    results = pool.get_results(wait=True)
+    if not results:
+        raise RuntimeError("The prediction failed.")
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the first emotion prediction with and without warm-up.')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Number of worker processes.')
+    args = parser.parse_args()
+
+    cold_pool = EmotionInferencePool(workers=args.workers)
+    cold_pool.start()
+    try:
+        print(f"cold    first sample {first_sample_latency(cold_pool):7.3f} s")
+    finally:
+        cold_pool.stop()
+
+    warm_pool = EmotionInferencePool(workers=args.workers)
+    try:
+        warm_up = warm_pool.warm_up()
+        print(f"warm    first sample {first_sample_latency(warm_pool):7.3f} s   (warm-up {warm_up:.3f} s)")
+    finally:
+        warm_pool.stop()
@@ -0,0 +1,40 @@
+"""
+ImportTimeBenchmark.py
+
+Measures the import time of the backend server and of the dependencies loaded by each optional signal and regressor
+backend. Every import runs in a fresh interpreter so modules cached by a previous measurement do not hide its cost.
+
+Usage:
+    python -m Benchmarks.ImportTimeBenchmark
+"""
+import subprocess
+import sys
+
+IMPORTS = {
+    'backend server': 'import Backend.BackendServer',
+    'regressor keras': 'import tensorflow.keras',
+    'regressor ridge': 'import sklearn.linear_model, sklearn.pipeline, sklearn.preprocessing',
+    'regressor mlp': 'import sklearn.neural_network',
+    'gaze (mediapipe)': 'import IO.EyeTracking.LaserGaze.GazeProcessor',
+    'emotion (deepface)': 'import deepface.DeepFace',
+}
+
+TIMER = "import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)"
+
+
+def measure(statement):
+    """
+    Imports the given modules in a new interpreter.
+    :param statement: The import statement to time.
+    :return: The import time in seconds, or None if the import failed.
+    """
+    result = subprocess.run([sys.executable, '-c', TIMER.format(statement=statement)], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    for name, statement in IMPORTS.items():
+        elapsed = measure(statement)
+        print(f"{name:<22}" + (f"{elapsed:8.3f} s" if elapsed is not None else "   not installed"))
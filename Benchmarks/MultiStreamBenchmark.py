@@ -0,0 +1,89 @@
+"""
+MultiStreamBenchmark.py
+
+Replays several synthetic recordings at once with mne_lsl PlayerLSL, as several headsets would stream in a lab, and
+acquires all of them concurrently through AuraStreamManager with one AuraAcquisition thread per stream. For each
+stream it reports the samples read against the sample indexes of the recording, the acquisition counters and the CPU
+used by the process.
+
+Usage:
+    python -m Benchmarks.MultiStreamBenchmark --streams 4 --seconds 30
+"""
+import argparse
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from Benchmarks.AuraAcquisitionBenchmark import CHUNK_SAMPLES, create_recording
+from IO.SignalProcessing.AuraAcquisition import AuraAcquisition, DEFAULT_POLL_INTERVAL
+from IO.SignalProcessing.AuraStreamManager import AuraStreamManager
+
+SOURCE_ID_PREFIX = 'multi_stream_benchmark_'
+
+
+def acquire(stream, interval, seconds, results, source_id):
+    """
+    Reads a stream for a number of seconds and stores the sample indexes and counters in the results.
+    """
+    acquisition = AuraAcquisition(stream, interval)
+    indexes = []
+    end = time.time() + seconds
+    while time.time() < end:
+        data, _ = acquisition.read_new()
+        indexes.append(data[0])
+        acquisition.wait()
+    results[source_id] = (np.round(np.concatenate(indexes)).astype(np.int64), acquisition.get_stats())
+
+
+def run(n_streams, seconds, interval):
+    """
+    Replays the recordings and acquires them concurrently.
+    :return: The results by source_id and the fraction of one core used by the process.
+    """
+    from mne_lsl.player import PlayerLSL
+
+    source_ids = [f'{SOURCE_ID_PREFIX}{i}' for i in range(n_streams)]
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        fname = create_recording(folder, seconds)
+        players = [PlayerLSL(fname, chunk_size=CHUNK_SAMPLES, source_id=source_id) for source_id in source_ids]
+        for player in players:
+            player.start()
+        manager = AuraStreamManager(buffer_size_multiplier=5)
+        try:
+            discovered = {stream['source_id'] for stream in manager.discover()}
+            missing = set(source_ids) - discovered
+            if missing:
+                raise RuntimeError(f"The streams {sorted(missing)} were not discovered.")
+            streams = manager.connect(source_ids)
+            threads = [threading.Thread(target=acquire, args=(stream, interval, seconds, results, source_id))
+                       for source_id, stream in streams.items()]
+            start_cpu = time.process_time()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            cpu_fraction = (time.process_time() - start_cpu) / seconds
+        finally:
+            manager.disconnect_all()
+            for player in players:
+                player.stop()
+    return results, cpu_fraction
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Acquires several replayed streams concurrently.')
+    parser.add_argument('--streams', type=int, default=2, help='Number of streams replayed.')
+    parser.add_argument('--seconds', type=float, default=30.0, help='Duration of the replay.')
+    parser.add_argument('--interval', type=float, default=DEFAULT_POLL_INTERVAL, help='Poll interval in seconds.')
+    args = parser.parse_args()
+
+    stream_results, fraction = run(args.streams, args.seconds, args.interval)
+    for stream_id, (read, stats) in stream_results.items():
+        expected = read[-1] - read[0] + 1 if len(read) else 0
+        print(f"{stream_id}: read {len(read)}   expected {expected}   "
+              f"duplicates {len(read) - len(np.unique(read))}   lost {stats['lost_samples']}   "
+              f"overflows {stats['overflows']}")
+    print(f"process {fraction * 100:.3f} % of one core for {args.streams} streams")
@@ -0,0 +1,66 @@
+"""
+RegressorInferenceBenchmark.py
+
+Measures the latency of a single PositionRegressor prediction, as done once per frame in _coordinate_regressor_loop,
+with the Keras model and with the exported NumPy forward pass. The regressor is trained on a synthetic calibration
+file so the benchmark does not need a recorded session.
+
+Usage:
+    python -m Benchmarks.RegressorInferenceBenchmark
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from Backend.EyeCoordinateRegressor import PositionRegressor
+
+SAMPLES = 2000
+PREDICTIONS = 500
+
+
+def create_training_file(folder):
+    """
+    Writes a calibration file where the screen coordinates are a noisy function of the gaze vectors.
+    :param folder: The folder where the file is created.
+    :return: The path of the file.
+    """
+    rng = np.random.default_rng(0)
+    gaze = rng.normal(scale=0.1, size=(SAMPLES, 6))
+    x = 960 + 4000 * (gaze[:, 0] + gaze[:, 3]) + rng.normal(scale=5, size=SAMPLES)
+    y = 540 + 4000 * (gaze[:, 1] + gaze[:, 4]) + rng.normal(scale=5, size=SAMPLES)
+    data = pd.DataFrame(gaze, columns=['l_x', 'l_y', 'l_z', 'r_x', 'r_y', 'r_z'])
+    data['x'] = x
+    data['y'] = y
+    path = os.path.join(folder, 'training_gaze.csv')
+    data.to_csv(path, index=False)
+    return path
+
+
+def time_predictions(regressor, inputs):
+    """
+    Times one prediction per input row, like the regressor loop does.
+    :return: The median and the 99th percentile latency in milliseconds.
+    """
+    latencies = []
+    for row in inputs:
+        start = time.perf_counter()
+        regressor.make_prediction([row])
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return np.median(latencies), np.percentile(latencies, 99)
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as folder:
+        regressor = PositionRegressor(create_training_file(folder))
+        regressor.train_create_model()
+
+    print(f"Max difference NumPy vs Keras: {regressor.verify_numpy_model():.6f} px")
+    inputs = np.random.default_rng(1).normal(scale=0.1, size=(PREDICTIONS, 6)).tolist()
+    for name, numpy_inference in [('keras', False), ('numpy', True)]:
+        regressor.numpy_inference = numpy_inference
+        median, p99 = time_predictions(regressor, inputs)
+        print(f"{name:<8} median {median:8.3f} ms   p99 {p99:8.3f} ms")
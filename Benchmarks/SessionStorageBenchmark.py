@@ -0,0 +1,65 @@
+"""
+SessionStorageBenchmark.py
+
+Compares the csv and binary storage formats on a synthetic Aura session of 40 channels at 250 Hz: file size, time to
+write the session through AuraDataWriter and time to load it back into a DataFrame, plus the time to memory-map the
+binary file and read a single channel.
+
+Usage:
+    python -m Benchmarks.SessionStorageBenchmark
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from IO.FileWriting.AuraDataWriter import AuraDataWriter
+from IO.FileWriting.SessionStorage import STORAGE_FORMAT_BINARY, STORAGE_FORMAT_CSV, load_dataframe, read_binary
+
+SAMPLING_RATE = 250
+CHANNELS = 40
+DURATION = 600
+CHUNK_SIZE = 25
+
+
+def write_session(folder, storage_format):
+    """
+    Writes DURATION seconds of synthetic data in chunks as returned by the stream.
+    :return: The path of the file and the time taken.
+    """
+    samples = SAMPLING_RATE * DURATION
+    rng = np.random.default_rng(0)
+    timestamps = np.round(np.arange(samples) / SAMPLING_RATE, 3)
+    data = rng.normal(scale=50, size=(CHANNELS, samples))
+    channels = ['timestamp'] + [f'ch_{i}' for i in range(CHANNELS)]
+
+    writer = AuraDataWriter(folder, 'session_aura.csv', channels, storage_format=storage_format)
+    writer.create_new_file()
+    start = time.perf_counter()
+    for offset in range(0, samples, CHUNK_SIZE):
+        writer.write_data(timestamps[offset:offset + CHUNK_SIZE], data[:, offset:offset + CHUNK_SIZE])
+    writer.close_file()
+    return writer.path, time.perf_counter() - start
+
+
+def timed(function, *args):
+    """
+    :return: The time taken by the call in seconds.
+    """
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    print(f"{DURATION} s session, {SAMPLING_RATE} Hz x {CHANNELS} channels")
+    with tempfile.TemporaryDirectory() as folder:
+        for storage_format in (STORAGE_FORMAT_CSV, STORAGE_FORMAT_BINARY):
+            path, write_time = write_session(folder, storage_format)
+            load_time = timed(load_dataframe, path)
+            print(f"{storage_format:<7} size {os.path.getsize(path) / 2 ** 20:7.1f} MiB   write {write_time:6.2f} s   "
+                  f"load {load_time:6.3f} s")
+            if storage_format == STORAGE_FORMAT_BINARY:
+                channel_time = timed(lambda: np.asarray(read_binary(path)['ch_0']).mean())
+                print(f"        memory-mapped read of one channel {channel_time * 1000:7.2f} ms")
@@ -0,0 +1,67 @@
+"""
+SphereFitBenchmark.py
+
+Compares the accuracy and the time per update of the sphere fitting methods available in EyeballDetector. The points
+are sampled from a spherical cap in front of a known eyeball, which is roughly what the iris and eyelid landmarks look
+like in model space, with gaussian noise added.
+
+Usage:
+    python -m Benchmarks.SphereFitBenchmark
+"""
+import time
+
+import numpy as np
+
+from IO.EyeTracking.LaserGaze.EyeballDetector import EyeballDetector, SOLVER_MINIMIZE, SOLVER_ALGEBRAIC
+from IO.EyeTracking.LaserGaze.face_model import DEFAULT_LEFT_EYE_CENTER_MODEL, DEFAULT_EYE_RADIUS
+
+TRUE_CENTER = DEFAULT_LEFT_EYE_CENTER_MODEL + np.array([0.002, -0.001, 0.003])
+TRUE_RADIUS = 0.018
+POINTS = 400
+NOISE = 0.0005
+REPETITIONS = 50
+
+
+def sample_cap(rng, n_points, max_angle=np.pi / 3):
+    """
+    Samples points on the front cap of the true eyeball sphere with gaussian noise.
+    :param rng: The numpy random generator.
+    :param n_points: The number of points to sample.
+    :param max_angle: The maximum angle from the optical axis in radians.
+    :return: An array of shape (n_points, 3).
+    """
+    theta = rng.uniform(0, max_angle, n_points)
+    phi = rng.uniform(0, 2 * np.pi, n_points)
+    directions = np.column_stack((np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), -np.cos(theta)))
+    return TRUE_CENTER + TRUE_RADIUS * directions + rng.normal(scale=NOISE, size=(n_points, 3))
+
+
+def run(solver, refinement_steps=0):
+    """
+    Runs the solver over several random point sets.
+    :return: Mean time per solve in milliseconds, mean center error, mean radius error and mean confidence.
+    """
+    rng = np.random.default_rng(42)
+    detector = EyeballDetector(DEFAULT_LEFT_EYE_CENTER_MODEL, initial_eye_radius=DEFAULT_EYE_RADIUS, solver=solver,
+                               refinement_steps=refinement_steps)
+    elapsed, center_errors, radius_errors, confidences = [], [], [], []
+    for _ in range(REPETITIONS):
+        points = sample_cap(rng, POINTS)
+        start = time.perf_counter()
+        center, radius, confidence = detector._solve_for_sphere(points)
+        elapsed.append(time.perf_counter() - start)
+        if center is None:
+            continue
+        center_errors.append(np.linalg.norm(center - TRUE_CENTER))
+        radius_errors.append(abs(radius - TRUE_RADIUS))
+        confidences.append(confidence)
+    return np.mean(elapsed) * 1000, np.mean(center_errors), np.mean(radius_errors), np.mean(confidences)
+
+
+if __name__ == '__main__':
+    print(f"{'solver':<22}{'ms/update':>12}{'center err':>14}{'radius err':>14}{'confidence':>14}")
+    for name, solver, steps in [('minimize', SOLVER_MINIMIZE, 0),
+                                ('algebraic', SOLVER_ALGEBRAIC, 0),
+                                ('algebraic + 3 GN', SOLVER_ALGEBRAIC, 3)]:
+        ms, center_error, radius_error, confidence = run(solver, steps)
+        print(f"{name:<22}{ms:>12.3f}{center_error:>14.6f}{radius_error:>14.6f}{confidence:>14.8f}")
@@ -0,0 +1,51 @@
+"""
+WriterBenchmark.py
+
+Measures the cost of CoordinateWriter.write for the collection thread, in the default mode where every row is written
+and flushed by the caller, in async mode where the row is only queued for the background writer thread, and in async
+mode with the write-ahead journal. The total time includes close_file, so the async figures also pay for writing
+everything that was still queued.
+
+Usage:
+    python -m Benchmarks.WriterBenchmark
+"""
+import tempfile
+import time
+
+import numpy as np
+
+from IO.FileWriting.CoordinateWriter import CoordinateWriter
+
+ROWS = 50000
+
+
+def time_writes(folder, async_mode, journal=False):
+    """
+    Writes ROWS coordinates and times each call.
+    :param folder: The folder where the file is created.
+    :param async_mode: The mode of the writer.
+    :param journal: Enables the write-ahead journal.
+    :return: The rows per second, median and 99th percentile latency of a write in microseconds.
+    """
+    writer = CoordinateWriter(folder, f'coordinates_{async_mode}_{journal}.csv', async_mode=async_mode, journal=journal)
+    writer.create_new_file()
+    coordinates = np.random.default_rng(0).uniform(0, 1920, size=(ROWS, 2)).tolist()
+
+    latencies = np.empty(ROWS)
+    start = time.perf_counter()
+    for i, coordinate in enumerate(coordinates):
+        write_start = time.perf_counter()
+        writer.write(i / 30, coordinate)
+        latencies[i] = time.perf_counter() - write_start
+    writer.close_file()
+    total = time.perf_counter() - start
+
+    latencies *= 1e6
+    return ROWS / total, np.median(latencies), np.percentile(latencies, 99)
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as folder:
+        for name, async_mode, journal in [('sync', False, False), ('async', True, False), ('journal', True, True)]:
+            rate, median, p99 = time_writes(folder, async_mode, journal)
+            print(f"{name:<8} {rate:10.0f} rows/s   median {median:7.2f} us   p99 {p99:7.2f} us")
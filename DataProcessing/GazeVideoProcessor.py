@@ -0,0 +1,147 @@
+"""
+GazeVideoProcessor.py
+
+Re-runs the LaserGaze pipeline over recorded session videos faster than real time. Each video is split into chunks of
+frames processed in parallel by a pool of worker processes, and the gaze vectors are written with the same columns
+used by GazeWriter, one row per frame, so row n of the output corresponds to frame n of the video.
+
+The FaceLandmarker runs in VIDEO mode, which needs increasing timestamps. They are derived from the frame index and
+the frame rate of the file instead of the wall clock, so the results do not depend on how fast the video is read.
+Since the eyeball detectors need a few hundred points before they report a center, each chunk starts some frames
+earlier than its first output frame and discards the output of those warm-up frames.
+
+Usage:
+    python -m DataProcessing.GazeVideoProcessor session_1.mp4 session_2.mp4 --output results/
+"""
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from IO.EyeTracking.LaserGaze.GazeProcessor import GazeProcessor
+from IO.FileWriting.GazeWriter import GazeWriter
+
+DEFAULT_CHUNK_SIZE = 1800
+DEFAULT_WARMUP_FRAMES = 90
+DEFAULT_FPS = 30.0
+GAZE_FILE_SUFFIX = '_gaze.csv'
+
+# Gaze columns of GazeWriter are followed by the screen coordinates, which are unknown for a recorded video.
+EMPTY_ROW = [math.nan] * 8
+
+
+def frame_timestamp_ms(frame_index, fps) -> int:
+    """
+    Computes the timestamp of a frame from its position in the video.
+    :param frame_index: The index of the frame in the video.
+    :param fps: The frame rate of the video.
+    :return: The timestamp in milliseconds.
+    """
+    return int(round(frame_index * 1000.0 / fps))
+
+
+def get_video_properties(video_path):
+    """
+    Reads the number of frames and the frame rate of a video file.
+    :param video_path: The path of the video.
+    :return: A tuple with the number of frames and the frame rate.
+    """
+    video = cv2.VideoCapture(video_path)
+    if not video.isOpened():
+        raise FileNotFoundError(f"The video {video_path} cannot be opened")
+    frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = video.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+    video.release()
+    return frame_count, fps
+
+
+def process_chunk(video_path, start_frame, end_frame, fps, warmup_frames=DEFAULT_WARMUP_FRAMES):
+    """
+    Runs the gaze pipeline over a range of frames of a video. Executed in a worker process, so it creates its own
+    GazeProcessor and landmarker.
+    :param video_path: The path of the video.
+    :param start_frame: The first frame whose output is returned.
+    :param end_frame: The frame after the last one to process.
+    :param fps: The frame rate of the video, used for the timestamps.
+    :param warmup_frames: The frames processed before start_frame to let the eyeball detectors converge.
+    :return: A list with one row per frame in [start_frame, end_frame).
+    """
+    first_frame = max(0, start_frame - warmup_frames)
+    video = cv2.VideoCapture(video_path)
+    video.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
+    gaze_processor = GazeProcessor()
+
+    rows = []
+    for frame_index in range(first_frame, end_frame):
+        success, frame = video.read()
+        if not success:
+            break
+        left_eye, right_eye, _ = gaze_processor.process_frame(frame, frame_timestamp_ms(frame_index, fps))
+        if frame_index < start_frame:
+            continue
+        if left_eye is not None and right_eye is not None:
+            rows.append([*left_eye, *right_eye, math.nan, math.nan])
+        else:
+            rows.append(EMPTY_ROW)
+    video.release()
+
+    # Frames that could not be decoded are kept as empty rows so the row index still matches the frame index.
+    rows.extend([EMPTY_ROW] * (end_frame - start_frame - len(rows)))
+    return rows
+
+
+def process_gaze_video(video_path, output_path, file_name=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                       warmup_frames=DEFAULT_WARMUP_FRAMES, executor=None) -> str:
+    """
+    Extracts the gaze vectors of every frame of a video and writes them to a csv file.
+    :param video_path: The path of the video.
+    :param output_path: The folder where the csv file is written.
+    :param file_name: The name of the csv file, defaults to the video name with the gaze suffix.
+    :param workers: The number of worker processes, defaults to the number of cores.
+    :param chunk_size: The number of frames processed by each task.
+    :param warmup_frames: The frames processed before each chunk to let the eyeball detectors converge.
+    :param executor: An existing process pool to use instead of creating one.
+    :return: The path of the written file.
+    """
+    if file_name is None:
+        file_name = os.path.splitext(os.path.basename(video_path))[0] + GAZE_FILE_SUFFIX
+    frame_count, fps = get_video_properties(video_path)
+    starts = list(range(0, frame_count, chunk_size))
+    ends = [min(start + chunk_size, frame_count) for start in starts]
+
+    writer = GazeWriter(output_path, file_name)
+    writer.create_new_file()
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        chunks = executor.map(process_chunk, [video_path] * len(starts), starts, ends, [fps] * len(starts),
+                              [warmup_frames] * len(starts))
+        for rows in chunks:
+            # The rows of a chunk are written at once, instead of being flushed one by one.
+            writer.write_rows(rows)
+    finally:
+        writer.close_file()
+        if own_executor:
+            executor.shutdown()
+    return os.path.join(output_path, file_name)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extracts the gaze vectors of recorded session videos.')
+    parser.add_argument('videos', nargs='+', help='The videos to process.')
+    parser.add_argument('--output', required=True, help='The folder where the csv files are written.')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes.')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Frames per task.')
+    parser.add_argument('--warmup-frames', type=int, default=DEFAULT_WARMUP_FRAMES,
+                        help='Frames processed before each chunk to calibrate the eyeball detectors.')
+    args = parser.parse_args()
+
+    # A single pool is shared by all the videos so the workers stay busy between sessions.
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for video in args.videos:
+            path = process_gaze_video(video, args.output, chunk_size=args.chunk_size,
+                                      warmup_frames=args.warmup_frames, executor=pool)
+            print(f"{video} -> {path}")
@@ -1,33 +1,127 @@
+import re
+
+import numpy as np
 import pandas as pd
 
-def process_concentration_data(aura_data) -> None:
+from IO.FileWriting.SessionStorage import create_storage, read_chunks, storage_format_of
+
+BETA_CHANNEL_PATTERN = re.compile(r'^Beta_(.+)$')
+# Band power channels other than Beta, they are not used for the concentration value.
+UNUSED_CHANNEL_PATTERN = re.compile(r'^(Delta|Theta|Alpha|Gamma)_')
+ENCODED_PREFIX = 'Encoded_'
+
+NORMALIZATION_RUNNING_MAX = 'running_max'
+NORMALIZATION_ROLLING_MAX = 'rolling_max'
+NORMALIZATION_GLOBAL_MAX = 'global_max'
+NORMALIZATIONS = (NORMALIZATION_RUNNING_MAX, NORMALIZATION_ROLLING_MAX, NORMALIZATION_GLOBAL_MAX)
+
+DEFAULT_CHUNK_ROWS = 100000
+DEFAULT_ROLLING_WINDOW = 250 * 60
+
+
+def _iter_chunks(aura_data, chunk_rows):
+    """
+    Iterates over the aura data in chunks of rows.
+    :param aura_data: The path of a session file, a DataFrame or an iterable of DataFrames.
+    :param chunk_rows: The number of rows of each chunk read from a file or a DataFrame.
+    :return: An iterator of DataFrames.
+    """
+    if isinstance(aura_data, str):
+        return read_chunks(aura_data, chunk_rows)
+    if isinstance(aura_data, pd.DataFrame):
+        return (aura_data.iloc[start:start + chunk_rows] for start in range(0, len(aura_data), chunk_rows))
+    return iter(aura_data)
+
+
+class _MaxNormalizer:
+    """
+    Divides each channel by its maximum, either over all the rows so far, over a window of the last rows or over a
+    fixed maximum computed beforehand. The state is carried from one chunk to the next.
+    """
+    def __init__(self, normalization, window, global_max=None):
+        self.__normalization = normalization
+        self.__window = window
+        self.__running_max = global_max
+        self.__tail = None
+
+    def normalize(self, values):
+        """
+        :param values: A 2D array with one row per sample and one column per channel.
+        :return: The normalized values.
+        """
+        if self.__normalization == NORMALIZATION_ROLLING_MAX:
+            # The last rows of the previous chunk are part of the window of the first rows of this one.
+            extended = values if self.__tail is None else np.vstack((self.__tail, values))
+            maximum = pd.DataFrame(extended).rolling(self.__window, min_periods=1).max().to_numpy()
+            maximum = maximum[len(extended) - len(values):]
+            self.__tail = extended[-(self.__window - 1):] if self.__window > 1 else None
+        elif self.__normalization == NORMALIZATION_RUNNING_MAX:
+            maximum = np.maximum.accumulate(values, axis=0)
+            if self.__running_max is not None:
+                maximum = np.maximum(maximum, self.__running_max)
+            if len(maximum):
+                self.__running_max = maximum[-1]
+        else:
+            maximum = np.broadcast_to(self.__running_max, values.shape)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(maximum > 0, values / maximum, np.nan)
+
+
+def process_concentration_data(aura_data, output_path, normalization=NORMALIZATION_RUNNING_MAX,
+                               window=DEFAULT_ROLLING_WINDOW, chunk_rows=DEFAULT_CHUNK_ROWS) -> int:
     """
     Process the aura data to calculate a concentration value. Also removes unnecessary data that is present in the
-    CSV file. The data is encoded to represent a value from 0 to 1, where 0 is the lowest concentration and 1 is the
-    highest concentration. The new data overwrites the old data in the CSV file.
+    CSV file. The Beta power of each electrode is encoded to represent a value from 0 to 1, where 0 is the lowest
+    concentration and 1 is the highest concentration.
     The data will be used so a Large Language Model can generate an analysis of the concentration data.
 
-    This function only supports 40 channels AURA data for the moment, a future implementation is expected to support
-    Aura data with n channels.
-    :param aura_data: A pandas dataframe containing the aura data.
+    The data is processed in chunks, so sessions of any length are processed without loading them in memory. The Beta
+    channels are found by name, so any number of electrodes is supported. Since the maximum of a channel over the whole
+    session is not known until the end, the encoding divides by the maximum so far ('running_max'), by the maximum of
+    the last window rows ('rolling_max'), or by the maximum of the whole session computed in a first pass over the
+    data ('global_max', only for files and DataFrames).
+    :param aura_data: The path of an aura session file, csv or binary, a pandas dataframe containing the aura data or
+    an iterable of dataframes.
+    :param output_path: The path of the processed file, written in the binary format if it has the binary extension.
+    :param normalization: 'running_max', 'rolling_max' or 'global_max'.
+    :param window: The number of rows of the window for 'rolling_max'.
+    :param chunk_rows: The number of rows processed at a time.
+    :return: The number of rows written.
     """
-    print(df.shape)
-    if aura_data is None or df.shape[1] != 41:
-        raise RuntimeError("Only 40 channels AURA data is supported.")
-
-    # The data is processed to calculate the concentration value.
-    unnecessary_waves = ['Delta', 'Theta', 'Alpha', 'Gamma']
-    electrodes = ['F3', 'F4', 'Cz', 'C3', 'C4', 'Pz', 'P3', 'P4']
-    for wave in unnecessary_waves:
-        for electrode in electrodes:
-            aura_data = aura_data.drop(columns=[wave + '_' + electrode])
-
-    for electrode in electrodes:
-        ch_name = 'Beta_' + electrode
-        aura_data['Encoded_Beta_' + electrode] = aura_data[ch_name] / aura_data[ch_name].max()
-    print(aura_data)
-    aura_data.to_csv('processed_aura_data.csv', index=False)
-
-
-# df = pd.read_csv('test.csv')
-# process_concentration_data(df)
+    if aura_data is None:
+        raise RuntimeError("There is no AURA data to process.")
+    if normalization not in NORMALIZATIONS:
+        raise ValueError(f"Unknown normalization: {normalization}")
+
+    global_max = None
+    if normalization == NORMALIZATION_GLOBAL_MAX:
+        if not isinstance(aura_data, (str, pd.DataFrame)):
+            raise ValueError("The global maximum needs a file or a dataframe that can be read twice.")
+        for chunk in _iter_chunks(aura_data, chunk_rows):
+            beta_columns = [column for column in chunk.columns if BETA_CHANNEL_PATTERN.match(column)]
+            chunk_max = chunk[beta_columns].to_numpy(dtype=np.float64).max(axis=0, initial=-np.inf)
+            global_max = chunk_max if global_max is None else np.maximum(global_max, chunk_max)
+
+    storage = None
+    rows = 0
+    normalizer = _MaxNormalizer(normalization, window, global_max)
+    try:
+        for chunk in _iter_chunks(aura_data, chunk_rows):
+            if storage is None:
+                beta_columns = [column for column in chunk.columns if BETA_CHANNEL_PATTERN.match(column)]
+                if not beta_columns:
+                    raise RuntimeError("The AURA data has no Beta channels.")
+                kept_columns = [column for column in chunk.columns if not UNUSED_CHANNEL_PATTERN.match(column)]
+                output_columns = kept_columns + [ENCODED_PREFIX + column for column in beta_columns]
+                storage = create_storage(storage_format_of(output_path), output_columns)
+                storage.open(output_path)
+
+            encoded = normalizer.normalize(chunk[beta_columns].to_numpy(dtype=np.float64))
+            storage.write_block(np.hstack((chunk[kept_columns].to_numpy(dtype=np.float64), encoded)))
+            rows += len(chunk)
+    finally:
+        if storage is not None:
+            storage.close()
+    if storage is None:
+        raise RuntimeError("There is no AURA data to process.")
+    return rows
@@ -0,0 +1,48 @@
+"""
+RecoverSession.py
+
+Rebuilds the files of a session interrupted by a crash from the journals left next to them by the writers. A journal
+is only left when its writer was not closed, so running the tool on a complete session does nothing.
+
+Usage:
+    python -m DataProcessing.RecoverSession output/participant/collected
+    python -m DataProcessing.RecoverSession output/participant/collected/participant_aura.csv.journal
+"""
+import argparse
+import glob
+import os
+
+from IO.FileWriting.Journal import JOURNAL_SUFFIX, recover_journal
+
+
+def find_journals(path) -> list:
+    """
+    Lists the journals in a folder, or returns the path itself if it is a journal.
+    :param path: A folder or the path of a journal.
+    :return: The paths of the journals.
+    """
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, f'*{JOURNAL_SUFFIX}')))
+    return [path]
+
+
+def recover_session(path) -> list:
+    """
+    Recovers every journal found in a path.
+    :param path: A folder or the path of a journal.
+    :return: A list with the data path and the number of replayed rows of each recovered file.
+    """
+    return [recover_journal(journal) for journal in find_journals(path)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuilds session files from the journals left by a crash.')
+    parser.add_argument('paths', nargs='+', help='Session folders or journal files.')
+    args = parser.parse_args()
+
+    for session_path in args.paths:
+        recovered = recover_session(session_path)
+        if not recovered:
+            print(f"{session_path}: nothing to recover")
+        for data_path, rows in recovered:
+            print(f"{data_path}: replayed {rows} rows")
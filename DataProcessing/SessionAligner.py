@@ -0,0 +1,270 @@
+"""
+SessionAligner.py
+
+Aligns the signals of a collected session on a common clock and resamples them onto a shared time grid, producing a
+single table with one row per grid point and the columns of every signal prefixed by its name.
+
+The signals are not timestamped with the same clock. Gaze, emotion and pointer rows are written as time.time() minus
+the wall clock time at the start of the collection, while the Aura rows are LSL timestamps minus that same wall clock
+time. The backend records the wall clock and the LSL local_clock at the start in the clock file of the session, and
+their difference is the offset that moves the Aura rows onto the session clock. Without a clock file the signals are
+assumed to be aligned already.
+
+Each signal is resampled with its own method:
+- 'linear': Linear interpolation between the two samples around a grid point, for continuous signals.
+- 'nearest': The closest sample.
+- 'previous': The last sample before the grid point, for states such as the predicted emotion.
+A grid point further than the maximum gap of the signal from the samples it would use is left empty, so the gaps of a
+signal are not filled with invented data.
+
+The session is processed in chunks of the grid, reading only the rows of each chunk through SessionReader, so the
+memory use does not depend on the length of the session.
+
+Usage:
+    python -m DataProcessing.SessionAligner output/participant/collected participant --rate 50
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from DataProcessing.SessionReader import SessionReader
+
+CLOCK_FILE_SUFFIX = '_clock.json'
+ALIGNED_FILE_SUFFIX = '_aligned.csv'
+TIME_COLUMN = 'time'
+
+DEFAULT_RATE = 50.0
+DEFAULT_CHUNK_DURATION = 60.0
+
+INTERPOLATION_LINEAR = 'linear'
+INTERPOLATION_NEAREST = 'nearest'
+INTERPOLATION_PREVIOUS = 'previous'
+INTERPOLATIONS = (INTERPOLATION_LINEAR, INTERPOLATION_NEAREST, INTERPOLATION_PREVIOUS)
+
+DEFAULT_INTERPOLATIONS = {
+    'aura': INTERPOLATION_LINEAR,
+    'gaze': INTERPOLATION_LINEAR,
+    'emotion': INTERPOLATION_PREVIOUS,
+    'pointer': INTERPOLATION_NEAREST,
+}
+# Maximum distance in seconds between a grid point and the samples used for it. None uses half the grid period,
+# which places each pointer click on a single grid point.
+DEFAULT_MAX_GAPS = {
+    'aura': 0.1,
+    'gaze': 0.5,
+    'emotion': 2.0,
+    'pointer': None,
+}
+
+
+def read_clock_offsets(folder, participant) -> dict:
+    """
+    Computes the offset to add to the timestamps of each signal to move them onto the session clock.
+    :param folder: The folder with the collected files.
+    :param participant: The participant name used as prefix of the files.
+    :return: A dictionary with the offset in seconds of the signals that need one.
+    """
+    path = os.path.join(folder, f'{participant}{CLOCK_FILE_SUFFIX}')
+    if not os.path.exists(path):
+        print(f"Warning: {path} does not exist, the signals are assumed to share the same clock.")
+        return {}
+    with open(path) as file:
+        clock = json.load(file)
+    # Aura rows are LSL time minus the wall clock start, the session clock is LSL time minus the LSL start.
+    return {'aura': clock['wall_start'] - clock['lsl_start']}
+
+
+def resample(times, values, grid, method, max_gap):
+    """
+    Resamples the rows of a signal onto grid points, all the columns at once.
+    :param times: The increasing timestamps of the rows.
+    :param values: A 2D array with one row per timestamp. Only numeric values can be interpolated linearly.
+    :param grid: The timestamps to resample to.
+    :param method: 'linear', 'nearest' or 'previous'.
+    :param max_gap: The maximum distance in seconds between a grid point and the samples used for it.
+    :return: A tuple with the resampled rows and a boolean mask of the grid points that have a value.
+    """
+    if len(times) == 0:
+        return None, np.zeros(len(grid), dtype=bool)
+    right = np.searchsorted(times, grid, side='left')
+    left = right - 1
+    has_left = left >= 0
+    has_right = right < len(times)
+    left_clipped = np.clip(left, 0, len(times) - 1)
+    right_clipped = np.clip(right, 0, len(times) - 1)
+    left_distance = np.where(has_left, grid - times[left_clipped], np.inf)
+    right_distance = np.where(has_right, times[right_clipped] - grid, np.inf)
+
+    if method == INTERPOLATION_PREVIOUS:
+        # A sample at the grid point itself is the previous one.
+        exact = right_distance == 0
+        rows = np.where(exact, right_clipped, left_clipped)
+        valid = exact | (left_distance <= max_gap)
+        return values[rows], valid
+    if method == INTERPOLATION_NEAREST:
+        use_right = right_distance < left_distance
+        rows = np.where(use_right, right_clipped, left_clipped)
+        valid = np.minimum(left_distance, right_distance) <= max_gap
+        return values[rows], valid
+    if method == INTERPOLATION_LINEAR:
+        exact = right_distance == 0
+        valid = exact | ((left_distance <= max_gap) & (right_distance <= max_gap))
+        span = times[right_clipped] - times[left_clipped]
+        weight = np.divide(grid - times[left_clipped], span, out=np.zeros(len(grid)), where=span > 0)
+        weight = np.where(exact, 1.0, weight)[:, np.newaxis]
+        numeric = values.astype(np.float64)
+        return numeric[left_clipped] * (1 - weight) + numeric[right_clipped] * weight, valid
+    raise ValueError(f"Unknown interpolation method: {method}")
+
+
+class SessionAligner:
+    """
+    Resamples the signals of a session onto a shared grid of the session clock.
+    """
+    def __init__(self, folder, participant, rate=DEFAULT_RATE, interpolations=None, max_gaps=None):
+        """
+        :param folder: The folder with the collected files.
+        :param participant: The participant name used as prefix of the files.
+        :param rate: The rate of the grid in Hz.
+        :param interpolations: Optional dictionary overriding the interpolation method of some signals.
+        :param max_gaps: Optional dictionary overriding the maximum gap in seconds of some signals.
+        """
+        self.__session = SessionReader(folder, participant)
+        self.__offsets = read_clock_offsets(folder, participant)
+        self.__rate = float(rate)
+        self.__interpolations = {**DEFAULT_INTERPOLATIONS, **(interpolations or {})}
+        self.__max_gaps = {**DEFAULT_MAX_GAPS, **(max_gaps or {})}
+        for signal in self.__session.signals:
+            if self.__interpolations.get(signal) not in INTERPOLATIONS:
+                raise ValueError(f"Unknown interpolation method for {signal}: {self.__interpolations.get(signal)}")
+
+    @property
+    def columns(self) -> list:
+        """
+        Returns the columns of the aligned table.
+        """
+        columns = [TIME_COLUMN]
+        for signal in self.__session.signals:
+            columns += [f'{signal}_{column}' for column in self.__session[signal].columns[1:]]
+        return columns
+
+    def time_range(self):
+        """
+        Computes the span of the session on the session clock.
+        :return: A tuple with the first and the last timestamp over all the signals, or None if they are empty.
+        """
+        starts, ends = [], []
+        for signal in self.__session.signals:
+            reader = self.__session[signal]
+            if reader.start_time is not None:
+                offset = self.__offsets.get(signal, 0.0)
+                starts.append(reader.start_time + offset)
+                ends.append(reader.end_time + offset)
+        if not starts:
+            return None
+        return min(starts), max(ends)
+
+    def align_chunk(self, grid) -> pd.DataFrame:
+        """
+        Resamples every signal onto a chunk of the grid.
+        :param grid: The increasing grid timestamps on the session clock.
+        :return: The aligned table of the chunk.
+        """
+        table = {TIME_COLUMN: grid}
+        for signal in self.__session.signals:
+            reader = self.__session[signal]
+            offset = self.__offsets.get(signal, 0.0)
+            max_gap = self.__max_gap(signal)
+            # The rows around the chunk are needed to resample its first and last grid points.
+            rows = reader.read(grid[0] - max_gap - offset, grid[-1] + max_gap - offset + 1e-9)
+            times = rows[reader.columns[0]].to_numpy(dtype=np.float64) + offset
+            data_columns = reader.columns[1:]
+            values, valid = resample(times, rows[data_columns].to_numpy(), grid, self.__interpolations[signal],
+                                     max_gap)
+            for position, column in enumerate(data_columns):
+                if values is None:
+                    column_values = np.full(len(grid), np.nan)
+                else:
+                    column_values = values[:, position]
+                    column_values = np.where(valid, column_values,
+                                             np.nan if column_values.dtype.kind in 'fiu' else None)
+                table[f'{signal}_{column}'] = column_values
+        return pd.DataFrame(table, columns=self.columns)
+
+    def align(self, output_path, chunk_duration=DEFAULT_CHUNK_DURATION) -> int:
+        """
+        Writes the aligned table of the whole session to a csv file, one chunk of the grid at a time.
+        :param output_path: The path of the csv file.
+        :param chunk_duration: The duration in seconds of the grid chunks processed at once.
+        :return: The number of rows written.
+        """
+        span = self.time_range()
+        with open(output_path, 'w', newline='') as file:
+            if span is None:
+                file.write(','.join(self.columns) + '\n')
+                return 0
+            start, end = span
+            points = int(np.floor((end - start) * self.__rate)) + 1
+            points_per_chunk = max(1, int(chunk_duration * self.__rate))
+            for first in range(0, points, points_per_chunk):
+                # Computed from the index instead of accumulating the period, so long sessions do not drift.
+                grid = start + np.arange(first, min(first + points_per_chunk, points)) / self.__rate
+                self.align_chunk(grid).to_csv(file, header=first == 0, index=False)
+        return points
+
+    def __max_gap(self, signal) -> float:
+        """
+        Returns the maximum gap of a signal, half the grid period when it is not set.
+        """
+        max_gap = self.__max_gaps.get(signal)
+        return 0.5 / self.__rate if max_gap is None else max_gap
+
+
+def align_session(folder, participant, output_path=None, rate=DEFAULT_RATE, interpolations=None, max_gaps=None,
+                  chunk_duration=DEFAULT_CHUNK_DURATION) -> str:
+    """
+    Aligns the signals of a session and writes them to a single csv file.
+    :param folder: The folder with the collected files.
+    :param participant: The participant name used as prefix of the files.
+    :param output_path: The path of the aligned file, defaults to the folder with the aligned suffix.
+    :param rate: The rate of the grid in Hz.
+    :param interpolations: Optional dictionary overriding the interpolation method of some signals.
+    :param max_gaps: Optional dictionary overriding the maximum gap in seconds of some signals.
+    :param chunk_duration: The duration in seconds of the grid chunks processed at once.
+    :return: The path of the aligned file.
+    """
+    output_path = output_path or os.path.join(folder, f'{participant}{ALIGNED_FILE_SUFFIX}')
+    SessionAligner(folder, participant, rate, interpolations, max_gaps).align(output_path, chunk_duration)
+    return output_path
+
+
+def parse_signal_option(value):
+    """
+    Parses a SIGNAL=VALUE argument of the command line.
+    """
+    signal, separator, option = value.partition('=')
+    if not separator:
+        raise argparse.ArgumentTypeError(f"Expected SIGNAL=VALUE, got {value}")
+    return signal, option
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Aligns the signals of a session on a common time grid.')
+    parser.add_argument('folder', help='The folder with the collected files.')
+    parser.add_argument('participant', help='The participant name used as prefix of the files.')
+    parser.add_argument('--output', default=None, help='The path of the aligned csv file.')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='The rate of the grid in Hz.')
+    parser.add_argument('--method', action='append', type=parse_signal_option, default=[],
+                        help='Interpolation of a signal as SIGNAL=METHOD, with linear, nearest or previous.')
+    parser.add_argument('--max-gap', action='append', type=parse_signal_option, default=[],
+                        help='Maximum gap in seconds of a signal as SIGNAL=SECONDS.')
+    parser.add_argument('--chunk-duration', type=float, default=DEFAULT_CHUNK_DURATION,
+                        help='Seconds of the grid processed at once.')
+    args = parser.parse_args()
+
+    aligned = align_session(args.folder, args.participant, args.output, args.rate, dict(args.method),
+                            {signal: float(gap) for signal, gap in args.max_gap}, args.chunk_duration)
+    print(f"Aligned session written to {aligned}")
@@ -0,0 +1,146 @@
+"""
+SessionConverter.py
+
+Converts session files between the csv format and the binary format of SessionStorage. The direction is taken from
+each input file: csv files are converted to binary and binary files to csv. The files are processed in chunks so
+multi-hour sessions are converted without loading them in memory.
+
+Usage:
+    python -m DataProcessing.SessionConverter session_aura.csv session_gaze.bin --output converted/
+    python -m DataProcessing.SessionConverter session_emotions.csv --type "Emotion Predicted=<U16"
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from IO.FileWriting.SessionStorage import (STORAGE_FORMAT_BINARY, STORAGE_FORMAT_CSV, BinaryStorage, build_schema,
+                                           is_binary_file, read_binary, storage_path)
+
+DEFAULT_CHUNK_ROWS = 100000
+# Type of the text columns found in a csv file when no type is given for them.
+DEFAULT_TEXT_TYPE = '<U32'
+
+
+def convert_csv_to_binary(csv_path, output_path=None, column_types=None, chunk_rows=DEFAULT_CHUNK_ROWS) -> str:
+    """
+    Converts a csv session file to the binary format.
+    :param csv_path: The path of the csv file.
+    :param output_path: The path of the binary file, defaults to the csv path with the binary extension.
+    :param column_types: Optional dictionary with the NumPy type of some columns. Text columns without a type are
+    stored with DEFAULT_TEXT_TYPE.
+    :param chunk_rows: The number of rows read at a time.
+    :exception: A ValueError if a chunk does not fit the types of the first chunk, such as a text longer than its
+    column type or a text in a numeric column. The partial binary file is removed.
+    :return: The path of the binary file.
+    """
+    output_path = output_path or storage_path(csv_path, STORAGE_FORMAT_BINARY)
+    storage = None
+    completed = False
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            if storage is None:
+                types = {column: DEFAULT_TEXT_TYPE for column in chunk.columns
+                         if not pd.api.types.is_numeric_dtype(chunk[column])}
+                types.update(column_types or {})
+                storage = BinaryStorage(list(chunk.columns), types)
+                storage.open(output_path)
+            _check_chunk(chunk, storage.schema)
+            records = np.empty(len(chunk), dtype=storage.schema)
+            for column in chunk.columns:
+                records[column] = chunk[column].to_numpy()
+            storage.write_records(records)
+        if storage is None:
+            # Only the header line, the schema still comes from the column names.
+            storage = BinaryStorage(list(pd.read_csv(csv_path, nrows=0).columns), column_types)
+            storage.open(output_path)
+        completed = True
+    finally:
+        if storage is not None:
+            storage.close()
+        if not completed and os.path.exists(output_path):
+            os.remove(output_path)
+    return output_path
+
+
+def _check_chunk(chunk, schema):
+    """
+    Checks that the values of a csv chunk can be stored with the schema without losing data.
+    :param chunk: The DataFrame of the chunk.
+    :param schema: The structured type of the binary records.
+    :exception: A ValueError naming the first column that does not fit.
+    """
+    for column in chunk.columns:
+        column_type = schema[column]
+        values = chunk[column]
+        if column_type.kind == 'U':
+            length = values.astype(str).str.len().max() if len(values) else 0
+            capacity = column_type.itemsize // np.dtype('U1').itemsize
+            if length > capacity:
+                raise ValueError(f"Column {column} has a text of {length} characters, longer than its type "
+                                 f"{column_type.str}. Give a longer type with --type.")
+        elif not pd.api.types.is_numeric_dtype(values):
+            raise ValueError(f"Column {column} has text values but its type is {column_type.str}. "
+                             f"Give a text type with --type.")
+
+
+def convert_binary_to_csv(binary_path, output_path=None, chunk_rows=DEFAULT_CHUNK_ROWS) -> str:
+    """
+    Converts a binary session file to csv.
+    :param binary_path: The path of the binary file.
+    :param output_path: The path of the csv file, defaults to the binary path with the csv extension.
+    :param chunk_rows: The number of records written at a time.
+    :return: The path of the csv file.
+    """
+    output_path = output_path or storage_path(binary_path, STORAGE_FORMAT_CSV)
+    records = read_binary(binary_path)
+    with open(output_path, 'w', newline='') as file:
+        if len(records) == 0:
+            file.write(','.join(records.dtype.names) + '\n')
+        for start in range(0, len(records), chunk_rows):
+            pd.DataFrame(records[start:start + chunk_rows]).to_csv(file, header=start == 0, index=False)
+    return output_path
+
+
+def convert_session_file(path, output_folder=None, column_types=None) -> str:
+    """
+    Converts a session file to the other format.
+    :param path: The path of the csv or binary file.
+    :param output_folder: The folder of the converted file, defaults to the folder of the input.
+    :param column_types: Optional NumPy types of some columns, used when converting to binary.
+    :return: The path of the converted file.
+    """
+    binary = is_binary_file(path)
+    output_path = storage_path(path, STORAGE_FORMAT_CSV if binary else STORAGE_FORMAT_BINARY)
+    if output_folder is not None:
+        os.makedirs(output_folder, exist_ok=True)
+        output_path = os.path.join(output_folder, os.path.basename(output_path))
+    if binary:
+        return convert_binary_to_csv(path, output_path)
+    return convert_csv_to_binary(path, output_path, column_types)
+
+
+def parse_column_type(value):
+    """
+    Parses a NAME=TYPE argument of the command line.
+    """
+    name, separator, column_type = value.rpartition('=')
+    if not separator or not name:
+        raise argparse.ArgumentTypeError(f"Expected NAME=TYPE, got {value}")
+    np.dtype(column_type)
+    return name, column_type
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Converts session files between csv and the binary format.')
+    parser.add_argument('files', nargs='+', help='The files to convert, csv files become binary and vice versa.')
+    parser.add_argument('--output', default=None, help='The folder of the converted files.')
+    parser.add_argument('--type', dest='types', action='append', type=parse_column_type, default=[],
+                        help='NumPy type of a column in the binary file, as NAME=TYPE. Can be repeated.')
+    args = parser.parse_args()
+
+    for session_file in args.files:
+        converted = convert_session_file(session_file, args.output, dict(args.types))
+        print(f"{session_file} ({os.path.getsize(session_file)} bytes) -> "
+              f"{converted} ({os.path.getsize(converted)} bytes)")
@@ -0,0 +1,302 @@
+"""
+SessionReader.py
+
+Reads back the signals of a collected session by time range, without parsing the whole files.
+
+When a signal file is opened for the first time a sparse index is built with the timestamp and the position of one row
+out of every INDEX_STRIDE. The index is cached next to the data file and rebuilt when the file changes. A time range
+is located with a binary search over the index, and only the rows between the two surrounding index entries are read:
+a byte range for csv files, a slice of the memory-mapped records for binary files. The timestamps of a file are
+expected to be non-decreasing, as written by the collection loops.
+
+A file still being written can be read: when its size changed since the last read, a binary file is mapped again and
+its index rebuilt, so the rows appended meanwhile are included. The index of a csv file is only rebuilt when it was
+empty, the rows after its last entry are read up to the end of the file anyway.
+
+Usage:
+    session = SessionReader('output/participant/collected', 'participant')
+    window = session[60:120]          # {signal: DataFrame} with the rows of every signal in [60, 120)
+    aura = session['aura'][60:120]    # A single signal
+"""
+import io
+import mmap
+import os
+
+import numpy as np
+import pandas as pd
+
+from IO.FileWriting.SessionStorage import (STORAGE_FORMAT_BINARY, STORAGE_FORMAT_CSV, is_binary_file, read_binary,
+                                           storage_path)
+
+INDEX_STRIDE = 1024
+INDEX_SUFFIX = '.index.npz'
+# Size of the blocks read when looking for the line starts of a csv file.
+SCAN_BLOCK_SIZE = 1 << 24
+
+SIGNAL_FILE_SUFFIXES = {
+    'aura': '_aura.csv',
+    'emotion': '_emotions.csv',
+    'gaze': '_gaze.csv',
+    'pointer': '_pointer_data.csv',
+}
+
+
+def _scan_csv_index(path, stride):
+    """
+    Finds the byte offset and the timestamp of one data row every stride rows of a csv file.
+    :param path: The path of the file.
+    :param stride: The number of rows between index entries.
+    :return: A tuple with the timestamps and the byte offsets of the indexed rows.
+    """
+    with open(path, 'rb') as file:
+        header_end = len(file.readline())
+        # Row 0 starts right after the header, row k after the k-th newline of the data section.
+        offsets = [header_end]
+        newline_count = 0
+        position = header_end
+        while True:
+            block = file.read(SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord('\n'))
+            rows = newline_count + 1 + np.arange(len(newlines))
+            offsets.extend((position + newlines[rows % stride == 0] + 1).tolist())
+            newline_count += len(newlines)
+            position += len(block)
+
+        file_size = position
+        timestamps = []
+        valid_offsets = []
+        if file_size > header_end:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for offset in offsets:
+                    if offset >= file_size:
+                        continue
+                    end = mapped.find(b',', offset)
+                    try:
+                        timestamps.append(float(mapped[offset:end]))
+                    except ValueError:
+                        # An incomplete last row.
+                        continue
+                    valid_offsets.append(offset)
+    return np.array(timestamps, dtype=np.float64), np.array(valid_offsets, dtype=np.int64)
+
+
+class SignalReader:
+    """
+    Reads time ranges of a single signal file, csv or binary, through its sparse timestamp index.
+    """
+    def __init__(self, path, stride=INDEX_STRIDE):
+        """
+        Opens the file and loads its index, building it if there is no valid cached index.
+        :param path: The path of the signal file.
+        :param stride: The number of rows between index entries when the index is built.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"The file {path} does not exist")
+        self.__path = path
+        self.__stride = stride
+        self.__binary = is_binary_file(path)
+        self.__size = os.path.getsize(path)
+        if self.__binary:
+            self.__records = read_binary(path)
+            self.__columns = list(self.__records.dtype.names)
+        else:
+            self.__records = None
+            self.__columns = list(pd.read_csv(path, nrows=0).columns)
+        self.__time_column = self.__columns[0]
+        self.__index_timestamps, self.__index_positions = self.__load_index()
+
+    @property
+    def path(self) -> str:
+        """
+        Returns the path of the signal file.
+        """
+        return self.__path
+
+    @property
+    def columns(self) -> list:
+        """
+        Returns the names of the columns, the first one is the timestamp.
+        """
+        return self.__columns
+
+    @property
+    def start_time(self):
+        """
+        Returns the timestamp of the first row, or None if the file has no rows.
+        """
+        self.__refresh()
+        return self.__index_timestamps[0] if len(self.__index_timestamps) else None
+
+    @property
+    def end_time(self):
+        """
+        Returns the timestamp of the last row, or None if the file has no rows. Only the rows after the last index entry
+        are read.
+        """
+        if not len(self.__index_timestamps):
+            return None
+        tail = self.read(self.__index_timestamps[-1])
+        return tail[self.__time_column].iloc[-1] if len(tail) else self.__index_timestamps[-1]
+
+    def read(self, start=None, end=None) -> pd.DataFrame:
+        """
+        Reads the rows with a timestamp in [start, end).
+        :param start: The first timestamp, None for the start of the file.
+        :param end: The timestamp after the last one, None for the end of the file.
+        :return: A DataFrame with the rows in the range.
+        """
+        self.__refresh()
+        first, last = self.__locate(start, end)
+        if self.__binary:
+            data = pd.DataFrame(np.asarray(self.__records[first:last]))
+        else:
+            with open(self.__path, 'rb') as file:
+                file.seek(first)
+                content = file.read(-1 if last is None else last - first)
+            if content.strip():
+                data = pd.read_csv(io.BytesIO(content), header=None, names=self.__columns)
+            else:
+                data = pd.DataFrame(columns=self.__columns)
+
+        times = data[self.__time_column]
+        mask = np.ones(len(data), dtype=bool)
+        if start is not None:
+            mask &= (times >= start).to_numpy()
+        if end is not None:
+            mask &= (times < end).to_numpy()
+        return data[mask].reset_index(drop=True)
+
+    def __getitem__(self, key) -> pd.DataFrame:
+        """
+        Reads a time range with the slice syntax, reader[t0:t1].
+        """
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError("Signals are indexed by time ranges, as reader[start:end].")
+        return self.read(key.start, key.stop)
+
+    # Private methods
+    def __locate(self, start, end):
+        """
+        Finds the rows that may contain the timestamps in [start, end) with the index.
+        :return: The first and the end position, byte offsets for csv files and record indices for binary files. The
+        end is None when the range reaches the end of the file.
+        """
+        timestamps = self.__index_timestamps
+        positions = self.__index_positions
+        if not len(timestamps):
+            return (0, 0) if self.__binary else (self.__data_offset(), None)
+
+        first = positions[0]
+        if start is not None:
+            # A timestamp repeated across index entries may have rows with it in the block before its first entry.
+            block = np.searchsorted(timestamps, start, side='left') - 1
+            first = positions[max(block, 0)]
+        last = None
+        if end is not None:
+            block = np.searchsorted(timestamps, end, side='left')
+            if block < len(positions):
+                last = positions[block]
+        if self.__binary and last is None:
+            last = len(self.__records)
+        return int(first), last if last is None else int(last)
+
+    def __refresh(self):
+        """
+        Takes the rows appended since the file was opened or last read into account.
+        """
+        size = os.path.getsize(self.__path)
+        if size == self.__size:
+            return
+        self.__size = size
+        if self.__binary:
+            self.__records = read_binary(self.__path)
+        if self.__binary or not len(self.__index_timestamps):
+            self.__index_timestamps, self.__index_positions = self.__load_index()
+
+    def __data_offset(self) -> int:
+        """
+        Returns the byte offset of the first data row of a csv file.
+        """
+        with open(self.__path, 'rb') as file:
+            return len(file.readline())
+
+    def __load_index(self):
+        """
+        Loads the cached index if it matches the current file, otherwise builds it and caches it.
+        :return: A tuple with the indexed timestamps and their positions.
+        """
+        index_path = self.__path + INDEX_SUFFIX
+        status = os.stat(self.__path)
+        if os.path.exists(index_path):
+            try:
+                with np.load(index_path) as cached:
+                    if (int(cached['size']) == status.st_size and int(cached['mtime']) == status.st_mtime_ns and
+                            int(cached['stride']) == self.__stride):
+                        return cached['timestamps'], cached['positions']
+            except (OSError, ValueError, KeyError):
+                pass
+
+        if self.__binary:
+            positions = np.arange(0, len(self.__records), self.__stride, dtype=np.int64)
+            timestamps = np.asarray(self.__records[self.__time_column][::self.__stride], dtype=np.float64)
+        else:
+            timestamps, positions = _scan_csv_index(self.__path, self.__stride)
+
+        temporary_path = index_path + '.tmp'
+        try:
+            with open(temporary_path, 'wb') as file:
+                np.savez(file, timestamps=timestamps, positions=positions, size=status.st_size,
+                         mtime=status.st_mtime_ns, stride=self.__stride)
+            os.replace(temporary_path, index_path)
+        except OSError:
+            # The index is only a cache, a read-only session folder is still readable.
+            pass
+        return timestamps, positions
+
+
+class SessionReader:
+    """
+    Gives access to all the signals collected for a participant, as written by the backend server.
+    """
+    def __init__(self, folder, participant, stride=INDEX_STRIDE):
+        """
+        Opens the signal files found in the folder, in csv or binary format.
+        :param folder: The folder with the collected files.
+        :param participant: The participant name used as prefix of the files.
+        :param stride: The number of rows between index entries when an index is built.
+        """
+        self.__signals = {}
+        for signal, suffix in SIGNAL_FILE_SUFFIXES.items():
+            path = os.path.join(folder, f'{participant}{suffix}')
+            for candidate in (storage_path(path, STORAGE_FORMAT_BINARY), storage_path(path, STORAGE_FORMAT_CSV)):
+                if os.path.exists(candidate):
+                    self.__signals[signal] = SignalReader(candidate, stride)
+                    break
+
+    @property
+    def signals(self) -> list:
+        """
+        Returns the names of the signals available in the session.
+        """
+        return list(self.__signals)
+
+    def read(self, start=None, end=None) -> dict:
+        """
+        Reads a time range of every signal.
+        :param start: The first timestamp, None for the start of the session.
+        :param end: The timestamp after the last one, None for the end of the session.
+        :return: A dictionary with a DataFrame per signal.
+        """
+        return {signal: reader.read(start, end) for signal, reader in self.__signals.items()}
+
+    def __getitem__(self, key):
+        """
+        session['aura'] returns the reader of a signal, session[t0:t1] the time range of every signal.
+        """
+        if isinstance(key, str):
+            return self.__signals[key]
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError("Sessions are indexed by signal name or by time ranges, as session[start:end].")
+        return self.read(key.start, key.stop)
@@ -49,9 +49,14 @@ class AffineTransformer:
         if retval:
             self.success = True
             self.transform_matrix = M
+            # The inverse only depends on the estimated matrix, so it is computed once here instead of on every
+            # to_m1 call.
+            affine_transform_4x4 = np.vstack([self.transform_matrix, [0, 0, 0, 1]])
+            self.inverse_transform_matrix = np.linalg.inv(affine_transform_4x4)
         else:
             self.success = False
             self.transform_matrix = None
+            self.inverse_transform_matrix = None
 
     def _get_scale_factor(self, m1_hor_points, m1_ver_points, m2_hor_points, m2_ver_points):
         """
@@ -101,12 +106,53 @@ class AffineTransformer:
         - np.array or None: Transformed point back in the first model's space if the transformation was successful; otherwise None.
         """
         if self.success:
-            affine_transform_4x4 = np.vstack([self.transform_matrix, [0, 0, 0, 1]])
-            inverse_affine_transform = np.linalg.inv(affine_transform_4x4)
             m2_point_homogeneous = np.append(m2_point * self.scale_factor, 1)  # Convert to homogeneous coordinates
-            m1_point_homogeneous = np.dot(inverse_affine_transform, m2_point_homogeneous)
+            m1_point_homogeneous = np.dot(self.inverse_transform_matrix, m2_point_homogeneous)
 
             # Convert back to non-homogeneous coordinates
             return (m1_point_homogeneous[:3] / m1_point_homogeneous[3])
         else:
             return None
+
+    def to_m2_many(self, m1_points):
+        """
+        Transforms a batch of points from the first model space to the second model space in a single matrix product.
+
+        Args:
+        - m1_points (np.array): Array of shape (N, 3) with points in the first model's coordinate space.
+
+        Returns:
+        - np.array or None: Array of shape (N, 3) with the transformed points if the transformation was successful;
+          otherwise None.
+        """
+        if self.success:
+            m1_points = np.asarray(m1_points, dtype=float).reshape(-1, 3)
+            rotation = self.transform_matrix[:, :3]
+            translation = self.transform_matrix[:, 3]
+            return (m1_points @ rotation.T + translation) / self.scale_factor
+        else:
+            return None
+
+    def to_m1_many(self, m2_points):
+        """
+        Transforms a batch of points from the second model space back to the first model space using the inverse
+        matrix computed at construction.
+
+        Args:
+        - m2_points (np.array): Array of shape (N, 3) with points in the second model's coordinate space.
+
+        Returns:
+        - np.array or None: Array of shape (N, 3) with the points in the first model's space if the transformation was
+          successful; otherwise None.
+        """
+        if self.success:
+            m2_points = np.asarray(m2_points, dtype=float).reshape(-1, 3) * self.scale_factor
+            rotation = self.inverse_transform_matrix[:3, :3]
+            translation = self.inverse_transform_matrix[:3, 3]
+            m1_points = m2_points @ rotation.T + translation
+
+            # Convert back to non-homogeneous coordinates
+            w = m2_points @ self.inverse_transform_matrix[3, :3] + self.inverse_transform_matrix[3, 3]
+            return m1_points / w[:, np.newaxis]
+        else:
+            return None
@@ -22,6 +22,9 @@ import numpy as np
 from scipy.optimize import minimize
 import time
 
+SOLVER_MINIMIZE = 'minimize'
+SOLVER_ALGEBRAIC = 'algebraic'
+
 class EyeballDetector:
     def __init__(self, initial_eye_center,
                  initial_eye_radius=0.02,
@@ -29,7 +32,9 @@ class EyeballDetector:
                  reasonable_confidence=0.997,
                  points_threshold=300,
                  points_history_size=400,
-                 refresh_time_threshold=10000):
+                 refresh_time_threshold=10000,
+                 solver=SOLVER_MINIMIZE,
+                 refinement_steps=0):
         """
         Initializes the eyeball detector with customizable parameters for detecting the eye's sphere.
 
@@ -41,7 +46,12 @@ class EyeballDetector:
         - points_threshold (int): Number of points required to start estimation.
         - points_history_size (int): Maximum size of the queue of collected points for calculating.
         - refresh_time_threshold (int): Time in milliseconds to refresh the detection state.
+        - solver (str): Sphere fitting method, either 'minimize' (bounded L-BFGS) or 'algebraic' (closed-form linear
+          least squares).
+        - refinement_steps (int): Number of Gauss-Newton steps applied after the algebraic fit.
         """
+        if solver not in (SOLVER_MINIMIZE, SOLVER_ALGEBRAIC):
+            raise ValueError(f"Unknown solver: {solver}")
         self.eye_center = np.array(initial_eye_center)
         self.eye_radius = initial_eye_radius
         self.min_confidence = min_confidence
@@ -49,12 +59,56 @@ class EyeballDetector:
         self.points_threshold = points_threshold
         self.points_history_size = points_history_size
         self.refresh_time_threshold = refresh_time_threshold
-        self.points_for_eye_center = None
+        self.solver = solver
+        self.refinement_steps = refinement_steps
+        # Circular buffer holding the latest points, preallocated so steady-state updates do not allocate.
+        self._points_buffer = np.empty((points_history_size, 3))
+        self._points_write_index = 0
+        self._points_count = 0
         self.current_confidence = 0.0
         self.center_detected = False
         self.search_completed = False
         self.last_update_time = int(time.time() * 1000)
 
+    @property
+    def points_for_eye_center(self):
+        """
+        Returns a read-only view of the collected points without copying them. The rows are not in arrival order once
+        the buffer has wrapped around, which does not matter for the sphere fit.
+        :return: An array of shape (n, 3) with the collected points, or None if no points were collected.
+        """
+        if self._points_count == 0:
+            return None
+        view = self._points_buffer[:self._points_count]
+        view.flags.writeable = False
+        return view
+
+    def _add_points(self, new_points):
+        """
+        Copies the new points into the circular buffer, overwriting the oldest ones when it is full.
+
+        Args:
+        - new_points (np.array): Array of shape (n, 3) with the points to store.
+        """
+        new_points = np.asarray(new_points).reshape(-1, 3)
+        size = self.points_history_size
+        if len(new_points) >= size:
+            # Only the most recent points fit, so the buffer is rewritten from the start.
+            self._points_buffer[:] = new_points[-size:]
+            self._points_write_index = 0
+            self._points_count = size
+            return
+
+        end = self._points_write_index + len(new_points)
+        if end <= size:
+            self._points_buffer[self._points_write_index:end] = new_points
+        else:
+            split = size - self._points_write_index
+            self._points_buffer[self._points_write_index:] = new_points[:split]
+            self._points_buffer[:end - size] = new_points[split:]
+        self._points_write_index = end % size
+        self._points_count = min(self._points_count + len(new_points), size)
+
     def update(self, new_points, timestamp_ms):
         """
         Updates the detection of the eye's sphere center and radius based on current points and confidence.
@@ -64,12 +118,9 @@ class EyeballDetector:
         - timestamp_ms (int): The current frame's timestamp in milliseconds.
         """
 
-        if self.points_for_eye_center is not None:
-            self.points_for_eye_center = np.concatenate((self.points_for_eye_center, new_points), axis=0)[-self.points_history_size:]
-        else:
-            self.points_for_eye_center = new_points
+        self._add_points(new_points)
 
-        if len(self.points_for_eye_center) >= self.points_threshold and not self.search_completed:
+        if self._points_count >= self.points_threshold and not self.search_completed:
             center, radius, confidence = self._solve_for_sphere(self.points_for_eye_center)
 
             if confidence and confidence > self.current_confidence:
@@ -89,7 +140,22 @@ class EyeballDetector:
 
     def _solve_for_sphere(self, points, radius_bounds=(0.015, 0.025)):
         """
-        Solves for the sphere's center and radius given a set of points.
+        Solves for the sphere's center and radius given a set of points using the configured solver.
+
+        Args:
+        - points (np.array): Array of points.
+        - radius_bounds (tuple): Bounds for the sphere's radius (min_radius, max_radius).
+
+        Returns:
+        - tuple: The center (x, y, z), radius of the sphere, and the confidence of the solution.
+        """
+        if self.solver == SOLVER_ALGEBRAIC:
+            return self._solve_for_sphere_algebraic(points, radius_bounds)
+        return self._solve_for_sphere_minimize(points, radius_bounds)
+
+    def _solve_for_sphere_minimize(self, points, radius_bounds=(0.015, 0.025)):
+        """
+        Solves for the sphere's center and radius given a set of points with a bounded iterative optimizer.
 
         Args:
         - points (np.array): Array of points.
@@ -114,11 +180,57 @@ class EyeballDetector:
         else:
             return None, None, None
 
+    def _solve_for_sphere_algebraic(self, points, radius_bounds=(0.015, 0.025)):
+        """
+        Solves for the sphere's center and radius with a closed-form linear least squares fit. The sphere equation
+        |p|^2 = 2 c.p + (R^2 - |c|^2) is linear in c and R^2 - |c|^2, so a single lstsq call replaces the iterative
+        optimizer. The radius is projected onto the bounds and optionally refined with a few Gauss-Newton steps.
+
+        Args:
+        - points (np.array): Array of points.
+        - radius_bounds (tuple): Bounds for the sphere's radius (min_radius, max_radius).
+
+        Returns:
+        - tuple: The center (x, y, z), radius of the sphere, and the confidence of the solution.
+        """
+        points = np.asarray(points, dtype=float)
+        A = np.empty((len(points), 4))
+        A[:, :3] = 2 * points
+        A[:, 3] = 1
+        b = np.einsum('ij,ij->i', points, points)
+        solution, _, rank, _ = np.linalg.lstsq(A, b, rcond=None)
+        if rank < 4:
+            return None, None, None
+
+        center = solution[:3]
+        squared_radius = solution[3] + center.dot(center)
+        if squared_radius <= 0:
+            return None, None, None
+        radius = np.clip(np.sqrt(squared_radius), *radius_bounds)
+
+        for _ in range(self.refinement_steps):
+            offsets = points - center
+            distances = np.linalg.norm(offsets, axis=1)
+            if np.any(distances == 0):
+                break
+            residuals = distances - radius
+            jacobian = np.empty((len(points), 4))
+            jacobian[:, :3] = -offsets / distances[:, np.newaxis]
+            jacobian[:, 3] = -1
+            step = np.linalg.lstsq(jacobian, -residuals, rcond=None)[0]
+            center = center + step[:3]
+            radius = np.clip(radius + step[3], *radius_bounds)
+
+        residuals = np.linalg.norm(points - center, axis=1) - radius
+        confidence = 1 / (1 + np.sum(residuals**2))  # Inverse of loss, same metric as the iterative solver
+        return center, radius, confidence
+
     def reset(self):
         """
         Resets the detector to initial values and states.
         """
-        self.points_for_eye_center = None
+        self._points_write_index = 0
+        self._points_count = 0
         self.current_confidence = 0.0
         self.center_detected = False
         self.search_completed = False
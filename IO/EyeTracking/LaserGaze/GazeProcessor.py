@@ -16,7 +16,13 @@ import time
 from .landmarks import *
 from .face_model import *
 from .AffineTransformer import AffineTransformer
-from .EyeballDetector import EyeballDetector
+from .EyeballDetector import EyeballDetector, SOLVER_MINIMIZE
+from IO.VideoProcessing.CameraCapture import CameraCapture
+
+LEFT_EYE_CENTER_DETECTION_INDICES = LEFT_IRIS + ADJACENT_LEFT_EYELID_PART
+RIGHT_EYE_CENTER_DETECTION_INDICES = RIGHT_IRIS + ADJACENT_RIGHT_EYELID_PART
+EYE_CENTER_DETECTION_INDICES = LEFT_EYE_CENTER_DETECTION_INDICES + RIGHT_EYE_CENTER_DETECTION_INDICES
+LEFT_EYE_CENTER_DETECTION_POINTS = len(LEFT_EYE_CENTER_DETECTION_INDICES)
 
 class GazeProcessor:
     """
@@ -24,20 +30,29 @@ class GazeProcessor:
     Outputs gaze vector estimates asynchronously via a provided callback function.
     """
 
-    def __init__(self, camera_idx=0, visualization_options=None):
+    def __init__(self, camera_idx=0, visualization_options=None, sphere_solver=SOLVER_MINIMIZE, frame_source=None):
         """
         Initializes the gaze processor with optional camera settings and visualization configurations.
         Args:
-        - camera_idx (int): Index of the camera to be used for video capture.
+        - camera_idx (int or str): Index of the camera to be used for video capture, or the path of a video file.
         - visualization_options (object): Options for visual feedback on the video frame.
+        - sphere_solver (str): Sphere fitting method used by the eyeball detectors, 'minimize' or 'algebraic'.
+        - frame_source (object): Optional shared frame source, such as a FrameBroker subscription. When given, the
+          camera is not opened by the processor and camera_idx is ignored.
         """
         self.__camera_idx = camera_idx
+        self.__frame_source = frame_source
         self.__vis_options = visualization_options
-        self.__left_detector = EyeballDetector(DEFAULT_LEFT_EYE_CENTER_MODEL)
-        self.__right_detector = EyeballDetector(DEFAULT_RIGHT_EYE_CENTER_MODEL)
+        self.__left_detector = EyeballDetector(DEFAULT_LEFT_EYE_CENTER_MODEL, solver=sphere_solver)
+        self.__right_detector = EyeballDetector(DEFAULT_RIGHT_EYE_CENTER_MODEL, solver=sphere_solver)
         self._running = False
         self.__cap = None
         self.__landmarker = None
+        self.__last_sequence = 0
+        self.__last_timestamp_ms = -1
+        self.__processing_scale = 1.0
+        self.__dropped_frames = 0
+        self.__stage_latencies = {'capture': 0.0, 'landmarks': 0.0, 'gaze': 0.0}
 
         model_path = os.path.join(os.path.dirname(__file__), 'face_landmarker.task')
         BaseOptions = mp.tasks.BaseOptions
@@ -57,16 +72,54 @@ class GazeProcessor:
         """
         return self._running
 
+    @property
+    def processing_scale(self):
+        """
+        Returns the factor applied to the frame size before landmark detection, 1.0 means full resolution.
+        """
+        return self.__processing_scale
+
+    @processing_scale.setter
+    def processing_scale(self, value):
+        """
+        Sets the factor applied to the frame size before landmark detection. Lower values trade accuracy for speed.
+        """
+        if not 0 < value <= 1:
+            raise ValueError("The processing scale must be in the range (0, 1].")
+        self.__processing_scale = value
+
+    @property
+    def dropped_frames(self):
+        """
+        Returns the number of captured frames that were skipped because a newer frame was already available.
+        """
+        return self.__dropped_frames
+
+    @property
+    def stage_latencies(self):
+        """
+        Returns the time in seconds spent by the last frame waiting for the capture, detecting the landmarks and
+        computing the gaze vectors.
+        """
+        return self.__stage_latencies
+
     def start(self):
         """
         Starts the video processing loop to detect facial landmarks and calculate gaze vectors.
         Continuously updates the video display and invokes callback with gaze data.
         """
         print("Inicializando cámara para Eye Tracking...")
-        self.__cap = cv2.VideoCapture(self.__camera_idx)
-        if not self.__cap.isOpened():
+        # The capture thread owns the camera so reading frames overlaps with landmark detection.
+        if self.__frame_source is not None:
+            self.__cap = self.__frame_source
+            opened = not self.__cap.is_finished
+        else:
+            self.__cap = CameraCapture(self.__camera_idx)
+            opened = self.__cap.start()
+        if not opened:
             print("Error al abrir la cámara. Verifique que la cámara esté conectada y reinicie la aplicación.")
             return
+        self.__last_sequence = 0
         self.__landmarker = self.FaceLandmarker.create_from_options(self.options)
         self._running = True
         print("Cámara inicializada correctamente.")
@@ -80,14 +133,49 @@ class GazeProcessor:
         if not self._running:
             raise RuntimeError("Gaze processor is not started, start() must be called first.")
 
-        success, frame = self.__cap.read()
-        if not success:
+        # Takes the newest frame published by the capture thread, older ones are dropped.
+        capture_start = time.perf_counter()
+        frame, timestamp, sequence = self.__cap.read_latest(self.__last_sequence)
+        processing_start = time.perf_counter()
+        self.__stage_latencies['capture'] = processing_start - capture_start
+        if frame is None:
+            if self.__cap.is_finished:
+                # The video file ended or the camera was released.
+                self._running = False
             return None, None, frame
+        if self.__last_sequence:
+            self.__dropped_frames += sequence - self.__last_sequence - 1
+        self.__last_sequence = sequence
 
-        timestamp_ms = int(time.time() * 1000)
-        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame)
+        result = self.process_frame(frame, int(timestamp * 1000))
+        self.__stage_latencies['gaze'] = (time.perf_counter() - processing_start -
+                                          self.__stage_latencies['landmarks'])
+        return result
 
+    def process_frame(self, frame, timestamp_ms):
+        """
+        Estimates the gaze vectors of a single frame. Used by get_gaze_vector for live capture and directly for recorded
+        videos, where the timestamps are derived from the frame index instead of the wall clock.
+        :param frame: The BGR image to process.
+        :param timestamp_ms: The timestamp of the frame in milliseconds.
+        :return: A tuple of None if the data is being calibrated, otherwise a tuple of vectors containing the gaze info.
+        """
+        if self.__landmarker is None:
+            self.__landmarker = self.FaceLandmarker.create_from_options(self.options)
+
+        # MediaPipe requires strictly increasing timestamps in VIDEO mode.
+        timestamp_ms = max(timestamp_ms, self.__last_timestamp_ms + 1)
+        self.__last_timestamp_ms = timestamp_ms
+        detection_frame = frame
+        if self.__processing_scale < 1.0:
+            # Landmarks are normalized to the image size, so they do not depend on the detection resolution.
+            detection_frame = cv2.resize(frame, None, fx=self.__processing_scale, fy=self.__processing_scale,
+                                         interpolation=cv2.INTER_AREA)
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=detection_frame)
+
+        landmarks_start = time.perf_counter()
         face_landmarker_result = self.__landmarker.detect_for_video(mp_image, timestamp_ms)
+        self.__stage_latencies['landmarks'] = time.perf_counter() - landmarks_start
 
         if face_landmarker_result.face_landmarks:
             lms_s = np.array([[lm.x, lm.y, lm.z] for lm in face_landmarker_result.face_landmarks[0]])
@@ -101,14 +189,11 @@ class GazeProcessor:
             at = AffineTransformer(lms_s[BASE_LANDMARKS, :], BASE_FACE_MODEL, mp_hor_pts, mp_ver_pts,
                                    model_hor_pts, model_ver_pts)
 
-            indices_for_left_eye_center_detection = LEFT_IRIS + ADJACENT_LEFT_EYELID_PART
-            left_eye_iris_points = lms_s[indices_for_left_eye_center_detection]
-            left_eye_iris_points_in_model_space = [at.to_m2(mpp) for mpp in left_eye_iris_points]
+            # All iris and eyelid points of both eyes are mapped into model space with a single matrix product.
+            eye_points_in_model_space = at.to_m2_many(lms_s[EYE_CENTER_DETECTION_INDICES])
+            left_eye_iris_points_in_model_space = eye_points_in_model_space[:LEFT_EYE_CENTER_DETECTION_POINTS]
+            right_eye_iris_points_in_model_space = eye_points_in_model_space[LEFT_EYE_CENTER_DETECTION_POINTS:]
             self.__left_detector.update(left_eye_iris_points_in_model_space, timestamp_ms)
-
-            indices_for_right_eye_center_detection = RIGHT_IRIS + ADJACENT_RIGHT_EYELID_PART
-            right_eye_iris_points = lms_s[indices_for_right_eye_center_detection]
-            right_eye_iris_points_in_model_space = [at.to_m2(mpp) for mpp in right_eye_iris_points]
             self.__right_detector.update(right_eye_iris_points_in_model_space, timestamp_ms)
 
             left_gaze_vector, right_gaze_vector = None, None
@@ -127,6 +212,9 @@ class GazeProcessor:
                 right_proj_point = right_pupil + right_gaze_vector * 5.0
 
             if self.__vis_options:
+                if not frame.flags.writeable:
+                    # Frames shared through a broker are read-only.
+                    frame = frame.copy()
                 if self.__left_detector.center_detected and self.__right_detector.center_detected:
                     if left_proj_point is not None and right_proj_point is not None and left_pupil is not None and right_pupil is not None:
                         p1 = relative(left_pupil[:2], frame.shape)
@@ -145,8 +233,8 @@ class GazeProcessor:
 
     def stop_processing(self):
         """
-        Releases the webcam from the current experiment.
+        Releases the webcam, or the shared frame source subscription, from the current experiment.
         """
         if self.__cap:
-            self.__cap.release()
+            self.__cap.stop()
         self._running = False
@@ -4,17 +4,19 @@ from IO.FileWriting.Writer import Writer
 
 
 class AuraDataWriter(Writer):
-    def __init__(self, output_path, file_name, initial_line):
+    def __init__(self, output_path, file_name, initial_line, **writer_options):
         """
         Creates a writer object for the specified for handling aura signals.
         :param output_path: the folder where the data is going to be written.
         :param file_name: the name of the file to be written.
+        :param writer_options: options of the base Writer, such as async_mode.
         """
-        super().__init__(output_path, file_name, initial_line)
+        super().__init__(output_path, file_name, initial_line, **writer_options)
 
     def write_data(self, timestamp, data) -> bool:
         """
-        Processes the data if it comes in an incorrect format and writes it to the csv file.
+        Processes the data if it comes in an incorrect format and writes it to the csv file. The whole chunk is
+        handed to the storage as a single block instead of writing the samples one by one.
         :param timestamp: The timestamp of the data in form of array
         :param data: The matrix of data containing reading from all the channels.
         :exception: A ValueError if the data cannot be matched.
@@ -27,9 +29,9 @@ class AuraDataWriter(Writer):
                 if len(timestamp) != len(data):
                     raise ValueError('Length of timestamp and data cannot be matched. Hint: the data might be reversed.'
                                      'Expected input format [timestamp, data]')
-            for i in range(len(data)):
-                if self._is_writer_opened:
-                    self._csv_writer.writerow(np.append(timestamp[i], data[i]))
+            if len(data):
+                self._write_block(np.column_stack((timestamp, data)))
             written = True
 
         return written
+
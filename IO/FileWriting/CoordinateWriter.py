@@ -1,13 +1,14 @@
 from IO.FileWriting.Writer import Writer
 
 class CoordinateWriter(Writer):
-    def __init__(self, file_path, file_name):
+    def __init__(self, file_path, file_name, **writer_options):
         """
         Initializes the CoordinateWriter object with the file path and file name.
         :param file_path: The path where the file will be saved.
         :param file_name: The name of the file to store the data.
+        :param writer_options: Options of the base Writer, such as async_mode.
         """
-        super().__init__(file_path, file_name, ['timestamp','x', 'y'])
+        super().__init__(file_path, file_name, ['timestamp','x', 'y'], **writer_options)
 
     def write(self, timestamp, data):
         """
@@ -15,10 +16,8 @@ class CoordinateWriter(Writer):
         vectors of the left and right eyes, and the last 2 elements are the x and y coordinates of the gaze.
         :param data: the gaze data to be written.
         """
-        if not self._is_writer_opened:
-            self.create_new_file()
+        self._create_file_on_first_write()
 
         if len(data) != 2:
             raise ValueError("The data must be a list of 2 elements.")
-        self._csv_writer.writerow([timestamp] + data)
-        self._csv_file.flush()
+        self._write_row([timestamp] + data, flush=True)
@@ -1,23 +1,39 @@
 from IO.FileWriting.Writer import Writer
 
+# Type of the emotion labels in the binary storage format.
+EMOTION_LABEL_TYPE = '<U16'
+
 class EmotionPredictedWriter(Writer):
-    def __init__(self, output_path, file_name):
+    def __init__(self, output_path, file_name, labels=None, **writer_options):
         """
         Creates a writer object for the specified that focuses on writing the emotion on each second of the experiment.
         :param output_path: the folder where the data is going to be written.
-        :param file_name: the name of the file to be written.        """
-        super().__init__(output_path, file_name, ['Time', 'Emotion Predicted'])
+        :param file_name: the name of the file to be written.
+        :param labels: Optional names of the emotion classes. When given, the probability of each class is written in
+        a numeric column named after it, next to the predicted emotion.
+        :param writer_options: options of the base Writer, such as async_mode.
+        """
+        self.__labels = list(labels or [])
+        super().__init__(output_path, file_name, ['Time', 'Emotion Predicted'] + self.__labels,
+                         column_types={'Emotion Predicted': EMOTION_LABEL_TYPE}, **writer_options)
 
-    def write_data(self, timestamp, data) -> bool:
+    def write_data(self, timestamp, data, probabilities=None) -> bool:
         """
         Writes the time and the emotion predicted into a csv file.
         :param timestamp: The timestamp of the data in form of array
         :param data: The label containing the predicted emotion.
+        :param probabilities: The probability of each class, in the order of the labels of the writer.
+        :exception: A ValueError if the writer has labels and the probabilities do not match them.
         :return: True if the data was written, False otherwise.
         """
         written = False
         if self._is_writer_opened and timestamp is not None and data is not None:
-            self._csv_writer.writerow([timestamp, data])
+            row = [timestamp, data]
+            if self.__labels:
+                if probabilities is None or len(probabilities) != len(self.__labels):
+                    raise ValueError(f'Expected {len(self.__labels)} probabilities, one for each label.')
+                row.extend(float(probability) for probability in probabilities)
+            self._write_row(row)
             written = True
 
-        return written
\ No newline at end of file
+        return written
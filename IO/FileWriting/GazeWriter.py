@@ -1,13 +1,14 @@
 from IO.FileWriting.Writer import Writer
 
 class GazeWriter(Writer):
-    def __init__(self, file_path, file_name):
+    def __init__(self, file_path, file_name, **writer_options):
         """
         Initializes the GazeWriter object with the file path and file name.
         :param file_path: The path where the file will be saved.
         :param file_name: The name of the file to store the data.
+        :param writer_options: Options of the base Writer, such as async_mode.
         """
-        super().__init__(file_path, file_name, ['l_x', 'l_y', 'l_z', 'r_x', 'r_y', 'r_z', 'x', 'y'])
+        super().__init__(file_path, file_name, ['l_x', 'l_y', 'l_z', 'r_x', 'r_y', 'r_z', 'x', 'y'], **writer_options)
 
     def write(self, data):
         """
@@ -15,11 +16,22 @@ class GazeWriter(Writer):
         vectors of the left and right eyes, and the last 2 elements are the x and y coordinates of the gaze.
         :param data: the gaze data to be written.
         """
-        if not self._is_writer_opened:
-            self.create_new_file()
+        self._create_file_on_first_write()
 
         if len(data) != 8:
             raise ValueError("The data must be a list of 8 elements.")
 
-        self._csv_writer.writerow(data)
-        self._csv_file.flush()
+        self._write_row(data, flush=True)
+
+    def write_rows(self, rows):
+        """
+        Writes several rows of gaze data at once, used by the offline processing of videos. Each row has the 8 elements
+        described in write.
+        :param rows: the rows of gaze data to be written.
+        """
+        self._create_file_on_first_write()
+
+        if any(len(row) != 8 for row in rows):
+            raise ValueError("Each row must be a list of 8 elements.")
+
+        self._write_rows(rows)
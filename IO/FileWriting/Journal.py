@@ -0,0 +1,173 @@
+"""
+Journal.py
+
+Write-ahead journal of the Writer classes. Every item written by the background writer thread is appended to a
+journal segment before it reaches the data file, and the segment is synced to disk once per flush batch, not once per
+row. If the process dies, the data file may end with a partial row or miss the rows still in the operating system
+buffers, while the journal holds every item up to its last sync.
+
+A segment starts with a header that records the storage format, the columns of the writer and the size of the data
+file when the segment was started. At that point the data file was synced, so it is known to be complete up to that
+size. Recovery truncates the data file to that size and replays the records of the segment. Replaying is idempotent,
+a crash during recovery is fixed by running it again. When a segment grows too large the data file is synced and a new
+segment replaces it, so the journal only keeps the rows since the last checkpoint. The journal is removed when the
+writer is closed cleanly.
+
+Segment layout:
+    magic (8 bytes) | header length (uint32) | json header | records
+Record layout:
+    payload length (uint32) | crc32 of the payload (uint32) | pickled item
+"""
+import json
+import os
+import pickle
+import struct
+import zlib
+
+import numpy as np
+
+from IO.FileWriting.SessionStorage import create_storage
+
+JOURNAL_SUFFIX = '.journal'
+JOURNAL_MAGIC = b'AURAWAL1'
+HEADER_LENGTH = struct.Struct('<I')
+RECORD_HEADER = struct.Struct('<II')
+DEFAULT_SEGMENT_SIZE = 64 * 2 ** 20
+
+
+class Journal:
+    """
+    The journal segment of a single data file.
+    """
+    def __init__(self, data_path, storage_format, columns, column_types=None, segment_size=DEFAULT_SEGMENT_SIZE):
+        """
+        :param data_path: The path of the data file protected by the journal.
+        :param storage_format: The storage format of the data file.
+        :param columns: The columns of the data file.
+        :param column_types: The column types given to the storage, if any.
+        :param segment_size: The size in bytes after which the writer should start a new segment.
+        """
+        self.__path = data_path + JOURNAL_SUFFIX
+        self.__header = {"storage_format": storage_format, "columns": list(columns),
+                         "column_types": dict(column_types or {}), "data_offset": 0}
+        self.__segment_size = segment_size
+        self.__file = None
+        self.__size = 0
+        self.__dirty = False
+
+    @property
+    def path(self) -> str:
+        """
+        Returns the path of the journal segment.
+        """
+        return self.__path
+
+    @property
+    def is_full(self) -> bool:
+        """
+        Returns True when the segment is larger than the segment size and a checkpoint should be done.
+        """
+        return self.__size >= self.__segment_size
+
+    def start(self, data_offset):
+        """
+        Starts a new segment, replacing the current one. The data file must be synced up to data_offset.
+        :param data_offset: The size of the data file, which is complete up to this point.
+        """
+        if self.__file is not None:
+            self.__file.close()
+        self.__header["data_offset"] = data_offset
+        header = json.dumps(self.__header).encode('utf-8')
+        temporary_path = self.__path + '.tmp'
+        with open(temporary_path, 'wb') as file:
+            file.write(JOURNAL_MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self.__path)
+        self.__file = open(self.__path, 'ab')
+        self.__size = self.__file.tell()
+        self.__dirty = False
+
+    def append(self, item):
+        """
+        Appends an item, a sequence of rows or a block, to the segment. It is durable after the next sync.
+        :param item: The item queued in the writer.
+        """
+        payload = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        self.__file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+        self.__file.write(payload)
+        self.__size += RECORD_HEADER.size + len(payload)
+        self.__dirty = True
+
+    def sync(self):
+        """
+        Syncs the records appended since the last sync to disk.
+        """
+        if self.__dirty:
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+            self.__dirty = False
+
+    def close(self, remove=True):
+        """
+        Closes the segment.
+        :param remove: Removes the segment, done when the data file was closed and synced.
+        """
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+        if remove and os.path.exists(self.__path):
+            os.remove(self.__path)
+
+
+def read_journal(journal_path):
+    """
+    Reads a journal segment, stopping at the first incomplete or corrupted record, which is the one being written when
+    the process died.
+    :param journal_path: The path of the segment.
+    :return: A tuple with the header dictionary and the list of items.
+    """
+    items = []
+    with open(journal_path, 'rb') as file:
+        if file.read(len(JOURNAL_MAGIC)) != JOURNAL_MAGIC:
+            raise ValueError(f"{journal_path} is not a journal segment.")
+        header_length, = HEADER_LENGTH.unpack(file.read(HEADER_LENGTH.size))
+        header = json.loads(file.read(header_length).decode('utf-8'))
+        while True:
+            record_header = file.read(RECORD_HEADER.size)
+            if len(record_header) < RECORD_HEADER.size:
+                break
+            length, checksum = RECORD_HEADER.unpack(record_header)
+            payload = file.read(length)
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            items.append(pickle.loads(payload))
+    return header, items
+
+
+def recover_journal(journal_path):
+    """
+    Rebuilds the data file of a journal left by a writer that was not closed, then removes the journal.
+    :param journal_path: The path of the segment.
+    :return: A tuple with the path of the data file and the number of rows replayed.
+    """
+    header, items = read_journal(journal_path)
+    data_path = journal_path[:-len(JOURNAL_SUFFIX)]
+    data_offset = header["data_offset"]
+    storage = create_storage(header["storage_format"], header["columns"], header["column_types"])
+
+    append = data_offset > 0 and os.path.exists(data_path)
+    if append and os.path.getsize(data_path) > data_offset:
+        # Rows after the checkpoint may be partial, they are all in the journal.
+        os.truncate(data_path, data_offset)
+    storage.open(data_path, append=append)
+    rows = 0
+    for item in items:
+        if isinstance(item, np.ndarray):
+            storage.write_block(item)
+        else:
+            storage.write_rows(item)
+        rows += len(item)
+    storage.close()
+    os.remove(journal_path)
+    return data_path, rows
@@ -1,14 +1,15 @@
 from IO.FileWriting.Writer import Writer
 
 class PointerWriter(Writer):
-    def __init__(self, file_path, file_name):
+    def __init__(self, file_path, file_name, **writer_options):
         """
         Initializes the PointerWriter object with the file path and file name.
         
         :param file_path: The path where the file will be saved.
         :param file_name: The name of the file to store the data.
+        :param writer_options: Options of the base Writer, such as async_mode.
         """
-        super().__init__(file_path, file_name, ['timestamp', 'x', 'y'])
+        super().__init__(file_path, file_name, ['timestamp', 'x', 'y'], **writer_options)
 
     def write(self, timestamp, x, y):
         """
@@ -18,11 +19,9 @@ class PointerWriter(Writer):
         :param y: The y-coordinate of the pointer.
         :raises ValueError: If the data does not contain exactly two elements.
         """
-        if not self._is_writer_opened:
-            self.create_new_file()
+        self._create_file_on_first_write()
 
         if not isinstance(x, (int, float)) or not isinstance(y, (int, float)):
             raise ValueError("Both x and y coordinates must be numeric values.")
 
-        self._csv_writer.writerow([timestamp] + [x, y])
-        self._csv_file.flush()
+        self._write_row([timestamp] + [x, y], flush=True)
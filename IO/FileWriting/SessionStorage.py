@@ -0,0 +1,334 @@
+"""
+SessionStorage.py
+
+Storage backends used by the Writer classes to persist the session signals.
+
+- 'csv': The original text format, one csv row per sample.
+- 'binary': An append-only file of fixed-size typed records. The schema is built from the channel names of the initial
+  line: timestamps are stored as float64, the other channels as float32 unless another type is given. The file starts
+  with a small header describing the schema, padded to a 64 byte boundary, followed by the records written in chunks as
+  they arrive. Since every record has the same size the data section can be memory-mapped as a structured NumPy array,
+  and a file cut by a crash only loses its last incomplete record.
+
+Binary layout:
+    magic (8 bytes) | version (uint8) | reserved (uint8) | header length (uint16, little-endian) |
+    json header {"columns": [...], "types": [...]} padded with spaces | records
+"""
+import csv
+import json
+import os
+import struct
+
+import numpy as np
+from numpy.lib import recfunctions
+
+STORAGE_FORMAT_CSV = 'csv'
+STORAGE_FORMAT_BINARY = 'binary'
+STORAGE_FORMATS = (STORAGE_FORMAT_CSV, STORAGE_FORMAT_BINARY)
+
+CSV_EXTENSION = '.csv'
+BINARY_EXTENSION = '.bin'
+
+BINARY_MAGIC = b'\x93AURASES'
+BINARY_VERSION = 1
+HEADER_ALIGNMENT = 64
+PREAMBLE = struct.Struct('<8sBBH')
+
+TIMESTAMP_COLUMNS = ('timestamp', 'time')
+TIMESTAMP_COLUMN_TYPE = '<f8'
+DEFAULT_COLUMN_TYPE = '<f4'
+
+# Line terminator used by the csv module, kept so the formatted blocks match the rows written by csv.writer.
+CSV_LINE_TERMINATOR = '\r\n'
+
+
+def build_schema(columns, column_types=None) -> np.dtype:
+    """
+    Builds the record type of a binary file from the channel names.
+    :param columns: The names of the columns, as in the initial line of the writers.
+    :param column_types: Optional dictionary with the NumPy type of some columns, such as '<U16' for text.
+    :return: The structured NumPy type of a record.
+    """
+    column_types = column_types or {}
+    fields = []
+    for column in columns:
+        if column in column_types:
+            column_type = column_types[column]
+        elif column.lower() in TIMESTAMP_COLUMNS:
+            column_type = TIMESTAMP_COLUMN_TYPE
+        else:
+            column_type = DEFAULT_COLUMN_TYPE
+        fields.append((column, np.dtype(column_type)))
+    return np.dtype(fields)
+
+
+def storage_path(path, storage_format) -> str:
+    """
+    Replaces the extension of a file with the one of the storage format.
+    :param path: The path of the file.
+    :param storage_format: 'csv' or 'binary'.
+    :return: The path with the extension of the format.
+    """
+    extension = BINARY_EXTENSION if storage_format == STORAGE_FORMAT_BINARY else CSV_EXTENSION
+    return os.path.splitext(path)[0] + extension
+
+
+def storage_format_of(path) -> str:
+    """
+    Returns the storage format matching the extension of a path.
+    :param path: The path of the file.
+    :return: 'binary' for the binary extension, 'csv' otherwise.
+    """
+    return STORAGE_FORMAT_BINARY if os.path.splitext(path)[1] == BINARY_EXTENSION else STORAGE_FORMAT_CSV
+
+
+def is_binary_file(path) -> bool:
+    """
+    Checks the magic bytes of a file to know if it is a binary session file.
+    :param path: The path of the file.
+    :return: True if the file is in the binary format.
+    """
+    with open(path, 'rb') as file:
+        return file.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+def read_binary_header(file):
+    """
+    Reads the header of a binary session file.
+    :param file: A file object opened in binary mode at the start of the file.
+    :return: A tuple with the record type and the offset of the first record.
+    """
+    preamble = file.read(PREAMBLE.size)
+    if len(preamble) < PREAMBLE.size:
+        raise ValueError("The file is too short to be a binary session file.")
+    magic, version, _, header_length = PREAMBLE.unpack(preamble)
+    if magic != BINARY_MAGIC:
+        raise ValueError("The file is not a binary session file.")
+    if version != BINARY_VERSION:
+        raise ValueError(f"Unsupported binary session version: {version}")
+    header = json.loads(file.read(header_length).decode('utf-8'))
+    schema = np.dtype([(column, np.dtype(column_type))
+                       for column, column_type in zip(header['columns'], header['types'])])
+    return schema, PREAMBLE.size + header_length
+
+
+def read_binary(path, mmap=True) -> np.ndarray:
+    """
+    Reads a binary session file. An incomplete last record, left by an interrupted write, is ignored.
+    :param path: The path of the file.
+    :param mmap: Maps the file into memory instead of reading it, so only the accessed columns and rows are loaded.
+    :return: A structured array with one record per sample, the fields are the channel names.
+    """
+    with open(path, 'rb') as file:
+        schema, offset = read_binary_header(file)
+    records = (os.path.getsize(path) - offset) // schema.itemsize
+    if records == 0:
+        return np.empty(0, dtype=schema)
+    if mmap:
+        return np.memmap(path, dtype=schema, mode='r', offset=offset, shape=(records,))
+    return np.fromfile(path, dtype=schema, count=records, offset=offset)
+
+
+def load_dataframe(path):
+    """
+    Loads a session file of either format into a pandas DataFrame.
+    :param path: The path of the file.
+    :return: The DataFrame with one column per channel.
+    """
+    import pandas as pd
+
+    if is_binary_file(path):
+        return pd.DataFrame(read_binary(path))
+    return pd.read_csv(path)
+
+
+def read_chunks(path, chunk_rows):
+    """
+    Reads a session file of either format in chunks of rows, without loading the whole file.
+    :param path: The path of the file.
+    :param chunk_rows: The number of rows of each chunk.
+    :return: An iterator of DataFrames.
+    """
+    import pandas as pd
+
+    if is_binary_file(path):
+        # Plain reads instead of a memory map, the pages of a map would stay resident while the file is streamed.
+        with open(path, 'rb') as file:
+            schema, offset = read_binary_header(file)
+            file.seek(offset)
+            while True:
+                records = np.fromfile(file, dtype=schema, count=chunk_rows)
+                if len(records) == 0:
+                    break
+                yield pd.DataFrame(records)
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+class CsvStorage:
+    """
+    Stores the rows as csv text.
+    """
+    def __init__(self, columns):
+        """
+        :param columns: The names of the columns, written as the first row of a new file.
+        """
+        self.__columns = columns
+        self.__file = None
+        self.__writer = None
+        self.__row_format = None
+        self.__row_length = None
+
+    def open(self, path, append=False):
+        """
+        Opens the file, a new file starts with the column names.
+        :param path: The path of the file.
+        :param append: Keeps the content of an existing file.
+        """
+        self.__file = open(path, 'a' if append else 'w')
+        self.__writer = csv.writer(self.__file)
+        if not append:
+            self.__writer.writerow(self.__columns)
+
+    def write_rows(self, rows):
+        """
+        Writes a sequence of rows.
+        :param rows: The rows, each one a sequence of values.
+        """
+        self.__writer.writerows(rows)
+
+    def write_block(self, block):
+        """
+        Formats a block of samples as csv rows with a single format operation.
+        :param block: A numeric matrix with one sample per row.
+        """
+        rows, row_length = block.shape
+        if row_length != self.__row_length:
+            # '%s' of a Python float is its shortest repr, the same text csv.writer produces.
+            self.__row_format = ','.join(['%s'] * row_length) + CSV_LINE_TERMINATOR
+            self.__row_length = row_length
+        self.__file.write((self.__row_format * rows) % tuple(block.ravel().tolist()))
+
+    def flush(self):
+        """Flushes the buffered rows to the operating system."""
+        self.__file.flush()
+
+    def checkpoint(self) -> int:
+        """
+        Flushes the file and syncs it to disk.
+        :return: The size of the file, which is complete up to this point.
+        """
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+        return os.fstat(self.__file.fileno()).st_size
+
+    def close(self):
+        """Flushes the file, syncs it to disk and closes it."""
+        self.checkpoint()
+        self.__file.close()
+
+
+class BinaryStorage:
+    """
+    Stores the rows as fixed-size typed records, see the module description for the layout.
+    """
+    def __init__(self, columns, column_types=None):
+        """
+        :param columns: The names of the columns.
+        :param column_types: Optional dictionary with the NumPy type of some columns.
+        """
+        self.__schema = build_schema(columns, column_types)
+        self.__file = None
+
+    @property
+    def schema(self) -> np.dtype:
+        """
+        Returns the record type of the file.
+        """
+        return self.__schema
+
+    def open(self, path, append=False):
+        """
+        Opens the file. A new or empty file starts with the header, an existing file must have the same schema and an
+        incomplete last record is removed before appending.
+        :param path: The path of the file.
+        :param append: Keeps the content of an existing file.
+        """
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as file:
+                schema, offset = read_binary_header(file)
+            if schema != self.__schema:
+                raise ValueError(f"The schema of {path} does not match the columns of the writer.")
+            records = (os.path.getsize(path) - offset) // schema.itemsize
+            os.truncate(path, offset + records * schema.itemsize)
+            self.__file = open(path, 'ab')
+        else:
+            self.__file = open(path, 'wb')
+            self.__file.write(self.__build_header())
+
+    def write_rows(self, rows):
+        """
+        Writes a sequence of rows.
+        :param rows: The rows, each one a sequence of values in the order of the columns.
+        """
+        self.write_records(np.array([tuple(row) for row in rows], dtype=self.__schema))
+
+    def write_block(self, block):
+        """
+        Writes a block of samples.
+        :param block: A numeric matrix with one sample per row.
+        """
+        self.write_records(recfunctions.unstructured_to_structured(np.asarray(block), dtype=self.__schema))
+
+    def write_records(self, records):
+        """
+        Writes records that already have the type of the file.
+        :param records: A structured array with the schema of the file.
+        """
+        self.__file.write(np.ascontiguousarray(records, dtype=self.__schema).tobytes())
+
+    def flush(self):
+        """Flushes the buffered records to the operating system."""
+        self.__file.flush()
+
+    def checkpoint(self) -> int:
+        """
+        Flushes the file and syncs it to disk.
+        :return: The size of the file, which is complete up to this point.
+        """
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+        return os.fstat(self.__file.fileno()).st_size
+
+    def close(self):
+        """Flushes the file, syncs it to disk and closes it."""
+        self.checkpoint()
+        self.__file.close()
+
+    def __build_header(self) -> bytes:
+        """
+        Builds the header describing the schema, padded so the records start at an aligned offset.
+        :return: The bytes of the header.
+        """
+        header = json.dumps({
+            "columns": list(self.__schema.names),
+            "types": [self.__schema.fields[name][0].str for name in self.__schema.names]
+        }).encode('utf-8')
+        padding = -(PREAMBLE.size + len(header) + 1) % HEADER_ALIGNMENT
+        header += b' ' * padding + b'\n'
+        return PREAMBLE.pack(BINARY_MAGIC, BINARY_VERSION, 0, len(header)) + header
+
+
+def create_storage(storage_format, columns, column_types=None):
+    """
+    Creates the storage backend of a writer.
+    :param storage_format: 'csv' or 'binary'.
+    :param columns: The names of the columns.
+    :param column_types: Optional dictionary with the NumPy type of some columns, only used by the binary format.
+    :return: The storage object.
+    """
+    if storage_format == STORAGE_FORMAT_CSV:
+        return CsvStorage(columns)
+    if storage_format == STORAGE_FORMAT_BINARY:
+        return BinaryStorage(columns, column_types)
+    raise ValueError(f"Unknown storage format: {storage_format}")
@@ -1,19 +1,64 @@
 import os
-import csv
+import queue
+import threading
+import time
+
+import numpy as np
+
+from IO.FileWriting.Journal import Journal
+from IO.FileWriting.SessionStorage import STORAGE_FORMAT_CSV, create_storage, storage_path
+
+DEFAULT_MAX_QUEUE_SIZE = 10000
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_FLUSH_ROWS = 1000
 
 class Writer:
-    def __init__(self, output_path, file_name, initial_line):
+    # Marks the end of the queue for the background writer thread.
+    __STOP = object()
+
+    def __init__(self, output_path, file_name, initial_line, async_mode=False, max_queue_size=DEFAULT_MAX_QUEUE_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, flush_rows=DEFAULT_FLUSH_ROWS,
+                 storage_format=STORAGE_FORMAT_CSV, column_types=None, journal=False):
         """
         Creates a writer object for the specified location and file.
         :param output_path: the folder where the data is going to be written.
         :param file_name: the name of the file to be written.
         :param initial_line: the initial line to be written containing the name of the data channels.
+        :param async_mode: if True, rows are queued and written by a background thread, so the collection threads do
+        not pay for the csv formatting and the system calls.
+        :param max_queue_size: the maximum number of queued writes in async mode, writers block when it is full.
+        :param flush_interval: the maximum time in seconds rows stay buffered in async mode before being flushed.
+        :param flush_rows: the number of buffered rows that triggers a flush in async mode.
+        :param storage_format: 'csv' or 'binary', the extension of the file name is replaced by the one of the format.
+        :param column_types: optional NumPy types of some channels in the binary format, by default the channels are
+        stored as float32 and the timestamps as float64.
+        :param journal: if True, the writer thread appends every item to a write-ahead journal synced once per flush
+        batch, so the file can be rebuilt with recover_journal after a crash. Implies async_mode.
         """
-        self.__INITIAL_LINE = initial_line
-        self._path = os.path.join(output_path, file_name)
+        self._path = storage_path(os.path.join(output_path, file_name), storage_format)
         self._is_writer_opened = False
-        self._csv_file = None
-        self._csv_writer = None
+        self.__was_closed = False
+        self._storage = create_storage(storage_format, initial_line, column_types)
+        self.__journal = Journal(self._path, storage_format, initial_line, column_types) if journal else None
+
+        self._async_mode = async_mode or journal
+        self.__lock = threading.Lock()
+        self.__max_queue_size = max_queue_size
+        self.__flush_interval = flush_interval
+        self.__flush_rows = flush_rows
+        self.__queue = None
+        self.__thread = None
+        self.__thread_error = None
+        # Set when the writer thread fails and never cleared, unlike the error raised once to the caller, so the
+        # journal of the failed session is kept.
+        self.__thread_failed = False
+
+    @property
+    def path(self) -> str:
+        """
+        Returns the path of the file, with the extension of the storage format.
+        """
+        return self._path
 
     def create_new_file(self):
         """
@@ -21,10 +66,9 @@ class Writer:
         """
         os.makedirs(os.path.dirname(self._path), exist_ok=True)
 
-        self._csv_file = open(self._path, 'w')
-        self._csv_writer = csv.writer(self._csv_file)
+        self._storage.open(self._path)
         self._is_writer_opened = True
-        self._csv_writer.writerow(self.__INITIAL_LINE)
+        self.__start_writer_thread()
 
     def open_existing_file(self):
         """
@@ -32,14 +76,153 @@ class Writer:
         """
         os.makedirs(os.path.dirname(self._path), exist_ok=True)
 
-        self._csv_file = open(self._path, 'a')
-        self._csv_writer = csv.writer(self._csv_file)
+        self._storage.open(self._path, append=True)
         self._is_writer_opened = True
+        self.__start_writer_thread()
 
     def close_file(self):
         """
-        Closes the file and disables the writer.
+        Closes the file and disables the writer. In async mode the queued rows are written first, and the file is
+        synced to disk before it is closed.
         """
-        if self._is_writer_opened:
-            self._csv_file.close()
+        with self.__lock:
+            if not self._is_writer_opened:
+                return
             self._is_writer_opened = False
+            self.__was_closed = True
+            thread = self.__thread
+            self.__thread = None
+        if thread is not None:
+            self.__queue.put(self.__STOP)
+            thread.join()
+        self._storage.close()
+        if self.__journal is not None:
+            self.__journal.close(remove=not self.__thread_failed)
+        self.__raise_thread_error()
+
+    # Protected methods used by the subclasses
+    def _create_file_on_first_write(self):
+        """
+        Creates the file if the writer was never opened. A writer that was closed stays closed, so a late write from a
+        collection thread cannot truncate the file.
+        """
+        if not self._is_writer_opened and not self.__was_closed:
+            self.create_new_file()
+
+    def _write_row(self, row, flush=False):
+        """
+        Writes a single row, or queues it in async mode.
+        :param row: the values of the row.
+        :param flush: flushes the file after the row in sync mode. Ignored in async mode, where the flush policy of
+        the writer thread applies.
+        """
+        self._write_rows((row,), flush)
+
+    def _write_rows(self, rows, flush=False):
+        """
+        Writes several rows at once, or queues them as a single item in async mode.
+        :param rows: a sequence of rows.
+        :param flush: flushes the file after the rows in sync mode.
+        """
+        with self.__lock:
+            if not self._is_writer_opened:
+                # A late write from a collection thread while the file is closed.
+                return
+            if self.__thread is not None:
+                self.__raise_thread_error()
+                self.__queue.put(rows)
+            else:
+                self._storage.write_rows(rows)
+                if flush:
+                    self._storage.flush()
+
+    def _write_block(self, block, flush=False):
+        """
+        Writes a numeric matrix with one row per sample, or queues it as a single item in async mode. Used by the
+        writers that receive whole chunks of data, which the storage formats at once instead of row by row.
+        :param block: a 2D NumPy array.
+        :param flush: flushes the file after the block in sync mode.
+        """
+        with self.__lock:
+            if not self._is_writer_opened:
+                return
+            if self.__thread is not None:
+                self.__raise_thread_error()
+                self.__queue.put(block)
+            else:
+                self._storage.write_block(block)
+                if flush:
+                    self._storage.flush()
+
+    # Private methods
+    def __start_writer_thread(self):
+        """
+        Starts the background thread that writes the queued rows in async mode.
+        """
+        if not self._async_mode or self.__thread is not None:
+            return
+        self.__queue = queue.Queue(maxsize=self.__max_queue_size)
+        self.__thread_error = None
+        if self.__journal is not None:
+            self.__journal.start(self._storage.checkpoint())
+        self.__thread = threading.Thread(target=self.__writer_loop, daemon=True)
+        self.__thread.start()
+
+    def __writer_loop(self):
+        """
+        Writes the queued rows into the file buffer as they arrive and flushes the file when enough rows are pending or
+        the flush interval expired, so the system calls are done once per batch instead of once per row. With a journal,
+        each item is journaled before it is written, the journal is synced with every flush, and a checkpoint starts a
+        new journal segment when the current one is full.
+        """
+        pending_rows = 0
+        last_flush = time.monotonic()
+        try:
+            while True:
+                timeout = self.__flush_interval - (time.monotonic() - last_flush)
+                try:
+                    item = self.__queue.get(timeout=max(timeout, 0)) if pending_rows else self.__queue.get()
+                except queue.Empty:
+                    item = None
+
+                if item is self.__STOP:
+                    break
+                if item is not None:
+                    if not pending_rows:
+                        # The interval counts from the oldest buffered row, not from the last flush.
+                        last_flush = time.monotonic()
+                    if self.__journal is not None:
+                        self.__journal.append(item)
+                    if isinstance(item, np.ndarray):
+                        self._storage.write_block(item)
+                    else:
+                        self._storage.write_rows(item)
+                    pending_rows += len(item)
+
+                if pending_rows and (pending_rows >= self.__flush_rows or
+                                     time.monotonic() - last_flush >= self.__flush_interval):
+                    self._storage.flush()
+                    if self.__journal is not None:
+                        self.__journal.sync()
+                        if self.__journal.is_full:
+                            self.__journal.start(self._storage.checkpoint())
+                    pending_rows = 0
+                    last_flush = time.monotonic()
+        except Exception as e:
+            self.__thread_error = e
+            self.__thread_failed = True
+            if self.__journal is not None:
+                # The journal is kept so the file can be recovered.
+                self.__journal.close(remove=False)
+            # Keeps draining so the producers and close_file do not block on a full queue.
+            while self.__queue.get() is not self.__STOP:
+                pass
+
+    def __raise_thread_error(self):
+        """
+        Raises in the caller thread an error that happened in the writer thread.
+        """
+        if self.__thread_error is not None:
+            error = self.__thread_error
+            self.__thread_error = None
+            raise RuntimeError(f"Error writing {self._path}") from error
@@ -0,0 +1,150 @@
+"""
+AuraAcquisition.py
+
+Reads the samples of an mne_lsl StreamLSL at a fixed cadence, returning each sample exactly once. The collection loop
+used to poll the stream every millisecond and copy the whole buffer when it was full of new samples, so the CPU was
+busy polling and the windows read could overlap or leave samples out.
+
+Each read asks the stream for a window slightly larger than the number of new samples, since samples can arrive
+between reading the counter and reading the data, and drops the samples at or before the last timestamp returned.
+The counters keep track of what could not be delivered:
+- lost_samples: Samples missing between two timestamps, estimated from the sampling rate.
+- overflows: Reads where the new samples no longer fit in the stream buffer, the oldest of them were overwritten.
+
+After each read, last_gap tells where the samples returned stop being continuous with the previous ones, so the
+consumers that keep a history of the signal, such as the band power estimator, can restart after the gap.
+"""
+import math
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_POLL_INTERVAL = 0.05
+# A gap larger than this many sample periods between two timestamps is counted as lost samples.
+GAP_TOLERANCE = 1.5
+
+
+class AuraAcquisition:
+    """
+    Pulls only the new samples of a stream at a configurable cadence.
+    """
+    def __init__(self, stream, poll_interval=DEFAULT_POLL_INTERVAL):
+        """
+        :param stream: The connected StreamLSL.
+        :param poll_interval: The time in seconds between two reads.
+        """
+        if stream is None:
+            raise RuntimeError("The stream is not created yet.")
+        if poll_interval <= 0:
+            raise ValueError("The poll interval must be positive.")
+        self.__stream = stream
+        self.__poll_interval = poll_interval
+        self.__sfreq = stream.info['sfreq']
+        self.__n_channels = stream.info['nchan']
+        self.__lock = threading.Lock()
+        self.__next_read = None
+        self.__last_timestamp = None
+        self.__received_samples = 0
+        self.__lost_samples = 0
+        self.__overflows = 0
+        self.__last_gap = None
+
+    @property
+    def last_gap(self):
+        """
+        Returns the index, in the samples returned by the last read, of the first sample after the last gap or
+        overflow, or None if they follow the previous samples without a gap.
+        """
+        return self.__last_gap
+
+    @property
+    def last_timestamp(self):
+        """
+        Returns the timestamp of the last sample returned, None before the first one.
+        """
+        return self.__last_timestamp
+
+    def read_new(self):
+        """
+        Reads the samples that arrived since the last call.
+        :return: A tuple with a 2D array of shape (n_channels, n_samples) and the timestamps of the samples. Both are
+        empty when there are no new samples.
+        """
+        self.__last_gap = None
+        if not self.__stream.connected:
+            return self.__empty()
+        n_new = self.__stream.n_new_samples
+        if n_new == 0:
+            return self.__empty()
+        n_buffer = self.__stream.n_buffer
+        overflow = n_new > n_buffer
+        if overflow:
+            with self.__lock:
+                self.__overflows += 1
+
+        # The margin covers the samples that arrive between reading the counter and reading the data.
+        margin = max(1, int(math.ceil(self.__poll_interval * self.__sfreq)))
+        n_read = min(n_new + margin, n_buffer)
+        data, timestamps = self.__stream.get_data(winsize=n_read / self.__sfreq if self.__sfreq else None)
+
+        if self.__last_timestamp is not None:
+            start = np.searchsorted(timestamps, self.__last_timestamp, side='right')
+            data, timestamps = data[:, start:], timestamps[start:]
+        if len(timestamps) == 0:
+            return self.__empty()
+
+        lost, gap = self.__find_gaps(timestamps)
+        self.__last_gap = 0 if overflow and gap is None else gap
+        with self.__lock:
+            self.__lost_samples += lost
+            self.__received_samples += len(timestamps)
+        self.__last_timestamp = timestamps[-1]
+        return data, timestamps
+
+    def wait(self):
+        """
+        Sleeps until the next read is due. The reads are scheduled on a fixed grid, so the time spent between two
+        calls does not make the cadence drift.
+        """
+        now = time.monotonic()
+        if self.__next_read is None or self.__next_read < now - self.__poll_interval:
+            # First call, or the caller fell behind by more than a period: the schedule restarts from now.
+            self.__next_read = now
+        self.__next_read += self.__poll_interval
+        delay = self.__next_read - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def get_stats(self) -> dict:
+        """
+        Returns the sample counters of the acquisition.
+        """
+        with self.__lock:
+            return {
+                'received_samples': self.__received_samples,
+                'lost_samples': self.__lost_samples,
+                'overflows': self.__overflows,
+                'last_timestamp': self.__last_timestamp,
+            }
+
+    # Private methods
+    def __find_gaps(self, timestamps):
+        """
+        Estimates the samples missing before and between the new timestamps from the sampling rate.
+        :return: A tuple with the number of samples lost and the index of the first new sample after the last gap, or
+        None without a gap.
+        """
+        if not self.__sfreq:
+            return 0, None
+        if self.__last_timestamp is not None:
+            steps = np.diff(timestamps, prepend=self.__last_timestamp) * self.__sfreq
+        else:
+            steps = np.concatenate(([0.0], np.diff(timestamps) * self.__sfreq))
+        gaps = np.flatnonzero(steps > GAP_TOLERANCE)
+        if not len(gaps):
+            return 0, None
+        return int(np.sum(np.round(steps[gaps]) - 1)), int(gaps[-1])
+
+    def __empty(self):
+        return np.empty((self.__n_channels, 0)), np.empty(0)
@@ -46,12 +46,13 @@ class AuraLslStreamHandler:
 
 
     @staticmethod
-    def available_streams() -> list[StreamInfo]:
+    def available_streams(timeout=1.0) -> list[StreamInfo]:
         """
         Shows the available streams to connect.
+        :param timeout: The time in seconds spent resolving the streams.
         :return: A list of StreamInfo objects.
         """
-        return resolve_streams()
+        return resolve_streams(timeout=timeout)
 
     def disconnect_stream(self):
         """
@@ -0,0 +1,110 @@
+"""
+AuraStreamManager.py
+
+Discovers the LSL streams on the network and keeps several of them connected at once, so a session can record the raw
+and the power streams of a headset, or the streams of several headsets, each with its own acquisition loop and file.
+
+The streams are identified by their LSL source_id, which has to be unique among the streams selected.
+"""
+import re
+
+from mne_lsl.stream import StreamLSL as Stream
+
+from IO.SignalProcessing.AuraSignalHandler import AuraLslStreamHandler
+from IO.SignalProcessing.AuraTools import rename_aura_channels
+
+DEFAULT_RESOLVE_TIMEOUT = 1.0
+# Channel counts of the Aura raw and power streams, the only ones renamed to the electrode names.
+AURA_CHANNEL_COUNTS = (8, 40)
+
+
+def stream_file_name(file_name, source_id, primary):
+    """
+    Returns the name of the file of a stream. The first stream selected keeps the usual file name, so the rest of the
+    pipeline finds it, and the other streams add their source_id before the extension.
+    :param file_name: The file name of the first stream, such as participant_aura.csv.
+    :param source_id: The source_id of the stream.
+    :param primary: True for the first stream selected.
+    :return: The file name.
+    """
+    if primary:
+        return file_name
+    root, extension = file_name.rsplit('.', 1) if '.' in file_name else (file_name, '')
+    safe_id = re.sub(r'[^A-Za-z0-9_-]', '_', source_id)
+    return f'{root}_{safe_id}.{extension}' if extension else f'{root}_{safe_id}'
+
+
+class AuraStreamManager:
+    """
+    Keeps a connected StreamLSL for each selected source_id.
+    """
+    def __init__(self, buffer_size_multiplier=1):
+        """
+        :param buffer_size_multiplier: The buffer size of each stream in seconds.
+        """
+        self.__buffer_size_multiplier = buffer_size_multiplier
+        self.__streams = {}
+
+    @property
+    def streams(self) -> dict:
+        """
+        Returns the connected streams by source_id, in the order they were selected.
+        """
+        return dict(self.__streams)
+
+    @staticmethod
+    def discover(timeout=DEFAULT_RESOLVE_TIMEOUT) -> list:
+        """
+        Lists the streams available on the network.
+        :param timeout: The time in seconds spent resolving the streams.
+        :return: A list of dictionaries describing each stream.
+        """
+        return [{
+            'source_id': info.source_id,
+            'name': info.name,
+            'type': info.stype,
+            'n_channels': info.n_channels,
+            'sfreq': info.sfreq,
+            'hostname': info.hostname,
+        } for info in AuraLslStreamHandler.available_streams(timeout)]
+
+    def connect(self, source_ids) -> dict:
+        """
+        Connects the selected streams and disconnects the others. The streams already connected are kept.
+        :param source_ids: The source_ids of the streams to acquire.
+        :return: The connected streams by source_id.
+        :exception: A RuntimeError if a stream cannot be connected, the streams connected before are kept.
+        """
+        if len(set(source_ids)) != len(source_ids):
+            raise ValueError("The same stream was selected more than once.")
+        for source_id in [source_id for source_id in self.__streams if source_id not in source_ids]:
+            self.disconnect(source_id)
+
+        streams = {}
+        for source_id in source_ids:
+            stream = self.__streams.get(source_id)
+            if stream is None or not stream.connected:
+                stream = Stream(bufsize=self.__buffer_size_multiplier, source_id=source_id)
+                stream.connect(processing_flags='all')
+                if stream.info['nchan'] in AURA_CHANNEL_COUNTS:
+                    rename_aura_channels(stream)
+            streams[source_id] = stream
+            self.__streams[source_id] = stream
+        self.__streams = streams
+        return self.streams
+
+    def disconnect(self, source_id):
+        """
+        Disconnects a stream.
+        :param source_id: The source_id of the stream.
+        """
+        stream = self.__streams.pop(source_id, None)
+        if stream is not None and stream.connected:
+            stream.disconnect()
+
+    def disconnect_all(self):
+        """
+        Disconnects every stream.
+        """
+        for source_id in list(self.__streams):
+            self.disconnect(source_id)
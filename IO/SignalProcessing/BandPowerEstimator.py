@@ -0,0 +1,190 @@
+"""
+BandPowerEstimator.py
+
+Computes the band powers of the raw 8 channel Aura EEG online, so the power signals are available when the device only
+streams the raw channels. The output has the layout of the 40 channel power stream, as named by rename_40_channels:
+the five bands of the first electrode to the last, Delta_F3 ... Gamma_P4.
+
+The powers are estimated with the Welch method over a sliding window. The window is split into overlapping segments
+whose step is the hop size of the estimator, so each new estimate only adds the segments that end in the new samples:
+their periodograms are computed with one FFT for all the channels and replace the oldest ones in a preallocated cache,
+and the PSD of the window is the mean of the cache. The new samples are copied into a preallocated ring buffer, so no
+memory is allocated per sample and the estimate costs one segment FFT per hop instead of a full Welch per window.
+"""
+import numpy as np
+
+WAVES = ['Delta', 'Theta', 'Alpha', 'Beta', 'Gamma']
+ELECTRODES = ['F3', 'F4', 'Cz', 'C3', 'C4', 'Pz', 'P3', 'P4']
+# Frequency range in Hz of each band, the upper limit is excluded.
+BANDS = {
+    'Delta': (1.0, 4.0),
+    'Theta': (4.0, 8.0),
+    'Alpha': (8.0, 13.0),
+    'Beta': (13.0, 30.0),
+    'Gamma': (30.0, 45.0),
+}
+
+DEFAULT_WINDOW_SECONDS = 2.0
+DEFAULT_SEGMENT_SECONDS = 1.0
+DEFAULT_HOP_SECONDS = 0.25
+
+
+def band_power_channel_names(electrodes=None) -> list:
+    """
+    Returns the names of the band power channels, in the order of rename_40_channels.
+    :param electrodes: The electrodes, defaults to the 8 electrodes of Aura.
+    :return: The list of names, wave major.
+    """
+    return [f'{wave}_{electrode}' for wave in WAVES for electrode in (electrodes or ELECTRODES)]
+
+
+class BandPowerEstimator:
+    """
+    Incremental Welch estimator of the band powers of several channels.
+    """
+    def __init__(self, sfreq, ch_names=None, window_seconds=DEFAULT_WINDOW_SECONDS,
+                 segment_seconds=DEFAULT_SEGMENT_SECONDS, hop_seconds=DEFAULT_HOP_SECONDS):
+        """
+        Prepares the buffers, the FFT window and the band integration matrix.
+        :param sfreq: The sampling frequency of the raw signal in Hz.
+        :param ch_names: The names of the input channels, defaults to the Aura electrodes in output order. The output
+        follows ELECTRODES whatever the order of the input is.
+        :param window_seconds: The length of the window over which the PSD is averaged.
+        :param segment_seconds: The length of each Welch segment, which sets the frequency resolution.
+        :param hop_seconds: The time between two estimates, also the step between segments.
+        """
+        ch_names = list(ch_names or ELECTRODES)
+        missing = [electrode for electrode in ELECTRODES if electrode not in ch_names]
+        if missing:
+            raise ValueError(f"The channels {missing} are missing from the raw signal.")
+        self.__channel_order = np.array([ch_names.index(electrode) for electrode in ELECTRODES])
+
+        self.__segment_length = int(round(segment_seconds * sfreq))
+        self.__hop_length = int(round(hop_seconds * sfreq))
+        window_length = int(round(window_seconds * sfreq))
+        if self.__hop_length <= 0 or self.__segment_length > window_length:
+            raise ValueError("The hop must be positive and the segments cannot be longer than the window.")
+        self.__segments_per_window = (window_length - self.__segment_length) // self.__hop_length + 1
+        n_channels = len(ch_names)
+
+        # The ring buffer holds the last segment of samples, the only ones needed for the next FFT.
+        self.__buffer = np.zeros((n_channels, self.__segment_length))
+        self.__write_index = 0
+        self.__samples_seen = 0
+        self.__samples_since_segment = 0
+
+        taper = np.hanning(self.__segment_length + 1)[:-1] if self.__segment_length > 1 else np.ones(1)
+        self.__taper = taper
+        frequencies = np.fft.rfftfreq(self.__segment_length, 1.0 / sfreq)
+        # One-sided density scaling, the same as scipy.signal.welch.
+        scale = np.full(len(frequencies), 2.0 / (sfreq * np.sum(taper ** 2)))
+        scale[0] /= 2
+        if self.__segment_length % 2 == 0:
+            scale[-1] /= 2
+        self.__scale = scale
+        resolution = frequencies[1] - frequencies[0] if len(frequencies) > 1 else sfreq
+        self.__band_matrix = np.stack([((frequencies >= low) & (frequencies < high)) * resolution
+                                       for low, high in BANDS.values()], axis=1)
+
+        self.__periodograms = np.zeros((self.__segments_per_window, n_channels, len(frequencies)))
+        self.__periodogram_index = 0
+        self.__periodogram_count = 0
+        self.__segment = np.empty((n_channels, self.__segment_length))
+
+    @property
+    def channel_names(self) -> list:
+        """
+        Returns the names of the output channels, in the order of rename_40_channels.
+        """
+        return band_power_channel_names()
+
+    @property
+    def is_ready(self) -> bool:
+        """
+        Returns True once a full window of samples has been received.
+        """
+        return self.__periodogram_count == self.__segments_per_window
+
+    def reset(self):
+        """
+        Discards the buffered samples, called by the collection loop when the acquisition reports a gap, so a window
+        does not mix the samples of both sides of it.
+        """
+        self.__write_index = 0
+        self.__samples_seen = 0
+        self.__samples_since_segment = 0
+        self.__periodogram_index = 0
+        self.__periodogram_count = 0
+
+    def push(self, samples, timestamps):
+        """
+        Adds new samples and returns the estimates completed with them, one per hop once the window is full.
+        :param samples: A 2D array of shape (n_channels, n_samples) with the new samples only.
+        :param timestamps: The timestamps of the new samples.
+        :return: A tuple with the timestamps of the estimates and a 2D array with one row of 40 band powers per
+        estimate. Both are empty if no estimate was completed.
+        """
+        estimate_times = []
+        estimates = []
+        position = 0
+        n_samples = samples.shape[1]
+        while position < n_samples:
+            # Copies until the next segment boundary, so segments are computed exactly every hop.
+            if self.__samples_seen < self.__segment_length:
+                needed = self.__segment_length - self.__samples_seen
+            else:
+                needed = self.__hop_length - self.__samples_since_segment
+            count = min(needed, n_samples - position)
+            self.__write(samples[:, position:position + count])
+            position += count
+            self.__samples_seen += count
+            self.__samples_since_segment += count
+
+            segment_complete = (self.__samples_seen == self.__segment_length or
+                                (self.__samples_seen > self.__segment_length and
+                                 self.__samples_since_segment == self.__hop_length))
+            if segment_complete:
+                self.__samples_since_segment = 0
+                self.__add_segment()
+                if self.is_ready:
+                    estimate_times.append(timestamps[position - 1])
+                    estimates.append(self.__band_powers())
+        if not estimates:
+            return np.empty(0), np.empty((0, len(WAVES) * len(ELECTRODES)))
+        return np.asarray(estimate_times), np.vstack(estimates)
+
+    # Private methods
+    def __write(self, samples):
+        """
+        Copies samples into the ring buffer.
+        """
+        count = samples.shape[1]
+        first = min(count, self.__segment_length - self.__write_index)
+        self.__buffer[:, self.__write_index:self.__write_index + first] = samples[:, :first]
+        if count > first:
+            self.__buffer[:, :count - first] = samples[:, first:]
+        self.__write_index = (self.__write_index + count) % self.__segment_length
+
+    def __add_segment(self):
+        """
+        Computes the periodogram of the last segment and replaces the oldest one of the window.
+        """
+        # The oldest sample of the ring buffer is at the write index.
+        start = self.__write_index
+        self.__segment[:, :self.__segment_length - start] = self.__buffer[:, start:]
+        self.__segment[:, self.__segment_length - start:] = self.__buffer[:, :start]
+        self.__segment -= self.__segment.mean(axis=1, keepdims=True)
+        self.__segment *= self.__taper
+        spectrum = np.fft.rfft(self.__segment, axis=1)
+        np.multiply(spectrum.real ** 2 + spectrum.imag ** 2, self.__scale,
+                    out=self.__periodograms[self.__periodogram_index])
+        self.__periodogram_index = (self.__periodogram_index + 1) % self.__segments_per_window
+        self.__periodogram_count = min(self.__periodogram_count + 1, self.__segments_per_window)
+
+    def __band_powers(self):
+        """
+        Integrates the mean PSD of the window over each band.
+        :return: A 1D array with the 40 band powers, wave major.
+        """
+        psd = self.__periodograms.mean(axis=0)[self.__channel_order]
+        return (psd @ self.__band_matrix).T.ravel()
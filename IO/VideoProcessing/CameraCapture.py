@@ -0,0 +1,131 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class CameraCapture:
+    """
+    Reads frames from a camera or a video file on a dedicated thread and publishes only the latest one.
+    Frames are read into the back slot of a double buffer and the slots are swapped when the frame is complete, so the
+    consumer always gets the newest frame and stale frames are dropped instead of queued.
+    """
+    def __init__(self, source=0, realtime=None):
+        """
+        Creates the capture object without opening the source.
+        :param source: The camera index or the path of a video file.
+        :param realtime: If True, frames of a video file are published at the file frame rate as a camera would do.
+        If False, they are read as fast as possible. Defaults to True for files and is ignored for cameras.
+        """
+        self.__source = source
+        self.__is_file = isinstance(source, str)
+        self.__realtime = self.__is_file if realtime is None else realtime
+        self.__video = None
+        self.__thread = None
+        self.__running = False
+        self.__finished = False
+
+        # Double buffer, the capture thread only writes into the back slot.
+        self.__front = None
+        self.__back = None
+        self.__timestamp = None
+        self.__sequence = 0
+        self.__condition = threading.Condition()
+
+    @property
+    def sequence(self) -> int:
+        """
+        Returns the sequence number of the latest published frame, 0 if no frame was published yet.
+        """
+        return self.__sequence
+
+    @property
+    def is_finished(self) -> bool:
+        """
+        Returns True when the source has no more frames, either because it was stopped or the video file ended.
+        """
+        return self.__finished
+
+    def start(self) -> bool:
+        """
+        Opens the source and starts the capture thread.
+        :return: True if the source was opened, False otherwise.
+        """
+        self.__video = cv2.VideoCapture(self.__source)
+        if not self.__video.isOpened():
+            return False
+        self.__running = True
+        self.__finished = False
+        self.__thread = threading.Thread(target=self.__capture_loop, daemon=True)
+        self.__thread.start()
+        return True
+
+    def stop(self):
+        """
+        Stops the capture thread and releases the source.
+        """
+        self.__running = False
+        if self.__thread is not None and self.__thread is not threading.current_thread():
+            self.__thread.join(timeout=1.0)
+        self.__thread = None
+        if self.__video is not None:
+            self.__video.release()
+        with self.__condition:
+            self.__finished = True
+            self.__condition.notify_all()
+
+    def read_latest(self, last_sequence=0, out=None, timeout=1.0):
+        """
+        Waits for a frame newer than last_sequence and returns the latest one. The frame is copied out of the double
+        buffer so the capture thread can keep writing while the caller processes it.
+        :param last_sequence: The sequence number of the last frame the caller processed.
+        :param out: Optional array to copy the frame into, reused between calls to avoid allocations.
+        :param timeout: Maximum time to wait in seconds.
+        :return: A tuple (frame, timestamp, sequence). The frame is None if no new frame arrived in time or the source
+        is finished.
+        """
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__sequence > last_sequence or self.__finished, timeout=timeout)
+            if self.__sequence <= last_sequence:
+                return None, None, last_sequence
+            if out is None or out.shape != self.__front.shape:
+                out = np.empty_like(self.__front)
+            np.copyto(out, self.__front)
+            return out, self.__timestamp, self.__sequence
+
+    def __capture_loop(self):
+        """
+        Reads frames until stopped and publishes each one by swapping the buffer slots.
+        """
+        frame_period = 0
+        if self.__realtime:
+            fps = self.__video.get(cv2.CAP_PROP_FPS)
+            frame_period = 1.0 / fps if fps and fps > 0 else 0
+        next_frame_time = time.perf_counter()
+
+        while self.__running:
+            success, frame = self.__video.read(self.__back)
+            if not success:
+                if self.__is_file:
+                    break
+                time.sleep(0.001)
+                continue
+            timestamp = time.time()
+
+            with self.__condition:
+                self.__back = self.__front
+                self.__front = frame
+                self.__timestamp = timestamp
+                self.__sequence += 1
+                self.__condition.notify_all()
+
+            if frame_period:
+                next_frame_time += frame_period
+                delay = next_frame_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+        with self.__condition:
+            self.__finished = True
+            self.__condition.notify_all()
@@ -0,0 +1,228 @@
+"""
+EmotionInferencePool.py
+
+Runs the DeepFace emotion model on a pool of worker processes, so the inference does not hold the GIL of the backend
+process and its throughput grows with the number of cores.
+
+The faces are prepared in the backend process by EmotionRecognizer.prepare_face, as the small grayscale image the
+emotion model takes, and sent to the workers in batches that are predicted with a single forward pass. Each worker
+builds the model once when it starts. The results are returned in the order the faces were submitted, with the
+capture time of their frame, so they are written with the time the face was seen instead of the time the prediction
+ended.
+
+The workers start when the first batch is sent, and building the model takes seconds, so warm_up can be called
+beforehand to start every worker and run a prediction on each of them.
+
+The number of batches sent to the workers and not returned yet is bounded. When the workers fall behind, the batch
+being filled keeps only the newest faces and the oldest ones are dropped, so the memory used does not grow.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait as wait_futures
+
+import numpy as np
+
+# Classes of the DeepFace emotion model, in the order of its output.
+EMOTION_LABELS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+DEFAULT_BATCH_SIZE = 8
+# A batch that is not full is sent anyway once its oldest face waited this long in seconds.
+DEFAULT_MAX_BATCH_DELAY = 0.1
+DEFAULT_PENDING_BATCHES_PER_WORKER = 2
+
+# Side of the faces predicted by warm_up, the size of the input of the emotion model.
+WARM_UP_FACE_SIZE = 48
+
+_emotion_model = None
+
+
+def _load_emotion_model():
+    """
+    Builds the emotion model in a worker process. TensorFlow is limited to one thread per worker, so the workers
+    share the cores instead of competing for them.
+    """
+    global _emotion_model
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    from deepface import DeepFace
+    try:
+        model = DeepFace.build_model(task='facial_attribute', model_name='Emotion')
+    except TypeError:
+        # DeepFace before 0.0.90 only takes the model name.
+        model = DeepFace.build_model('Emotion')
+    # Recent DeepFace versions wrap the Keras model in a client object.
+    _emotion_model = getattr(model, 'model', model)
+
+
+def _predict_batch(faces):
+    """
+    Predicts the emotion probabilities of a batch of faces in a worker process.
+    :param faces: A uint8 array of shape (n, size, size) with the grayscale faces.
+    :return: A float32 array of shape (n, len(EMOTION_LABELS)) with the probabilities in percent, as DeepFace returns
+    them.
+    """
+    inputs = faces[..., np.newaxis].astype(np.float32) / 255
+    probabilities = _emotion_model.predict(inputs, verbose=0)
+    return (100 * probabilities).astype(np.float32)
+
+
+class EmotionInferencePool:
+    """
+    Batches faces and predicts their emotions on worker processes.
+    """
+    def __init__(self, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE, max_batch_delay=DEFAULT_MAX_BATCH_DELAY,
+                 max_pending_batches=None):
+        """
+        :param workers: The number of worker processes.
+        :param batch_size: The maximum number of faces predicted at once.
+        :param max_batch_delay: The time in seconds after which a batch is sent even if it is not full.
+        :param max_pending_batches: The maximum number of batches sent and not returned yet, by default two per worker.
+        """
+        if workers < 1 or batch_size < 1:
+            raise ValueError("The pool needs at least one worker and one face per batch.")
+        self.__workers = workers
+        self.__batch_size = batch_size
+        self.__max_batch_delay = max_batch_delay
+        self.__max_pending_batches = max_pending_batches or DEFAULT_PENDING_BATCHES_PER_WORKER * workers
+        self.__executor = None
+        self.__lock = threading.Lock()
+        self.__batch_faces = deque(maxlen=batch_size)
+        self.__batch_times = deque(maxlen=batch_size)
+        self.__batch_started = None
+        self.__pending = deque()
+        self.__submitted_faces = 0
+        self.__predicted_faces = 0
+        self.__dropped_faces = 0
+        self.__failed_batches = 0
+
+    @property
+    def is_running(self) -> bool:
+        """
+        Returns True while the worker processes are running.
+        """
+        return self.__executor is not None
+
+    def start(self):
+        """
+        Starts the worker processes, each one builds the emotion model before predicting its first batch.
+        """
+        if self.__executor is None:
+            # TensorFlow is not safe to use in a forked process, the workers are spawned.
+            self.__executor = ProcessPoolExecutor(self.__workers, mp_context=multiprocessing.get_context('spawn'),
+                                                  initializer=_load_emotion_model)
+
+    def warm_up(self, timeout=None) -> float:
+        """
+        Starts the workers if needed and predicts a blank face on each of them, so every worker has built its model
+        before the first real face is submitted.
+        :param timeout: The maximum time to wait in seconds, None waits until the workers are ready.
+        :return: The time taken in seconds.
+        :exception: A TimeoutError if the workers are not ready in time, or the error of a worker that failed.
+        """
+        start = time.perf_counter()
+        self.start()
+        blank = np.zeros((1, WARM_UP_FACE_SIZE, WARM_UP_FACE_SIZE), dtype=np.uint8)
+        # One task per worker, the pool starts a new worker for each task while none of them is idle.
+        futures = [self.__executor.submit(_predict_batch, blank) for _ in range(self.__workers)]
+        _, not_done = wait_futures(futures, timeout=timeout)
+        if not_done:
+            raise TimeoutError("The emotion workers were not ready in time.")
+        for future in futures:
+            future.result()
+        return time.perf_counter() - start
+
+    def submit(self, face, timestamp) -> bool:
+        """
+        Adds a face to the current batch, which is sent to the workers when it is full or too old.
+        :param face: The face prepared by EmotionRecognizer.prepare_face.
+        :param timestamp: The capture time of the frame of the face.
+        :return: True if the face was queued without dropping an older one.
+        """
+        with self.__lock:
+            dropped = len(self.__batch_faces) == self.__batch_size
+            if dropped:
+                # The batch is full and could not be sent, the deques discard the oldest face.
+                self.__dropped_faces += 1
+            if not self.__batch_faces:
+                self.__batch_started = time.monotonic()
+            self.__batch_faces.append(face)
+            self.__batch_times.append(timestamp)
+            self.__submitted_faces += 1
+            self.__dispatch(force=False)
+        return not dropped
+
+    def get_results(self, wait=False) -> list:
+        """
+        Returns the predictions completed so far, in the order the faces were submitted. Also sends the current batch
+        if it waited long enough.
+        :param wait: Waits for every batch sent, used when the collection stops.
+        :return: A list of tuples with the capture time and the probabilities of each face.
+        """
+        results = []
+        while True:
+            with self.__lock:
+                # When waiting, the batch being filled is sent as soon as there is room for it.
+                self.__dispatch(force=wait)
+                if not self.__pending or not (wait or self.__pending[0][1].done()):
+                    break
+                timestamps, future = self.__pending.popleft()
+            try:
+                probabilities = future.result()
+            except Exception as e:
+                print(f"Error predicting emotions: {e}")
+                with self.__lock:
+                    self.__failed_batches += 1
+                continue
+            with self.__lock:
+                self.__predicted_faces += len(timestamps)
+            results.extend(zip(timestamps, probabilities))
+        return results
+
+    def get_stats(self) -> dict:
+        """
+        Returns the counters of the pool.
+        """
+        with self.__lock:
+            return {
+                'workers': self.__workers,
+                'submitted_faces': self.__submitted_faces,
+                'predicted_faces': self.__predicted_faces,
+                'dropped_faces': self.__dropped_faces,
+                'failed_batches': self.__failed_batches,
+                'pending_batches': len(self.__pending),
+            }
+
+    def stop(self, wait=True):
+        """
+        Stops the worker processes.
+        :param wait: Waits for the batches sent, otherwise they are cancelled.
+        """
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=wait, cancel_futures=not wait)
+            self.__executor = None
+        with self.__lock:
+            self.__pending.clear()
+            self.__batch_faces.clear()
+            self.__batch_times.clear()
+
+    # Private methods
+    def __dispatch(self, force):
+        """
+        Sends the current batch to the workers if it is full, too old or forced, and there is room for it. Called with
+        the lock held.
+        """
+        if not self.__batch_faces or self.__executor is None:
+            return
+        ready = (force or len(self.__batch_faces) == self.__batch_size or
+                 time.monotonic() - self.__batch_started >= self.__max_batch_delay)
+        if not ready or len(self.__pending) >= self.__max_pending_batches:
+            return
+        faces = np.stack(self.__batch_faces)
+        timestamps = list(self.__batch_times)
+        self.__batch_faces.clear()
+        self.__batch_times.clear()
+        self.__pending.append((timestamps, self.__executor.submit(_predict_batch, faces)))
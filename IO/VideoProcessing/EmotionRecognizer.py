@@ -1,46 +1,170 @@
+import time
+
 import cv2
-from deepface import DeepFace
+
+# DeepFace detector backend that uses the image as the face, the face is already located by the recognizer.
+SKIP_DETECTOR_BACKEND = 'skip'
+DEFAULT_DETECTION_INTERVAL = 5
+# Between two detections the face is searched in its last region grown by this fraction of its size on each side.
+TRACKING_MARGIN = 0.5
+# The face searched in the region can only be this much smaller or larger than the last one.
+TRACKING_SCALE_RANGE = (0.7, 1.4)
+# Side of the grayscale face taken by the DeepFace emotion model.
+EMOTION_INPUT_SIZE = 48
+
 
 class EmotionRecognizer:
     __DEFAULT_CAMERA_INDEX = 0
-    def __init__(self, backend_model, open_camera=True):
+    def __init__(self, backend_model=SKIP_DETECTOR_BACKEND, open_camera=True, frame_source=None,
+                 detection_interval=DEFAULT_DETECTION_INTERVAL):
         """
         Creates the object that will hand the predictions of the emotion recognizer.
-        :param backend_model: The backend to use to predict the emotion.
+        The face is detected in the whole frame every detection_interval frames and tracked in between by searching
+        it only around its last position, which is much cheaper. The crop of the face is given to DeepFace, which
+        skips its own face detection by default.
+        :param backend_model: The DeepFace detector backend applied to the face crop, 'skip' to use the crop as is.
+        :param open_camera: Opens the default camera when no frame source is given.
+        :param frame_source: Optional shared frame source, such as a FrameBroker subscription, used instead of opening
+        the camera.
+        :param detection_interval: The number of frames between two detections in the whole frame, 1 detects the face
+        in every frame.
         """
+        if detection_interval < 1:
+            raise ValueError("The detection interval must be at least 1.")
+        # DeepFace pulls in TensorFlow, it is only imported when recognize_emotion is used, not when the faces are
+        # prepared for a separate inference process.
+        self.__deepface = None
         self.__face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
         self.__backend_model = backend_model
-        if open_camera:
-            cv2.VideoCapture(self.__DEFAULT_CAMERA_INDEX)
+        self.__frame_source = frame_source
+        self.__last_sequence = 0
+        self.__detection_interval = detection_interval
+        self.__face = None
+        self.__frames_since_detection = 0
+        self.cap = None
+        if open_camera and frame_source is None:
             self.cap = cv2.VideoCapture(self.__DEFAULT_CAMERA_INDEX)
 
 
     # Public methods
     def recognize_emotion(self, frame=None):
         """
-        Applies filters necessary to recognize the main face and the face emotion.
-        :param frame: An image-like array containing the data.
-        :return: A string with the emotion prediction.
+        Locates the main face and recognizes its emotion.
+        :param frame: An image-like array containing the data, in the BGR order of OpenCV.
+        :return: The DeepFace analysis of the face, or None if there is no face.
         """
         if frame is None:
-            _, frame = self.cap.read()
-        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        rgb_frame = cv2.cvtColor(gray_frame, cv2.COLOR_GRAY2RGB)
-        faces = self.__face_cascade.detectMultiScale(gray_frame, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+            frame, _ = self.__read_frame()
+            if frame is None:
+                return None
+        if self.__deepface is None:
+            from deepface import DeepFace
+            self.__deepface = DeepFace
+        face = self.locate_face(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
         result = None
-        if len(faces) > 0:
-            x = faces[0][0]
-            y = faces[0][1]
-            w = faces[0][2]
-            h = faces[0][3]
-            face_roi = rgb_frame[y:y + h, x:x + w]
-            result = DeepFace.analyze(face_roi, actions=['emotion'], enforce_detection=False,
-                                      detector_backend=self.__backend_model)
+        if face is not None:
+            x, y, w, h = face
+            # DeepFace takes BGR images like OpenCV, so the crop is used without converting it.
+            face_roi = frame[y:y + h, x:x + w]
+            result = self.__deepface.analyze(face_roi, actions=['emotion'], enforce_detection=False,
+                                             detector_backend=self.__backend_model)
         return result
 
+    def read_face(self):
+        """
+        Reads the next frame and prepares its face for the emotion model, without running the model.
+        :return: A tuple with the face, as returned by prepare_face, and the capture time of the frame. Both are None
+        when no frame is available, and the face is None when the frame has no face.
+        """
+        frame, timestamp = self.__read_frame()
+        if frame is None:
+            return None, None
+        return self.prepare_face(frame), timestamp
+
+    def prepare_face(self, frame):
+        """
+        Locates the main face and resizes it to the input of the DeepFace emotion model, which only uses the grayscale
+        face. The grayscale frame of the detection is reused, so no other conversion is needed.
+        :param frame: An image-like array in the BGR order of OpenCV.
+        :return: A uint8 array of shape (EMOTION_INPUT_SIZE, EMOTION_INPUT_SIZE), or None if there is no face.
+        """
+        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        face = self.locate_face(gray_frame)
+        if face is None:
+            return None
+        x, y, w, h = face
+        return cv2.resize(gray_frame[y:y + h, x:x + w], (EMOTION_INPUT_SIZE, EMOTION_INPUT_SIZE))
+
+    def locate_face(self, gray_frame):
+        """
+        Detects the main face in the whole frame every detection_interval frames, or when the face was lost, and
+        tracks it around its last position otherwise.
+        :param gray_frame: The frame in grayscale.
+        :return: The region of the face as (x, y, w, h), or None if there is no face.
+        """
+        self.__frames_since_detection += 1
+        if self.__face is None or self.__frames_since_detection >= self.__detection_interval:
+            self.__frames_since_detection = 0
+            self.__face = self.__detect_face(gray_frame)
+        else:
+            self.__face = self.__track_face(gray_frame)
+        return self.__face
+
+    def reset_tracking(self):
+        """
+        Forgets the tracked face, so the next frame is searched entirely.
+        """
+        self.__face = None
+        self.__frames_since_detection = 0
+
     def stop_processing(self):
         """
-        Releases the webcam from the current experiment.
+        Releases the webcam, or the shared frame source subscription, from the current experiment.
         """
         if self.cap:
             self.cap.release()
+        if self.__frame_source is not None:
+            self.__frame_source.stop()
+
+    # Private methods
+    def __detect_face(self, gray_frame):
+        """
+        Detects the main face in the whole frame.
+        :return: The region of the face as (x, y, w, h), or None if there is no face.
+        """
+        faces = self.__face_cascade.detectMultiScale(gray_frame, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+        if len(faces) == 0:
+            return None
+        return tuple(int(value) for value in faces[0])
+
+    def __track_face(self, gray_frame):
+        """
+        Searches the face only in its last region grown by the tracking margin.
+        :return: The region of the face as (x, y, w, h), or None if it was lost.
+        """
+        x, y, w, h = self.__face
+        frame_height, frame_width = gray_frame.shape[:2]
+        left = max(0, int(x - w * TRACKING_MARGIN))
+        top = max(0, int(y - h * TRACKING_MARGIN))
+        right = min(frame_width, int(x + w * (1 + TRACKING_MARGIN)))
+        bottom = min(frame_height, int(y + h * (1 + TRACKING_MARGIN)))
+        min_size = (int(w * TRACKING_SCALE_RANGE[0]), int(h * TRACKING_SCALE_RANGE[0]))
+        max_size = (int(w * TRACKING_SCALE_RANGE[1]), int(h * TRACKING_SCALE_RANGE[1]))
+        faces = self.__face_cascade.detectMultiScale(gray_frame[top:bottom, left:right], scaleFactor=1.1,
+                                                     minNeighbors=5, minSize=min_size, maxSize=max_size)
+        if len(faces) == 0:
+            return None
+        # The largest face of the region is the tracked one.
+        fx, fy, fw, fh = max(faces, key=lambda face: face[2] * face[3])
+        return int(fx) + left, int(fy) + top, int(fw), int(fh)
+
+    def __read_frame(self):
+        """
+        Reads the next frame from the frame source if there is one, otherwise from the camera.
+        :return: A tuple with the frame and its capture time, the frame is None if no frame is available.
+        """
+        if self.__frame_source is not None:
+            frame, timestamp, self.__last_sequence = self.__frame_source.read_latest(self.__last_sequence)
+            return frame, timestamp
+        _, frame = self.cap.read()
+        return frame, time.time()
@@ -0,0 +1,212 @@
+"""
+EmotionSmoother.py
+
+Turns the emotion predictions of single frames into a smoothed probability time series. The prediction of a single
+frame flickers between classes, and a label written for each frame is mostly noise, so the probabilities are smoothed
+online over time and the dominant emotion is taken from the smoothed probabilities.
+
+Smoothing methods:
+- 'ema': Exponential moving average of the probabilities with a time constant, weighted by the time between frames.
+- 'hmm': Forward filtering of a hidden Markov model, where the emotion switches to any other class at a constant rate
+  and the prediction of each frame is the likelihood of the classes.
+- 'none': The probabilities of each frame as they are.
+
+EmotionSeries also decouples the rate of the predictions from the rate of the rows written: with an output rate, the
+smoothed state is written on a regular grid instead of once per prediction.
+"""
+import numpy as np
+
+SMOOTHING_NONE = 'none'
+SMOOTHING_EMA = 'ema'
+SMOOTHING_HMM = 'hmm'
+SMOOTHING_METHODS = (SMOOTHING_NONE, SMOOTHING_EMA, SMOOTHING_HMM)
+
+DEFAULT_TIME_CONSTANT = 1.0
+DEFAULT_SWITCH_RATE = 0.5
+# The smoothed state is not written further than this many seconds after the last prediction, so the rows stop when
+# the face is lost instead of repeating the last emotion.
+DEFAULT_MAX_HOLD = 1.0
+
+
+class ExponentialSmoother:
+    """
+    Exponential moving average of the probabilities, with a weight that depends on the time since the last frame.
+    """
+    def __init__(self, time_constant=DEFAULT_TIME_CONSTANT):
+        """
+        :param time_constant: The time in seconds after which a past prediction weighs 1/e of its initial weight.
+        """
+        if time_constant <= 0:
+            raise ValueError("The time constant must be positive.")
+        self.__time_constant = time_constant
+        self.__state = None
+        self.__last_time = None
+
+    def update(self, timestamp, probabilities):
+        """
+        Adds the prediction of a frame.
+        :param timestamp: The capture time of the frame.
+        :param probabilities: The probabilities of the classes, in any scale.
+        :return: The smoothed probabilities, which sum to 1.
+        """
+        probabilities = _normalize(probabilities)
+        if self.__state is None:
+            self.__state = probabilities
+        else:
+            weight = 1 - np.exp(-max(timestamp - self.__last_time, 0.0) / self.__time_constant)
+            self.__state = self.__state + weight * (probabilities - self.__state)
+        self.__last_time = timestamp
+        return self.__state
+
+    def reset(self):
+        """
+        Forgets the past predictions.
+        """
+        self.__state = None
+        self.__last_time = None
+
+
+class HmmSmoother:
+    """
+    Forward filter of a hidden Markov model of the emotion.
+    """
+    def __init__(self, switch_rate=DEFAULT_SWITCH_RATE):
+        """
+        :param switch_rate: The expected number of emotion changes per second.
+        """
+        if switch_rate <= 0:
+            raise ValueError("The switch rate must be positive.")
+        self.__switch_rate = switch_rate
+        self.__state = None
+        self.__last_time = None
+
+    def update(self, timestamp, probabilities):
+        """
+        Adds the prediction of a frame.
+        :param timestamp: The capture time of the frame.
+        :param probabilities: The probabilities of the classes, in any scale, used as the likelihood of each class.
+        :return: The posterior probabilities of the classes, which sum to 1.
+        """
+        likelihood = _normalize(probabilities)
+        if self.__state is None:
+            posterior = likelihood
+        else:
+            # Probability that the emotion did not change since the last frame, the rest is spread over all classes.
+            stay = np.exp(-self.__switch_rate * max(timestamp - self.__last_time, 0.0))
+            prior = stay * self.__state + (1 - stay) / len(self.__state)
+            posterior = prior * likelihood
+            total = posterior.sum()
+            # A prediction that rules out every likely class restarts the filter from the prediction.
+            posterior = posterior / total if total > 0 else likelihood
+        self.__state = posterior
+        self.__last_time = timestamp
+        return self.__state
+
+    def reset(self):
+        """
+        Forgets the past predictions.
+        """
+        self.__state = None
+        self.__last_time = None
+
+
+class NoSmoother:
+    """
+    Returns the probabilities of each frame as they are, normalized.
+    """
+    def update(self, timestamp, probabilities):
+        return _normalize(probabilities)
+
+    def reset(self):
+        pass
+
+
+def create_smoother(method=SMOOTHING_EMA, time_constant=DEFAULT_TIME_CONSTANT, switch_rate=DEFAULT_SWITCH_RATE):
+    """
+    Creates a smoother.
+    :param method: 'ema', 'hmm' or 'none'.
+    :param time_constant: The time constant of 'ema' in seconds.
+    :param switch_rate: The emotion changes per second of 'hmm'.
+    :return: The smoother.
+    """
+    if method == SMOOTHING_EMA:
+        return ExponentialSmoother(time_constant)
+    if method == SMOOTHING_HMM:
+        return HmmSmoother(switch_rate)
+    if method == SMOOTHING_NONE:
+        return NoSmoother()
+    raise ValueError(f"Unknown smoothing method: {method}")
+
+
+class EmotionSeries:
+    """
+    Smooths the predictions and decides which rows are written.
+    """
+    def __init__(self, labels, smoother, output_rate=None, max_hold=DEFAULT_MAX_HOLD):
+        """
+        :param labels: The names of the classes, in the order of the probabilities.
+        :param smoother: The smoother of the predictions.
+        :param output_rate: The rate in Hz of the rows written, None or 0 writes a row for each prediction.
+        :param max_hold: The time in seconds after the last prediction during which its state is still written.
+        """
+        self.__labels = list(labels)
+        self.__smoother = smoother
+        self.__output_period = 1.0 / output_rate if output_rate else None
+        self.__max_hold = max_hold
+        self.__state = None
+        self.__last_time = None
+        self.__next_output = None
+
+    def update(self, timestamp, probabilities) -> list:
+        """
+        Adds the prediction of a frame.
+        :param timestamp: The capture time of the frame.
+        :param probabilities: The probabilities of the classes.
+        :return: The rows to write, as tuples of the time, the dominant emotion and the smoothed probabilities.
+        """
+        if self.__last_time is not None and timestamp <= self.__last_time:
+            # A prediction older than the last one would make the series go back in time.
+            return []
+        rows = []
+        if self.__output_period is not None and self.__state is not None:
+            # The grid points before this frame get the state of the last prediction.
+            hold_end = self.__last_time + self.__max_hold
+            while self.__next_output < timestamp and self.__next_output <= hold_end:
+                rows.append(self.__row(self.__next_output))
+                self.__next_output += self.__output_period
+            if self.__next_output < timestamp:
+                # The grid points of a gap without predictions are skipped.
+                skipped = np.ceil((timestamp - self.__next_output) / self.__output_period)
+                self.__next_output += skipped * self.__output_period
+        self.__state = self.__smoother.update(timestamp, probabilities)
+        self.__last_time = timestamp
+        if self.__output_period is None:
+            rows.append(self.__row(timestamp))
+        elif self.__next_output is None or self.__next_output == timestamp:
+            # The grid starts at the first prediction.
+            rows.append(self.__row(timestamp))
+            self.__next_output = timestamp + self.__output_period
+        return rows
+
+    def reset(self):
+        """
+        Forgets the past predictions and restarts the output grid.
+        """
+        self.__smoother.reset()
+        self.__state = None
+        self.__last_time = None
+        self.__next_output = None
+
+    def __row(self, timestamp):
+        return timestamp, self.__labels[int(np.argmax(self.__state))], self.__state
+
+
+def _normalize(probabilities):
+    """
+    Scales the probabilities so they sum to 1, a uniform distribution if they are all 0.
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    total = probabilities.sum()
+    if total <= 0:
+        return np.full(len(probabilities), 1.0 / len(probabilities))
+    return probabilities / total
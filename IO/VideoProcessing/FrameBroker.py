@@ -0,0 +1,203 @@
+import threading
+import time
+
+from IO.VideoProcessing.VideoHandler import VideoHandler
+
+
+class FrameSubscription:
+    """
+    The view of a FrameBroker for a single consumer. It keeps only the latest frame delivered by the broker and
+    exposes the same read_latest interface as CameraCapture, so consumers can use either of them as a frame source.
+    """
+    def __init__(self, broker, max_fps=None):
+        """
+        Creates a subscription, use FrameBroker.subscribe instead of calling this directly.
+        :param broker: The broker delivering the frames.
+        :param max_fps: The maximum rate at which frames are delivered to this consumer, None for every frame.
+        """
+        self.__broker = broker
+        self.__min_period = 1.0 / max_fps if max_fps else 0
+        self.__frame = None
+        self.__timestamp = None
+        self.__sequence = 0
+        self.__finished = False
+        self.__condition = threading.Condition()
+
+    @property
+    def is_finished(self) -> bool:
+        """
+        Returns True when no more frames will be delivered, either because the broker stopped or the subscription was
+        cancelled.
+        """
+        return self.__finished
+
+    def read_latest(self, last_sequence=0, out=None, timeout=1.0):
+        """
+        Waits for a frame newer than last_sequence and returns the latest one delivered to this subscription.
+        The frame is shared with the other subscribers and is read-only. Pass out to get a writable copy instead.
+        :param last_sequence: The sequence number of the last frame the caller processed.
+        :param out: Optional array to copy the frame into.
+        :param timeout: Maximum time to wait in seconds.
+        :return: A tuple (frame, timestamp, sequence). The frame is None if no new frame arrived in time or the
+        subscription is finished.
+        """
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__sequence > last_sequence or self.__finished, timeout=timeout)
+            if self.__sequence <= last_sequence:
+                return None, None, last_sequence
+            frame = self.__frame
+            if out is not None:
+                out[...] = frame
+                frame = out
+            return frame, self.__timestamp, self.__sequence
+
+    def stop(self):
+        """
+        Cancels the subscription, the broker keeps serving the other consumers.
+        """
+        self.__broker.unsubscribe(self)
+        self._finish()
+
+    def _publish(self, frame, timestamp, sequence):
+        """
+        Delivers a frame if the rate limit of this subscription allows it.
+        :param frame: The read-only frame shared by all the subscribers.
+        :param timestamp: The capture time of the frame.
+        :param sequence: The sequence number of the frame in the broker.
+        """
+        if self.__timestamp is not None and timestamp - self.__timestamp < self.__min_period:
+            return
+        with self.__condition:
+            self.__frame = frame
+            self.__timestamp = timestamp
+            self.__sequence = sequence
+            self.__condition.notify_all()
+
+    def _finish(self):
+        """
+        Marks the subscription as finished and wakes up the consumer.
+        """
+        with self.__condition:
+            self.__finished = True
+            self.__condition.notify_all()
+
+
+class FrameBroker(VideoHandler):
+    """
+    Captures frames from a single camera or video file and fans them out to several consumers, so the gaze and the
+    emotion pipelines do not have to open the camera separately. Every frame is a new read-only array handed to all
+    the subscribers by reference, which avoids copies while preventing a consumer from modifying another's frame.
+    """
+    def __init__(self, source=0, realtime=None):
+        """
+        Opens the video source without starting the capture.
+        :param source: The camera index or the path of a video file.
+        :param realtime: If True, frames of a video file are published at the file frame rate as a camera would do.
+        Defaults to True for files and is ignored for cameras.
+        """
+        super().__init__(source)
+        self.__is_file = isinstance(source, str)
+        self.__realtime = self.__is_file if realtime is None else realtime
+        self.__subscriptions = []
+        self.__subscriptions_lock = threading.Lock()
+        self.__thread = None
+        self.__running = False
+        self.__sequence = 0
+
+    @property
+    def is_running(self) -> bool:
+        """
+        Returns True while the capture thread is running.
+        """
+        return self.__running
+
+    def subscribe(self, max_fps=None) -> FrameSubscription:
+        """
+        Registers a new consumer.
+        :param max_fps: The maximum rate at which frames are delivered to this consumer, None for every frame.
+        :return: The subscription used to read the frames.
+        """
+        subscription = FrameSubscription(self, max_fps)
+        with self.__subscriptions_lock:
+            self.__subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Removes a consumer, it will not receive more frames.
+        :param subscription: The subscription returned by subscribe.
+        """
+        with self.__subscriptions_lock:
+            if subscription in self.__subscriptions:
+                self.__subscriptions.remove(subscription)
+
+    def start(self) -> bool:
+        """
+        Starts the capture thread if it is not running.
+        :return: True if the source is open and the capture is running, False otherwise.
+        """
+        if self.__running:
+            return True
+        self.open_camera()
+        if not self.is_camera_open():
+            return False
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__capture_loop, daemon=True)
+        self.__thread.start()
+        return True
+
+    def stop(self):
+        """
+        Stops the capture, releases the source and finishes all the subscriptions. The consumers are woken up before
+        waiting for the capture thread, so their reads return at once instead of waiting out their timeout.
+        """
+        self.__running = False
+        self.__finish_subscriptions()
+        if self.__thread is not None and self.__thread is not threading.current_thread():
+            self.__thread.join(timeout=1.0)
+        self.__thread = None
+        self.close_camera()
+
+    def __capture_loop(self):
+        """
+        Reads frames until stopped and hands each one to the subscribers.
+        """
+        frame_rate = self.get_frame_rate() if self.__realtime else 0
+        frame_period = 1.0 / frame_rate if frame_rate > 0 else 0
+        next_frame_time = time.perf_counter()
+
+        while self.__running:
+            frame = self.get_frame()
+            if frame is None:
+                if self.__is_file:
+                    break
+                time.sleep(0.001)
+                continue
+            timestamp = time.time()
+            frame.flags.writeable = False
+            self.__sequence += 1
+
+            with self.__subscriptions_lock:
+                subscriptions = list(self.__subscriptions)
+            for subscription in subscriptions:
+                subscription._publish(frame, timestamp, self.__sequence)
+
+            if frame_period:
+                next_frame_time += frame_period
+                delay = next_frame_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+        self.__running = False
+        self.__finish_subscriptions()
+
+    def __finish_subscriptions(self):
+        """
+        Removes the subscriptions and wakes up every consumer waiting for a frame since no more frames will be
+        captured.
+        """
+        with self.__subscriptions_lock:
+            subscriptions = self.__subscriptions
+            self.__subscriptions = []
+        for subscription in subscriptions:
+            subscription._finish()
@@ -5,15 +5,20 @@ class VideoHandler:
     """
     A class dedicated to handle the camera video. The backend that is being used is OpenCV
     """
-    def __init__(self):
-        self.__video = cv2.VideoCapture(0)
+    def __init__(self, source=0):
+        """
+        Opens the video source.
+        :param source: The camera index or the path of a video file. Defaults to the default camera.
+        """
+        self._source = source
+        self.__video = cv2.VideoCapture(source)
 
     def open_camera(self):
         """
-        If the camara is closed establish a connection to the default camara system.
+        If the camara is closed establish a connection to the configured video source.
         """
         if not self.__video.isOpened():
-            self.__video = cv2.VideoCapture(0)
+            self.__video = cv2.VideoCapture(self._source)
 
     def close_camera(self):
         """
@@ -38,3 +43,10 @@ class VideoHandler:
         :return: A boolean indicating if the camera is open.
         """
         return self.__video.isOpened()
+
+    def get_frame_rate(self) -> float:
+        """
+        Gets the frame rate reported by the video source.
+        :return: The frames per second, 0 if the source does not report it.
+        """
+        return self.__video.get(cv2.CAP_PROP_FPS) if self.__video.isOpened() else 0
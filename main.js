@@ -10,8 +10,9 @@ class ApplicationManager {
         this.calibrationWindow = null;
         this.socket = null;
         this.isShuttingDown = false;
-        this.pendingReportResponse = null;
-        this.reportResponseResolver = null;
+        // Replies awaited by requestPython, keyed by the request_id sent with the command
+        this.pendingReplies = new Map();
+        this.nextRequestId = 1;
         this.setupEventHandlers();
     }
 
@@ -51,18 +52,8 @@ class ApplicationManager {
         // New special handler for report generation
         ipcMain.handle('generate-report', async () => {
             try {
-                // Create a promise that will be resolved when we get the response
-                const responsePromise = new Promise((resolve) => {
-                    this.reportResponseResolver = resolve;
-                });
-
-                // Send the command
-                await this.sendToPython('generate_report');
-
-                // Wait for the response (will be resolved in startMessageLoop)
-                const response = await responsePromise;
-                this.reportResponseResolver = null;
-                return response;
+                // The backend keeps handling other commands while the report is generated
+                return await this.requestPython('generate_report');
             } catch (error) {
                 console.error('Error generating report:', error);
                 return { status: 'error', message: error.toString() };
@@ -180,9 +171,11 @@ class ApplicationManager {
 
                 const response = JSON.parse(msg.toString());
                 
-                // Check if this is a response to a report generation request
-                if (this.reportResponseResolver) {
-                    this.reportResponseResolver(response);
+                // Replies to a request are matched by their request_id, the other messages go to the window
+                if (response.request_id !== undefined && this.pendingReplies.has(response.request_id)) {
+                    const resolve = this.pendingReplies.get(response.request_id);
+                    this.pendingReplies.delete(response.request_id);
+                    resolve(response);
                 } else if (this.mainWindow) {
                     // Handle regular messages as before
                     this.mainWindow.webContents.send('python-message', response);
@@ -207,13 +200,31 @@ class ApplicationManager {
         });
     }
 
-    async sendToPython(command, params = {}) {
+    async sendToPython(command, params = {}, requestId = undefined) {
         if (!this.socket || this.isShuttingDown) return;
 
         const message = { command, params };
+        if (requestId !== undefined) {
+            message.request_id = requestId;
+        }
         await this.socket.send(JSON.stringify(message));
     }
 
+    async requestPython(command, params = {}) {
+        // Sends a command and resolves with its reply, matched by request_id (resolved in startMessageLoop)
+        const requestId = this.nextRequestId++;
+        const reply = new Promise((resolve) => {
+            this.pendingReplies.set(requestId, resolve);
+        });
+        try {
+            await this.sendToPython(command, params, requestId);
+        } catch (error) {
+            this.pendingReplies.delete(requestId);
+            throw error;
+        }
+        return reply;
+    }
+
     async cleanup() {
         if (this.isShuttingDown) return;
 